@@ -0,0 +1,4 @@
+"""
+Benchmarks de DivertyCam Desktop
+Ejecutar desde divertycam_desktop/, por ejemplo: python -m benchmarks.bench_frame_decode
+"""
@@ -0,0 +1,186 @@
+"""
+Benchmark: conversión del master de impresión al perfil ICC de la impresora
+
+Genera un perfil ICC de prueba (matriz + curvas, gama menor que sRGB y gamma
+1.8, como una impresora de sublimación simplificada) salvo que se indique
+uno real con --perfil, y mide:
+- construir la transformación (primer collage) frente a reutilizarla
+- encode_derivatives() sin perfil y con perfil
+- que solo el master cambie: los derivados de pantalla, web y miniatura deben
+  ser idénticos byte a byte en ambos casos
+
+Uso:
+    python -m benchmarks.bench_color_management [--perfil impresora.icc] [--papel 10x15] [--repeat 5]
+"""
+import argparse
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_frame_decode import make_photos  # noqa: E402
+from utils import CollageGenerator, print_target, set_color_settings  # noqa: E402
+from utils.collage_output import encode_derivatives  # noqa: E402
+from utils.collage_templates import get_default_templates  # noqa: E402
+from utils.color_management import get_color_settings, get_color_transform_cache, profile_file_name  # noqa: E402
+
+PRINTER_NAME = "Impresora de prueba"
+
+# Colorantes sRGB adaptados a D50 (Bradford)
+SRGB_COLORANTS = (
+    (0.4361, 0.2225, 0.0139),
+    (0.3851, 0.7169, 0.0971),
+    (0.1431, 0.0606, 0.7141),
+)
+D50 = (0.9642, 1.0, 0.8249)
+
+
+def _s15f16(value: float) -> bytes:
+    return struct.pack('>i', round(value * 65536))
+
+
+def make_test_profile(desaturation: float = 0.2, gamma: float = 1.8) -> bytes:
+    """Perfil ICC v2 de salida RGB (matriz + curvas) con los primarios hacia el blanco"""
+    def xyz_tag(xyz):
+        return b'XYZ \0\0\0\0' + b''.join(_s15f16(v) for v in xyz)
+
+    def curve_tag(value):
+        return b'curv\0\0\0\0' + struct.pack('>IH', 1, round(value * 256)) + b'\0\0'
+
+    def desc_tag(text):
+        ascii_text = text.encode('ascii') + b'\0'
+        return (b'desc\0\0\0\0' + struct.pack('>I', len(ascii_text)) + ascii_text
+                + struct.pack('>II', 0, 0) + struct.pack('>HB', 0, 0) + b'\0' * 67)
+
+    colorants = [
+        tuple((1 - desaturation) * c + desaturation * w / 3 for c, w in zip(colorant, D50))
+        for colorant in SRGB_COLORANTS
+    ]
+    tags = [
+        (b'desc', desc_tag(PRINTER_NAME)),
+        (b'cprt', b'text\0\0\0\0' + b'Sin copyright\0'),
+        (b'wtpt', xyz_tag(D50)),
+        (b'rXYZ', xyz_tag(colorants[0])),
+        (b'gXYZ', xyz_tag(colorants[1])),
+        (b'bXYZ', xyz_tag(colorants[2])),
+        (b'rTRC', curve_tag(gamma)),
+        (b'gTRC', curve_tag(gamma)),
+        (b'bTRC', curve_tag(gamma)),
+    ]
+
+    offset = 128 + 4 + 12 * len(tags)
+    table = struct.pack('>I', len(tags))
+    data = b''
+    for signature, body in tags:
+        body += b'\0' * (-len(body) % 4)
+        table += signature + struct.pack('>II', offset + len(data), len(body))
+        data += body
+
+    size = offset + len(data)
+    header = (
+        struct.pack('>I', size) + b'lcms' + struct.pack('>I', 0x02100000) + b'prtr' + b'RGB ' + b'XYZ '
+        + struct.pack('>6H', 2026, 1, 1, 0, 0, 0) + b'acsp' + b'\0' * 4 + struct.pack('>I', 0)
+        + b'\0' * 8 + b'\0' * 8 + struct.pack('>I', 0)
+        + b''.join(_s15f16(v) for v in D50) + b'\0' * 4 + b'\0' * 16 + b'\0' * 28
+    )
+    assert len(header) == 128
+    return header + table + data
+
+
+def best_of(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perfil", help="Perfil ICC real de la impresora (default: perfil de prueba)")
+    parser.add_argument("--papel", default="10x15", help="Papel del collage")
+    parser.add_argument("--plantilla", default="4 Fotos Grid", help="Plantilla predeterminada")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medición (se toma la mejor)")
+    args = parser.parse_args()
+
+    template = next(t for t in get_default_templates() if t["nombre"] == args.plantilla)
+    profile = Path(args.perfil).read_bytes() if args.perfil else make_test_profile()
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        photos_dir = temp_dir / "fotos"
+        photos_dir.mkdir()
+        photos = make_photos(photos_dir, template["num_photos"], (1920, 1080))
+
+        generator = CollageGenerator(template, target=print_target(args.papel))
+        generator.generate(photos, temp_dir / "base.jpg")
+        canvas = generator.get_canvas()
+        dpi = generator.plan.dpi
+        print(f"{args.plantilla} en {args.papel} a {dpi:g} DPI: {canvas.width}x{canvas.height}")
+
+        # Sin perfil: carpeta vacía
+        profiles_dir = temp_dir / "perfiles"
+        profiles_dir.mkdir()
+        previous_dir = get_color_settings()[2]
+        set_color_settings(profiles_dir=profiles_dir)
+
+        plain_dir = temp_dir / "sin_perfil"
+        plain = encode_derivatives(canvas, plain_dir / "collage.jpg", dpi=dpi, printer_name=PRINTER_NAME)
+        plain_time = best_of(
+            lambda: encode_derivatives(canvas, plain_dir / "collage.jpg", dpi=dpi, printer_name=PRINTER_NAME),
+            args.repeat
+        )
+
+        (profiles_dir / f"{profile_file_name(PRINTER_NAME)}.icc").write_bytes(profile)
+        cache = get_color_transform_cache()
+        cache.clear()
+        managed_dir = temp_dir / "con_perfil"
+        start = time.perf_counter()
+        managed = encode_derivatives(canvas, managed_dir / "collage.jpg", dpi=dpi, printer_name=PRINTER_NAME)
+        first_time = time.perf_counter() - start
+        managed_time = best_of(
+            lambda: encode_derivatives(canvas, managed_dir / "collage.jpg", dpi=dpi, printer_name=PRINTER_NAME),
+            args.repeat
+        )
+        stats = cache.get_stats()
+
+        profile_path = next(profiles_dir.glob("*.icc"))
+        intent, black_point, _ = get_color_settings()
+        cache.clear()
+        build_time = best_of(lambda: (cache.clear(), cache.get(profile_path, intent, black_point)), args.repeat)
+        hit_time = best_of(lambda: cache.get(profile_path, intent, black_point), args.repeat)
+        set_color_settings(profiles_dir=previous_dir)
+
+        print(f"{'Derivados sin perfil':<34}{plain_time * 1000:>8.0f} ms")
+        print(f"{'Con perfil, primer collage':<34}{first_time * 1000:>8.0f} ms (construye la transformación)")
+        print(f"{'Con perfil, transformación en caché':<34}{managed_time * 1000:>8.0f} ms")
+        print(f"Transformaciones construidas: {stats['builds']}, reutilizadas: {stats['hits']}")
+        print(f"Construir la transformación: {build_time * 1000:.1f} ms, obtenerla de la caché: {hit_time * 1e6:.0f} µs")
+
+        ok = True
+        for name in plain:
+            same = plain[name].read_bytes() == managed[name].read_bytes()
+            with Image.open(managed[name]) as image:
+                embedded = image.info.get("icc_profile", b"")
+            profile_name = "impresora" if embedded == profile else ("sRGB" if embedded else "ninguno")
+            print(f"  {name:<10} {'igual' if same else 'distinto':<9} perfil incrustado: {profile_name}")
+            expected_same = name != "print"
+            ok = ok and same == expected_same and (profile_name == "impresora") == (name == "print")
+
+        with Image.open(plain["print"]) as a, Image.open(managed["print"]) as b:
+            pixel = (canvas.width // 2, canvas.height // 2)
+            print(f"Píxel central sRGB {a.getpixel(pixel)} -> impresora {b.getpixel(pixel)}")
+
+        if not ok:
+            print("ERROR: el perfil debe aplicarse solo al master de impresión")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
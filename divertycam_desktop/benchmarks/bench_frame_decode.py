@@ -0,0 +1,90 @@
+"""
+Benchmark: decodificación JPEG a escala reducida al generar collages
+
+Genera fotos JPEG sintéticas de la resolución indicada y mide, para cada
+plantilla predeterminada, el tiempo de CollageGenerator.generate() con y sin
+fast_decode. También reporta la diferencia media por píxel entre ambos
+resultados como control de calidad.
+
+Uso:
+    python -m benchmarks.bench_frame_decode [--resolution 3840x2160] [--repeat 3]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageStat
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import CollageGenerator  # noqa: E402
+from utils.collage_templates import get_default_templates  # noqa: E402
+
+
+def make_photos(directory: Path, count: int, size):
+    """Crea fotos JPEG sintéticas con detalle (fractal) para que el JPEG no sea trivial"""
+    paths = []
+    for i in range(count):
+        image = Image.effect_mandelbrot(size, (-2.0 + i * 0.05, -1.0, 1.0, 1.0), 64).convert("RGB")
+        image = Image.merge("RGB", (image.getchannel(0), image.rotate(180).getchannel(0), image.getchannel(0)))
+        path = directory / f"photo_{i + 1}.jpg"
+        image.save(path, "JPEG", quality=95)
+        paths.append(path)
+    return paths
+
+
+def time_generate(template, photos, output_path: Path, fast_decode: bool, repeat: int) -> float:
+    """Mejor tiempo (s) de varias ejecuciones de generate()"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        generator = CollageGenerator(template, fast_decode=fast_decode)
+        if not generator.generate(photos, output_path):
+            raise RuntimeError(f"No se pudo generar {template['nombre']}")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolution", default="3840x2160", help="Resolución de las fotos (default 3840x2160)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se toma la mejor)")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    templates = get_default_templates()
+    max_photos = max(t["num_photos"] for t in templates)
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        photos = make_photos(temp_dir, max_photos, (width, height))
+
+        print(f"Fotos JPEG {width}x{height}, mejor de {args.repeat}")
+        print(f"{'Plantilla':<24}{'completo':>11}{'reducido':>11}{'speedup':>9}{'dif. media':>12}")
+
+        total_full = total_fast = 0.0
+        for template in templates:
+            template_photos = photos[:template["num_photos"]]
+            full_path = temp_dir / "full.jpg"
+            fast_path = temp_dir / "fast.jpg"
+
+            full = time_generate(template, template_photos, full_path, False, args.repeat)
+            fast = time_generate(template, template_photos, fast_path, True, args.repeat)
+            total_full += full
+            total_fast += fast
+
+            with Image.open(full_path) as a, Image.open(fast_path) as b:
+                diff = sum(ImageStat.Stat(ImageChops.difference(a, b)).mean) / 3
+
+            print(
+                f"{template['nombre']:<24}{full * 1000:>9.0f}ms{fast * 1000:>9.0f}ms"
+                f"{full / fast:>8.2f}x{diff:>12.2f}"
+            )
+
+        print(f"{'Total':<24}{total_full * 1000:>9.0f}ms{total_fast * 1000:>9.0f}ms{total_full / total_fast:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: índice y render del mosaico de fotos del evento
+
+Crea fotos JPEG sintéticas de colores variados, mide el tiempo de agregarlas
+al índice (lo que hace el photobooth en segundo plano por cada foto), de
+reabrir el índice, de asignar fotos a las celdas y de componer el póster por
+bandas. Reporta también el error de color medio de la asignación frente a la
+foto más parecida de cada celda (el costo de no repetir fotos).
+
+Uso:
+    python -m benchmarks.bench_mosaic [--fotos 500] [--columnas 80] [--papel 60x90] [--dpi 150]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.mosaic import (  # noqa: E402
+    SIGNATURE_GRID,
+    MosaicIndex,
+    grid_signatures,
+    match_cells,
+    render_mosaic,
+    srgb_to_lab,
+)
+
+
+def make_photos(directory: Path, count: int, size, seed: int = 0):
+    """Fotos con degradados de dos colores al azar (variedad de firmas de color)"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    ramp = np.linspace(0, 1, width, dtype=np.float32)[None, :, None]
+    paths = []
+    for i in range(count):
+        first, second = rng.integers(0, 256, (2, 3)).astype(np.float32)
+        row = first * (1 - ramp) + second * ramp
+        noise = rng.normal(0, 12, (height, 1, 1)).astype(np.float32)
+        pixels = np.clip(np.broadcast_to(row, (height, width, 3)) + noise, 0, 255).astype(np.uint8)
+        path = directory / f"photo_{i + 1:04d}.jpg"
+        Image.fromarray(pixels).save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def make_target(size) -> Image.Image:
+    """Imagen objetivo con formas y colores definidos"""
+    fractal = Image.effect_mandelbrot(size, (-2.0, -1.2, 0.8, 1.2), 48)
+    return Image.merge("RGB", (fractal, fractal.rotate(180), fractal.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fotos", type=int, default=500, help="Fotos del evento")
+    parser.add_argument("--resolution", default="1920x1080", help="Resolución de las fotos")
+    parser.add_argument("--columnas", type=int, default=80, help="Celdas por fila")
+    parser.add_argument("--papel", default="60x90", help="Papel del póster en cm")
+    parser.add_argument("--dpi", type=float, default=150, help="Resolución del póster")
+    args = parser.parse_args()
+
+    Image.MAX_IMAGE_PIXELS = None
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        photos_dir = temp_dir / "fotos"
+        photos_dir.mkdir()
+        print(f"Creando {args.fotos} fotos de {width}x{height}...")
+        photos = make_photos(photos_dir, args.fotos, (width, height))
+
+        index = MosaicIndex(temp_dir / "indice")
+        start = time.perf_counter()
+        for photo in photos:
+            index.add_photo(photo)
+        elapsed = time.perf_counter() - start
+        print(f"Indexar: {elapsed:.2f} s ({elapsed / len(photos) * 1000:.1f} ms por foto)")
+
+        start = time.perf_counter()
+        index = MosaicIndex(temp_dir / "indice")
+        signatures = index.signatures()
+        print(f"Reabrir índice y leer firmas: {(time.perf_counter() - start) * 1000:.1f} ms ({len(index)} fotos)")
+
+        target = make_target((1200, 1800))
+        rows = round(args.columnas * target.height / target.width)
+        grid = SIGNATURE_GRID * 4
+        sample = target.resize((args.columnas * grid, rows * grid), Image.Resampling.LANCZOS)
+        cells = grid_signatures(srgb_to_lab(np.asarray(sample)), rows, args.columnas)
+
+        start = time.perf_counter()
+        assignment = match_cells(cells, signatures)
+        elapsed = time.perf_counter() - start
+        distances = ((cells[:, None, :] - signatures[None, :, :]) ** 2).sum(axis=2)
+        best = distances.min(axis=1)
+        chosen = distances[np.arange(len(cells)), assignment]
+        print(
+            f"Asignar {len(cells)} celdas: {elapsed * 1000:.0f} ms, {len(np.unique(assignment))} fotos distintas, "
+            f"error Lab medio {np.sqrt(chosen / SIGNATURE_GRID ** 2).mean():.1f} "
+            f"(sin penalizar repeticiones {np.sqrt(best / SIGNATURE_GRID ** 2).mean():.1f})"
+        )
+
+        for name in ("mosaico.tif", "mosaico.jpg"):
+            start = time.perf_counter()
+            result = render_mosaic(index, target, temp_dir / name, paper_size=args.papel, dpi=args.dpi,
+                                   columns=args.columnas)
+            elapsed = time.perf_counter() - start
+            if result is None:
+                print(f"ERROR: no se generó {name}")
+                sys.exit(1)
+            poster_width, poster_height = result["size"]
+            size_mb = result["path"].stat().st_size / 2 ** 20
+            print(f"Render {name}: {poster_width}x{poster_height} en {elapsed:.1f} s ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: generación de collages con marcos procesados en paralelo
+
+Para cada plantilla predeterminada compara CollageGenerator.generate() en
+serie (workers=1) y en paralelo, y verifica que ambos JPEG sean idénticos
+byte a byte.
+
+Uso:
+    python -m benchmarks.bench_parallel_collage [--workers 4] [--resolution 3840x2160] [--repeat 3]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_frame_decode import make_photos  # noqa: E402
+from utils import CollageGenerator  # noqa: E402
+from utils.collage_generator import DEFAULT_WORKERS  # noqa: E402
+from utils.collage_templates import get_default_templates  # noqa: E402
+
+
+def time_generate(template, photos, output_path: Path, workers: int, repeat: int) -> float:
+    """Mejor tiempo (s) de varias ejecuciones de generate()"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if not CollageGenerator(template, workers=workers).generate(photos, output_path):
+            raise RuntimeError(f"No se pudo generar {template['nombre']}")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Hilos del modo paralelo")
+    parser.add_argument("--resolution", default="3840x2160", help="Resolución de las fotos (default 3840x2160)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se toma la mejor)")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    templates = get_default_templates()
+    max_photos = max(t["num_photos"] for t in templates)
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        photos = make_photos(temp_dir, max_photos, (width, height))
+
+        print(f"Fotos JPEG {width}x{height}, {args.workers} hilos, mejor de {args.repeat}")
+        print(f"{'Plantilla':<24}{'serie':>10}{'paralelo':>11}{'speedup':>9}{'idéntico':>10}")
+
+        all_identical = True
+        for template in templates:
+            template_photos = photos[:template["num_photos"]]
+            serial_path = temp_dir / "serial.jpg"
+            parallel_path = temp_dir / "parallel.jpg"
+
+            serial = time_generate(template, template_photos, serial_path, 1, args.repeat)
+            parallel = time_generate(template, template_photos, parallel_path, args.workers, args.repeat)
+
+            identical = serial_path.read_bytes() == parallel_path.read_bytes()
+            all_identical &= identical
+
+            print(
+                f"{template['nombre']:<24}{serial * 1000:>8.0f}ms{parallel * 1000:>9.0f}ms"
+                f"{serial / parallel:>8.2f}x{'sí' if identical else 'NO':>10}"
+            )
+
+    if not all_identical:
+        print("ERROR: el modo paralelo no produjo el mismo resultado que el modo en serie")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: backends de render del generador de collages (PIL vs OpenCV)
+
+Para cada plantilla predeterminada compone el collage con cada backend y
+compara los canvas antes de codificar el JPEG (diferencia máxima y media por
+canal). Falla si la diferencia máxima supera --max-delta. Luego mide el
+throughput de generate() completo (collages por segundo) de cada backend.
+
+Uso:
+    python -m benchmarks.bench_render_backends [--resolution 3840x2160] [--repeat 3] [--max-delta 64]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import ImageChops, ImageStat
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_frame_decode import make_photos  # noqa: E402
+from utils import CollageGenerator, available_render_backends  # noqa: E402
+from utils.collage_templates import get_default_templates  # noqa: E402
+
+
+def compose(template, photos, backend: str):
+    """Canvas (PIL Image) del collage compuesto con un backend, sin guardar"""
+    generator = CollageGenerator(template, workers=1, backend=backend)
+    generator.begin()
+    for i, photo in enumerate(photos):
+        generator.render_frame(i, photo)
+    return generator.get_canvas()
+
+
+def time_generate(template, photos, output_path: Path, backend: str, repeat: int) -> float:
+    """Mejor tiempo (s) de varias ejecuciones de generate()"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if not CollageGenerator(template, workers=1, backend=backend).generate(photos, output_path):
+            raise RuntimeError(f"No se pudo generar {template['nombre']}")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolution", default="3840x2160", help="Resolución de las fotos (default 3840x2160)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se toma la mejor)")
+    parser.add_argument("--max-delta", type=int, default=64, help="Diferencia máxima por canal tolerada (0-255)")
+    args = parser.parse_args()
+
+    if "opencv" not in available_render_backends():
+        print("ERROR: el backend 'opencv' no está disponible (falta opencv-python o numpy)")
+        sys.exit(1)
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    templates = get_default_templates()
+    max_photos = max(t["num_photos"] for t in templates)
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        photos = make_photos(temp_dir, max_photos, (width, height))
+
+        print(f"Fotos JPEG {width}x{height}, en serie, mejor de {args.repeat}")
+        print(
+            f"{'Plantilla':<24}{'pil':>9}{'opencv':>10}{'speedup':>9}"
+            f"{'dif. máx':>10}{'dif. media':>12}"
+        )
+
+        total_pil = total_cv = 0.0
+        worst = 0
+        for template in templates:
+            template_photos = photos[:template["num_photos"]]
+
+            reference = compose(template, template_photos, "pil")
+            candidate = compose(template, template_photos, "opencv")
+            difference = ImageChops.difference(reference, candidate)
+            max_delta = max(high for _, high in difference.getextrema())
+            mean_delta = sum(ImageStat.Stat(difference).mean) / 3
+            worst = max(worst, max_delta)
+
+            output_path = temp_dir / "collage.jpg"
+            pil = time_generate(template, template_photos, output_path, "pil", args.repeat)
+            cv = time_generate(template, template_photos, output_path, "opencv", args.repeat)
+            total_pil += pil
+            total_cv += cv
+
+            print(
+                f"{template['nombre']:<24}{pil * 1000:>7.0f}ms{cv * 1000:>8.0f}ms{pil / cv:>8.2f}x"
+                f"{max_delta:>10}{mean_delta:>12.2f}"
+            )
+
+        count = len(templates)
+        print(f"{'Total':<24}{total_pil * 1000:>7.0f}ms{total_cv * 1000:>8.0f}ms{total_pil / total_cv:>8.2f}x")
+        print(f"Throughput: pil {count / total_pil:.2f} collages/s, opencv {count / total_cv:.2f} collages/s")
+
+    if worst > args.max_delta:
+        print(f"ERROR: diferencia máxima {worst} mayor que la tolerada ({args.max_delta})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Benchmark: sesiones del photobooth sin interfaz (SessionEngine)
+
+Corre sesiones completas una tras otra con el mismo motor que usa la ventana
+del photobooth, pero con reloj simulado (las esperas de la cuenta regresiva y
+de visualización no consumen tiempo real), una cámara que entrega siempre la
+misma foto y almacenamiento en memoria con latencia simulada de guardado y de
+codificación del collage.
+
+Reporta las sesiones por segundo y, por etapa, el tiempo real que consume
+atenderla (percentiles) y su duración en el reloj de la sesión. Verifica que
+todas las sesiones terminen con collage y que la duración simulada coincida
+con la esperada según los tiempos configurados.
+
+Con --componer el almacenamiento compone de verdad el collage de cada sesión
+(a resolución de vista previa) para ver cuánto pesa frente al motor.
+
+Uso:
+    python -m benchmarks.bench_session_engine [--sesiones 500] [--componer] [--plantilla "4 Fotos Grid"]
+"""
+import argparse
+import io
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from controllers import BaseCamera, ManualClock, MemorySessionStorage, SessionEngine, SessionTimings  # noqa: E402
+from controllers.session_engine import FINAL_STATES, TIMED_STATES, SessionState  # noqa: E402
+from utils import CollageGenerator, PREVIEW_TARGET  # noqa: E402
+from utils.collage_templates import get_default_templates  # noqa: E402
+
+
+class StillCamera(BaseCamera):
+    """Cámara sin hardware que entrega siempre la misma foto (y su JPEG)"""
+
+    def __init__(self, size):
+        super().__init__()
+        fractal = Image.effect_mandelbrot(size, (-2.0, -1.0, 1.0, 1.0), 64)
+        self.image = Image.merge("RGB", (fractal, fractal.rotate(180), fractal))
+        buffer = io.BytesIO()
+        self.image.save(buffer, "JPEG", quality=90)
+        self.jpeg = buffer.getvalue()
+        self.captures = 0
+
+    def connect(self) -> bool:
+        self.is_connected = True
+        return True
+
+    def disconnect(self):
+        self.is_connected = False
+
+    def capture(self) -> Optional[Image.Image]:
+        self.captures += 1
+        return self.image
+
+    def get_preview(self) -> Optional[Image.Image]:
+        return self.image
+
+    def get_capture_jpeg(self, image: Image.Image) -> Optional[bytes]:
+        return self.jpeg if image is self.image else None
+
+    def get_settings(self) -> Dict:
+        return {}
+
+    def set_setting(self, setting: str, value) -> bool:
+        return False
+
+
+class ComposingStorage(MemorySessionStorage):
+    """Almacenamiento en memoria que compone el collage de cada sesión"""
+
+    def __init__(self, clock, template: Dict, output_dir: Path, **kwargs):
+        super().__init__(clock, num_photos=template["num_photos"], **kwargs)
+        self.template = template
+        self.output_dir = output_dir
+        self.generators: Dict[str, CollageGenerator] = {}
+
+    def create_session(self, session_id: str) -> int:
+        generator = CollageGenerator(self.template, target=PREVIEW_TARGET)
+        generator.begin()
+        self.generators[session_id] = generator
+        return super().create_session(session_id)
+
+    def add_photo(self, session_id, frame_index, photo, jpeg_data):
+        self.generators[session_id].render_frame(frame_index, jpeg_data or photo, add_border=True)
+        super().add_photo(session_id, frame_index, photo, jpeg_data)
+
+    def finish_session(self, session_id: str, collage_id: str):
+        generator = self.generators.pop(session_id)
+        derivatives = generator.save_derivatives(self.output_dir / f"collage_{collage_id}.jpg")
+        self.clock.call_later(self.compose_delay, lambda: self._collage_composed(session_id, derivatives))
+
+
+def expected_duration(timings: SessionTimings, photos: int, save_delay: float, compose_delay: float) -> float:
+    """Duración de una sesión según los tiempos (reloj simulado)"""
+    per_photo = (timings.countdown + 1) * timings.tick + timings.shutter_delay
+    reviews = (photos - 1) * (timings.display + timings.between_photos) + timings.display
+    # La última foto termina de guardarse save_delay después del disparo; el
+    # collage se encola al terminar la visualización
+    saving = max(0.0, save_delay - timings.display)
+    return photos * per_photo + reviews + max(saving, compose_delay)
+
+
+def percentile_table(samples: Dict[str, list], durations: Dict[str, list]):
+    print(f"{'Etapa':<12}{'p50 µs':>10}{'p95 µs':>10}{'p99 µs':>10}{'máx µs':>10}{'reloj s':>10}")
+    for name, values in samples.items():
+        values_us = np.array(values) * 1e6
+        clock = np.mean(durations.get(name, [0.0]))
+        p50, p95, p99 = np.percentile(values_us, [50, 95, 99])
+        print(f"{name:<12}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{values_us.max():>10.0f}{clock:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sesiones", type=int, default=500, help="Sesiones seguidas")
+    parser.add_argument("--plantilla", default="4 Fotos Grid", help="Plantilla predeterminada (fotos por sesión)")
+    parser.add_argument("--resolution", default="1280x720", help="Resolución de la foto de la cámara")
+    parser.add_argument("--cuenta", type=int, default=3, help="Cuenta regresiva (s)")
+    parser.add_argument("--entre", type=float, default=3, help="Pausa entre fotos (s)")
+    parser.add_argument("--visualizacion", type=float, default=2, help="Visualización de cada foto (s)")
+    parser.add_argument("--guardado-ms", type=float, default=150, help="Latencia simulada de guardar una foto")
+    parser.add_argument("--composicion-ms", type=float, default=800, help="Latencia simulada de codificar el collage")
+    parser.add_argument("--componer", action="store_true", help="Componer de verdad el collage de cada sesión")
+    args = parser.parse_args()
+
+    # El motor registra cada sesión en el log; aquí solo interesan los errores
+    logging.basicConfig(level=logging.WARNING)
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    template = next(t for t in get_default_templates() if t["nombre"] == args.plantilla)
+    timings = SessionTimings(countdown=args.cuenta, between_photos=args.entre, display=args.visualizacion)
+    save_delay = args.guardado_ms / 1000
+    compose_delay = args.composicion_ms / 1000
+
+    with tempfile.TemporaryDirectory() as temp:
+        clock = ManualClock()
+        if args.componer:
+            storage = ComposingStorage(clock, template, Path(temp), save_delay=save_delay, compose_delay=compose_delay)
+        else:
+            storage = MemorySessionStorage(clock, template["num_photos"], save_delay, compose_delay)
+        camera = StillCamera((width, height))
+        engine = SessionEngine(clock, storage, camera=camera, timings=timings)
+
+        work = {state.value: [] for state in TIMED_STATES}
+        durations = {state.value: [] for state in TIMED_STATES}
+        totals, session_wall, failures, wrong_duration = [], [], 0, 0
+        expected = expected_duration(timings, template["num_photos"], save_delay, compose_delay)
+
+        start = time.perf_counter()
+        for _ in range(args.sesiones):
+            session_start = time.perf_counter()
+            if not engine.begin_session():
+                failures += 1
+                continue
+            engine.start_photos()
+            clock.run_until(lambda: engine.state in FINAL_STATES)
+            session_wall.append(time.perf_counter() - session_start)
+
+            metrics = engine.metrics
+            if engine.state != SessionState.COMPLETED:
+                failures += 1
+                continue
+            for name in work:
+                work[name].append(metrics.work.get(name, 0.0))
+                durations[name].append(metrics.durations.get(name, 0.0))
+            totals.append(metrics.total)
+            if abs(metrics.total - expected) > 1e-6:
+                wrong_duration += 1
+        elapsed = time.perf_counter() - start
+        engine.reset()
+
+        print(f"{args.plantilla}: {template['num_photos']} fotos por sesión, cámara {width}x{height}, "
+              f"collage {'compuesto' if args.componer else 'simulado'}")
+        print(f"{len(totals)} sesiones en {elapsed:.2f} s: {len(totals) / elapsed:.0f} sesiones/s, "
+              f"{camera.captures} capturas, {len(storage.collages)} collages registrados")
+        print(f"Duración simulada por sesión: {np.mean(totals):.2f} s (esperada {expected:.2f} s)")
+        percentile_table(work, durations)
+        wall_us = np.array(session_wall) * 1e6
+        p50, p95, p99 = np.percentile(wall_us, [50, 95, 99])
+        print(f"{'sesión':<12}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{wall_us.max():>10.0f}{np.mean(totals):>10.2f}")
+
+        if failures or wrong_duration:
+            print(f"ERROR: {failures} sesiones sin collage, {wrong_duration} con duración distinta a la esperada")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+Benchmark y regresión del render de collages
+
+Genera fotos sintéticas a 720p, 1080p y 4K y renderiza con
+CollageGenerator.generate() (master de impresión y derivados) todas las
+plantillas predeterminadas más casos límite: marcos muy anchos y muy altos,
+bordes gruesos, imagen de fondo con marco PNG, y fotos verticales y
+panorámicas. Cada caso corre en un proceso aparte para medir su pico de
+memoria (RSS; ver benchmarks/memory.py para Windows).
+
+Por caso reporta el tiempo total y por etapa (canvas, decode, fit, paste,
+overlay, encode; ver CollageGenerator.stage_times) y compara el collage con
+su imagen golden con tolerancia perceptual: diferencia de color ΔE (CIE76,
+Lab) sobre el collage reducido a GOLDEN_MAX_SIDE px, media y percentil 99.
+
+Las golden de benchmarks/golden/ (papel 10x15 a 300 DPI, las tres
+resoluciones) se versionan y se regeneran con --actualizar-golden solo cuando
+el render cambia a propósito. Los textos usan la fuente incluida en Pillow,
+así que entre sistemas solo cambia el rasterizado de los bordes de las letras
+y la decodificación JPEG, que quedan dentro de la tolerancia. Todo lo que
+escribe la suite (fotos, collages y la caché de capas base) queda en un
+directorio temporal; con --json los resultados se guardan en ese archivo y
+--base compara los tiempos con una corrida anterior.
+
+Uso:
+    python -m benchmarks.bench_suite [--resoluciones 720p,1080p,4k] [--casos "4 Fotos Grid,Bordes gruesos"]
+                                     [--repeat 3] [--actualizar-golden] [--json actual.json] [--base anterior.json]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_frame_decode import make_photos  # noqa: E402
+from benchmarks.memory import peak_rss_mb  # noqa: E402
+from utils import CollageGenerator, collage_text_values, print_target  # noqa: E402
+from utils import base_layer_cache  # noqa: E402
+from utils.collage_generator import STAGES  # noqa: E402
+from utils.collage_templates import create_template, get_default_templates  # noqa: E402
+from utils.mosaic import srgb_to_lab  # noqa: E402
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+GOLDEN_DIR = BENCHMARKS_DIR / "golden"
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+# Lado mayor del collage al compararlo con la golden
+GOLDEN_MAX_SIDE = 640
+# Tolerancia perceptual (ΔE CIE76; ~2.3 es la diferencia apenas visible)
+DEFAULT_MAX_MEAN_DELTA_E = 1.0
+DEFAULT_MAX_P99_DELTA_E = 8.0
+
+# Textos fijos para que las golden no dependan de la fecha
+TEXT_VALUES = collage_text_values("Evento de prueba", datetime(2026, 1, 1), datetime(2026, 1, 1, 20, 30))
+
+
+def _find_template(name: str) -> Dict[str, Any]:
+    return next(t for t in get_default_templates() if t["nombre"] == name)
+
+
+def _background_template(assets: Path) -> Dict[str, Any]:
+    template = _find_template("4 Fotos Grid")
+    template["nombre"] = "Fondo y marco PNG"
+    template["canvas"]["background_image"] = str(assets / "fondo.jpg")
+    template["canvas"]["overlay_image"] = str(assets / "marco.png")
+    template["canvas"]["overlay_opacity"] = 0.8
+    return template
+
+
+def _border_template(assets: Path) -> Dict[str, Any]:
+    template = _find_template("4 Fotos Grid")
+    template["nombre"] = "Bordes gruesos"
+    template["styling"] = dict(template.get("styling", {}), border_width=60, border_color="#C0392B")
+    return template
+
+
+# Casos límite: nombre -> (constructor de la plantilla, orientación de las fotos)
+EDGE_CASES: Dict[str, Tuple[Callable[[Path], Dict[str, Any]], str]] = {
+    "Marco panorámico": (lambda assets: create_template(
+        "Marco panorámico", "Marco 10:1 sobre uno casi cuadrado", 2, 1800, 1200,
+        frames=[
+            {"x": 50, "y": 60, "width": 1700, "height": 170},
+            {"x": 50, "y": 300, "width": 1700, "height": 840},
+        ],
+        size_mm=(150, 100)
+    ), "landscape"),
+    "Marcos verticales extremos": (lambda assets: create_template(
+        "Marcos verticales extremos", "Cuatro marcos 1:7", 4, 1200, 1800,
+        frames=[{"x": 40 + 290 * i, "y": 50, "width": 250, "height": 1700} for i in range(4)],
+        size_mm=(100, 150)
+    ), "landscape"),
+    "Bordes gruesos": (_border_template, "landscape"),
+    "Fondo y marco PNG": (_background_template, "landscape"),
+    "Fotos verticales": (lambda assets: _find_template("4 Fotos Grid"), "portrait"),
+    "Fotos panorámicas": (lambda assets: _find_template("6 Fotos Grid"), "panorama"),
+}
+
+
+def case_names() -> List[str]:
+    return [t["nombre"] for t in get_default_templates()] + list(EDGE_CASES)
+
+
+def build_case(name: str, assets: Path) -> Tuple[Dict[str, Any], str]:
+    """(plantilla, orientación de las fotos) de un caso"""
+    if name in EDGE_CASES:
+        builder, orientation = EDGE_CASES[name]
+        return builder(assets), orientation
+    return _find_template(name), "landscape"
+
+
+def photo_size(resolution: str, orientation: str) -> Tuple[int, int]:
+    width, height = RESOLUTIONS[resolution]
+    if orientation == "portrait":
+        return height, width
+    if orientation == "panorama":
+        return width, width // 4
+    return width, height
+
+
+def make_assets(directory: Path):
+    """Imagen de fondo y marco PNG semitransparente para el caso de fondo"""
+    gradient = Image.linear_gradient("L").resize((1800, 1200))
+    Image.merge("RGB", (gradient, gradient.rotate(180), Image.new("L", gradient.size, 128))).save(
+        directory / "fondo.jpg", "JPEG", quality=90
+    )
+    overlay = Image.new("RGBA", (1200, 1200), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    draw.rectangle((0, 0, 1199, 1199), outline=(255, 215, 0, 255), width=60)
+    draw.ellipse((450, 450, 750, 750), fill=(255, 255, 255, 140))
+    overlay.save(directory / "marco.png")
+
+
+def run_case(args):
+    """Renderiza un caso en este proceso e imprime el resultado como JSON"""
+    # Capas base en el directorio temporal de la suite, no en media/cache
+    base_layer_cache._default_cache = base_layer_cache.BaseLayerDiskCache(Path(args.cache))
+
+    template, _ = build_case(args.caso, Path(args.assets))
+    photos = sorted(str(path) for path in Path(args.fotos).glob("*.jpg"))[:template["num_photos"]]
+    output_dir = Path(args.salida)
+    target = print_target(args.papel, args.dpi)
+    baseline = peak_rss_mb()
+
+    runs = []
+    generator = None
+    for _ in range(args.repeat):
+        generator = CollageGenerator(
+            template, workers=args.workers, backend=args.backend, text_values=TEXT_VALUES, target=target
+        )
+        start = time.perf_counter()
+        ok = generator.generate(photos, output_dir / "collage.jpg", derivatives=True)
+        elapsed = time.perf_counter() - start
+        if not ok:
+            print(json.dumps({"ok": False}))
+            return
+        runs.append({"total": elapsed, "stages": dict(generator.stage_times)})
+    peak = peak_rss_mb()
+
+    # Collage reducido para la comparación (fuera de la medición)
+    canvas = generator.get_canvas()
+    size = list(canvas.size)
+    canvas.thumbnail((GOLDEN_MAX_SIDE, GOLDEN_MAX_SIDE), Image.Resampling.LANCZOS)
+    canvas.save(output_dir / "reducido.png")
+
+    best = min(runs, key=lambda run: run["total"])
+    print(json.dumps({
+        "ok": True,
+        "size": size,
+        "best_ms": best["total"] * 1000,
+        "median_ms": median(run["total"] for run in runs) * 1000,
+        "stages_ms": {stage: best["stages"][stage] * 1000 for stage in STAGES},
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak,
+    }))
+
+
+def perceptual_difference(image: Image.Image, golden: Image.Image) -> Dict[str, float]:
+    """ΔE (CIE76) entre dos imágenes del mismo tamaño: media, percentil 99 y máximo"""
+    a = srgb_to_lab(np.asarray(image.convert("RGB")))
+    b = srgb_to_lab(np.asarray(golden.convert("RGB")))
+    delta_e = np.sqrt(((a - b) ** 2).sum(axis=-1))
+    return {
+        "mean_delta_e": float(delta_e.mean()),
+        "p99_delta_e": float(np.percentile(delta_e, 99)),
+        "max_delta_e": float(delta_e.max()),
+    }
+
+
+def golden_path(golden_dir: Path, case: str, resolution: str, paper: str, dpi: float) -> Path:
+    slug = "".join(c if c.isalnum() else "_" for c in case.lower())
+    return golden_dir / f"{slug}_{resolution}_{paper}_{dpi:g}dpi.png"
+
+
+def compare_golden(result: Dict, reduced: Path, golden: Path, args) -> Dict:
+    """Compara (o crea con --actualizar-golden) la golden del caso"""
+    if args.actualizar_golden:
+        golden.parent.mkdir(parents=True, exist_ok=True)
+        golden.write_bytes(reduced.read_bytes())
+        return {"status": "actualizada"}
+    if not golden.exists():
+        return {"status": "sin golden"}
+
+    with Image.open(reduced) as image, Image.open(golden) as reference:
+        if image.size != reference.size:
+            return {"status": "falla", "reason": f"tamaño {image.size} != golden {reference.size}"}
+        difference = perceptual_difference(image, reference)
+
+    passed = (difference["mean_delta_e"] <= args.max_mean_delta_e
+              and difference["p99_delta_e"] <= args.max_p99_delta_e)
+    return dict(difference, status="ok" if passed else "falla")
+
+
+def environment() -> Dict[str, Any]:
+    """Datos de la máquina y versiones para interpretar los resultados"""
+    import PIL
+    info = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "pillow": PIL.__version__,
+        "numpy": np.__version__,
+    }
+    try:
+        import cv2
+        info["opencv"] = cv2.__version__
+    except ImportError:
+        info["opencv"] = None
+    try:
+        info["commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["commit"] = None
+    return info
+
+
+def print_comparison(results: List[Dict], base_path: Path):
+    """Cambio de tiempo (mejor de cada caso) respecto a otra corrida"""
+    base = json.loads(base_path.read_text(encoding="utf-8"))
+    previous = {(r["case"], r["resolution"]): r for r in base["results"] if r.get("ok")}
+    print(f"\nComparación con {base_path.name} (commit {base['environment'].get('commit')}):")
+    for result in results:
+        old = previous.get((result["case"], result["resolution"]))
+        if not result.get("ok") or old is None:
+            continue
+        change = (result["best_ms"] / old["best_ms"] - 1) * 100
+        print(f"  {result['case']:<28}{result['resolution']:>6}  {old['best_ms']:>8.0f} -> "
+              f"{result['best_ms']:>8.0f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resoluciones", default="720p,1080p,4k", help="Resoluciones de las fotos")
+    parser.add_argument("--casos", help="Casos separados por coma (default: todos)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por caso (se reporta la mejor)")
+    parser.add_argument("--papel", default="10x15", help="Papel de impresión")
+    parser.add_argument("--dpi", type=float, default=300, help="Resolución de impresión")
+    parser.add_argument("--workers", type=int, default=0, help="Hilos por collage (0 = automático)")
+    parser.add_argument("--backend", default="pil", help="Backend de render: pil u opencv")
+    parser.add_argument("--golden-dir", type=Path, default=GOLDEN_DIR, help="Carpeta de las imágenes golden")
+    parser.add_argument("--actualizar-golden", action="store_true", help="Guardar los resultados como golden")
+    parser.add_argument("--max-mean-delta-e", type=float, default=DEFAULT_MAX_MEAN_DELTA_E)
+    parser.add_argument("--max-p99-delta-e", type=float, default=DEFAULT_MAX_P99_DELTA_E)
+    parser.add_argument("--json", type=Path, help="Archivo donde guardar los resultados")
+    parser.add_argument("--base", type=Path, help="Resultados anteriores para comparar tiempos")
+    parser.add_argument("--caso", help=argparse.SUPPRESS)
+    parser.add_argument("--fotos", help=argparse.SUPPRESS)
+    parser.add_argument("--assets", help=argparse.SUPPRESS)
+    parser.add_argument("--salida", help=argparse.SUPPRESS)
+    parser.add_argument("--cache", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso:
+        run_case(args)
+        return
+
+    resolutions = [r.strip().lower() for r in args.resoluciones.split(",") if r.strip()]
+    unknown = [r for r in resolutions if r not in RESOLUTIONS]
+    cases = [c.strip() for c in args.casos.split(",")] if args.casos else case_names()
+    unknown += [c for c in cases if c not in case_names()]
+    if unknown:
+        print(f"ERROR: desconocidos: {', '.join(unknown)}. Casos: {', '.join(case_names())}")
+        sys.exit(2)
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        assets = temp_dir / "assets"
+        assets.mkdir()
+        make_assets(assets)
+
+        max_photos = max(build_case(case, assets)[0]["num_photos"] for case in cases)
+        photo_dirs: Dict[Tuple[str, str], Path] = {}
+
+        print(f"Papel {args.papel} a {args.dpi:g} DPI, backend {args.backend}, mejor de {args.repeat}")
+        header = f"{'Caso':<28}{'res':>7}{'total':>9}" + "".join(f"{s:>9}" for s in STAGES)
+        print(header + f"{'RSS':>8}{'ΔE med':>8}{'ΔE p99':>8}  estado")
+
+        for resolution in resolutions:
+            for case in cases:
+                _, orientation = build_case(case, assets)
+                key = (resolution, orientation)
+                if key not in photo_dirs:
+                    photo_dirs[key] = temp_dir / f"fotos_{resolution}_{orientation}"
+                    photo_dirs[key].mkdir()
+                    make_photos(photo_dirs[key], max_photos, photo_size(resolution, orientation))
+
+                output_dir = temp_dir / "salida"
+                output_dir.mkdir(exist_ok=True)
+                command = [
+                    sys.executable, "-m", "benchmarks.bench_suite",
+                    "--caso", case, "--fotos", str(photo_dirs[key]), "--assets", str(assets),
+                    "--salida", str(output_dir), "--cache", str(temp_dir / "cache"), "--repeat", str(args.repeat), "--papel", args.papel,
+                    "--dpi", str(args.dpi), "--workers", str(args.workers), "--backend", args.backend,
+                ]
+                completed = subprocess.run(command, cwd=BENCHMARKS_DIR.parent, capture_output=True, text=True)
+                result = {"case": case, "resolution": resolution, "photos": "x".join(
+                    str(v) for v in photo_size(resolution, orientation)
+                )}
+                try:
+                    result.update(json.loads(completed.stdout.strip().splitlines()[-1]))
+                except (IndexError, ValueError):
+                    result.update({"ok": False, "error": completed.stderr.strip()[-500:]})
+
+                if result.get("ok"):
+                    golden = golden_path(args.golden_dir, case, resolution, args.papel, args.dpi)
+                    result["golden"] = compare_golden(result, output_dir / "reducido.png", golden, args)
+                    stages = "".join(f"{result['stages_ms'][s]:>9.0f}" for s in STAGES)
+                    golden_result = result["golden"]
+                    mean = f"{golden_result['mean_delta_e']:>8.2f}" if "mean_delta_e" in golden_result else f"{'-':>8}"
+                    p99 = f"{golden_result['p99_delta_e']:>8.2f}" if "p99_delta_e" in golden_result else f"{'-':>8}"
+                    print(
+                        f"{case:<28}{resolution:>7}{result['best_ms']:>9.0f}{stages}"
+                        f"{result['peak_rss_mb']:>7.0f}M{mean}{p99}  {golden_result['status']}"
+                    )
+                else:
+                    print(f"{case:<28}{resolution:>7}  ERROR al renderizar")
+                results.append(result)
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps({
+            "environment": environment(),
+            "settings": {
+                "paper": args.papel,
+                "dpi": args.dpi,
+                "backend": args.backend,
+                "workers": args.workers,
+                "repeat": args.repeat,
+                "max_mean_delta_e": args.max_mean_delta_e,
+                "max_p99_delta_e": args.max_p99_delta_e,
+            },
+            "results": results,
+        }, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResultados: {args.json}")
+
+    if args.base:
+        print_comparison(results, args.base)
+
+    failed = [r for r in results if not r.get("ok") or r["golden"]["status"] == "falla"]
+    if failed:
+        print(f"ERROR: {len(failed)} casos con error o fuera de tolerancia")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: póster de gran formato con render completo y por bandas
+
+Renderiza una plantilla predeterminada como póster (por defecto 60x90 cm a
+300 DPI) con CollageGenerator.generate() y con generate_tiled(), cada modo en
+un proceso aparte para medir su pico de memoria (RSS; ver benchmarks/memory.py),
+y compara ambos resultados píxel a píxel.
+
+Uso:
+    python -m benchmarks.bench_tiled_poster [--papel 60x90] [--dpi 300] [--banda 256] [--memoria 16]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_frame_decode import make_photos  # noqa: E402
+from benchmarks.memory import peak_rss_mb  # noqa: E402
+from utils import CollageGenerator, poster_target  # noqa: E402
+from utils.collage_templates import get_default_templates  # noqa: E402
+
+
+def run_mode(args):
+    """Renderiza en este proceso e imprime el resultado como JSON"""
+    template = next(t for t in get_default_templates() if t["nombre"] == args.plantilla)
+    photos = sorted(str(path) for path in Path(args.fotos).glob("*.jpg"))
+    generator = CollageGenerator(template, target=poster_target(args.papel, args.dpi))
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if args.mode == "full":
+        ok = generator.generate(photos, Path(args.output).with_suffix(".jpg"))
+    else:
+        ok = generator.generate_tiled(photos, args.output, band_height=args.banda, memory_factor=args.memoria)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+
+    # Copia sin pérdida del canvas completo para comparar (fuera de la medición)
+    if ok and args.mode == "full":
+        generator.get_canvas().save(args.output)
+
+    canvas = generator.template["canvas"]
+    print(json.dumps({
+        "ok": bool(ok),
+        "seconds": elapsed,
+        "baseline_mb": baseline,
+        "peak_mb": peak,
+        "size": [canvas["width"], canvas["height"]],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plantilla", default="6 Fotos Grid", help="Nombre de la plantilla predeterminada")
+    parser.add_argument("--papel", default="60x90", help="Papel del póster en cm")
+    parser.add_argument("--dpi", type=float, default=300, help="Resolución del póster")
+    parser.add_argument("--banda", type=int, default=256, help="Filas por banda")
+    parser.add_argument("--memoria", type=float, default=16, help="Presupuesto de fotos decodificadas, en bandas")
+    parser.add_argument("--resolution", default="3840x2160", help="Resolución de las fotos")
+    parser.add_argument("--mode", choices=["full", "tiled"], help=argparse.SUPPRESS)
+    parser.add_argument("--fotos", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    from PIL import Image
+    import numpy as np
+
+    Image.MAX_IMAGE_PIXELS = None
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    template = next(t for t in get_default_templates() if t["nombre"] == args.plantilla)
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        photos_dir = temp_dir / "fotos"
+        photos_dir.mkdir()
+        make_photos(photos_dir, template["num_photos"], (width, height))
+
+        results = {}
+        for mode, name in (("full", "full.tif"), ("tiled", "tiled.tif")):
+            output = temp_dir / name
+            command = [
+                sys.executable, "-m", "benchmarks.bench_tiled_poster",
+                "--mode", mode, "--fotos", str(photos_dir), "--output", str(output),
+                "--plantilla", args.plantilla, "--papel", args.papel, "--dpi", str(args.dpi),
+                "--banda", str(args.banda), "--memoria", str(args.memoria),
+            ]
+            completed = subprocess.run(
+                command, cwd=Path(__file__).resolve().parent.parent,
+                capture_output=True, text=True, check=True
+            )
+            results[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+            results[mode]["output"] = output
+            if not results[mode]["ok"]:
+                print(f"ERROR: el modo {mode} no generó el póster")
+                sys.exit(1)
+
+        poster_width, poster_height = results["full"]["size"]
+        band_mb = poster_width * args.banda * 3 / 2 ** 20
+        print(
+            f"{args.plantilla} en {args.papel} cm a {args.dpi:g} DPI: {poster_width}x{poster_height} "
+            f"({poster_width * poster_height * 3 / 2 ** 20:.0f} MB RGB), banda {args.banda} filas ({band_mb:.1f} MB)"
+        )
+        print(f"{'Modo':<10}{'tiempo':>10}{'pico RSS':>12}{'sobre base':>13}")
+        for mode in ("full", "tiled"):
+            result = results[mode]
+            print(
+                f"{mode:<10}{result['seconds']:>9.1f}s{result['peak_mb']:>10.0f}MB"
+                f"{result['peak_mb'] - result['baseline_mb']:>11.0f}MB"
+            )
+
+        # Comparar por franjas para no duplicar la memoria del póster
+        full = Image.open(results["full"]["output"])
+        tiled = Image.open(results["tiled"]["output"])
+        max_delta = 0
+        for top in range(0, poster_height, 1024):
+            box = (0, top, poster_width, min(top + 1024, poster_height))
+            a = np.asarray(full.crop(box).convert("RGB"), dtype=np.int16)
+            b = np.asarray(tiled.crop(box).convert("RGB"), dtype=np.int16)
+            max_delta = max(max_delta, int(np.abs(a - b).max()))
+        print(f"Diferencia máxima por píxel entre ambos modos: {max_delta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Pico de memoria del proceso para los benchmarks que corren cada caso en un
+proceso aparte (bench_suite, bench_tiled_poster)
+
+- Linux/macOS: ru_maxrss de resource (RSS)
+- Windows: peak_wset de psutil, si está instalado
+- Si no: pico de tracemalloc, que solo cuenta la memoria reservada por Python
+  y numpy (no la de Pillow ni OpenCV)
+"""
+import sys
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def peak_rss_mb() -> float:
+    """Pico de memoria del proceso en MB (ver el docstring del módulo)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB y macOS bytes
+        return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        # peak_wset solo existe en Windows
+        return getattr(memory, "peak_wset", memory.rss) / (1024 * 1024)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
@@ -25,6 +25,16 @@ COMPANY_NAME = "DivertyCam"
 # Configuración de cámara
 CAMERA_SETTINGS = {
     'default_resolution': '1280x720',
+    'preview_resolution': '1280x720',  # Resolución del stream de preview (la foto usa la configurada)
+    'dual_stream': 'auto',  # auto, switch, decimate
+    'zero_shutter_lag': True,  # Elegir del pre-roll el frame del instante del disparo
+    'zsl_preroll_frames': 8,  # Frames conservados en el pre-roll
+    'zsl_sharpest_of': 3,  # Elegir el más nítido entre N vecinos (1 = desactivado)
+    'mjpeg_passthrough': True,  # Guardar el JPEG de la cámara sin decodificar/recodificar
+    # Cámara sin hardware para pruebas: 'synthetic' o 'replay' (con la ruta en camera_source)
+    'camera_type_override': os.environ.get('DIVERTYCAM_CAMERA_TYPE'),
+    'camera_source': os.environ.get('DIVERTYCAM_CAMERA_SOURCE'),
+    'camera_fps': float(os.environ.get('DIVERTYCAM_CAMERA_FPS', '30')),
     'default_camera_type': 'webcam',
     'capture_timeout': 30,
     'connection_timeout': 10,
@@ -33,15 +43,31 @@ CAMERA_SETTINGS = {
 # Configuración de impresión
 PRINT_SETTINGS = {
     'default_paper_size': '10x15',
+    # Resolución a la que se renderiza el master de impresión
+    'dpi': int(os.environ.get('DIVERTYCAM_PRINT_DPI', '300')),
+    # Conversión al perfil ICC de la impresora (<carpeta>/<impresora>.icc):
+    # 'perceptual', 'relative', 'saturation' o 'absolute'
+    'rendering_intent': os.environ.get('DIVERTYCAM_RENDERING_INTENT', 'perceptual'),
+    # Carpeta de los perfiles ICC (vacío = media/icc_profiles)
+    'icc_profiles_dir': os.environ.get('DIVERTYCAM_ICC_PROFILES_DIR', ''),
     'default_quality': 'high',
     'auto_print': False,
 }
 
+# Configuración de generación de collages
+COLLAGE_SETTINGS = {
+    # Hilos para procesar los marcos en paralelo (0 = automático, 1 = en serie)
+    'render_workers': int(os.environ.get('DIVERTYCAM_RENDER_WORKERS', '0')),
+    # Backend de render: 'pil' (LANCZOS) u 'opencv' (cv2.resize INTER_AREA + numpy)
+    'render_backend': os.environ.get('DIVERTYCAM_RENDER_BACKEND', 'pil'),
+}
+
 # Configuración de photobooth
 PHOTOBOOTH_SETTINGS = {
     'countdown_time': 3,
     'time_between_photos': 3,
     'default_max_photos': 4,
+    'mirror_preview': True,
 }
 
 # Rutas de medios
@@ -3,5 +3,33 @@ Controladores de cámara
 """
 from .camera_manager import CameraManager
 from .base_camera import BaseCamera
+from .capture_engine import CaptureEngine, FrameRingBuffer
+from .synthetic_camera import SyntheticCamera
+from .replay_camera import ReplayCamera
+from .session_engine import (
+    SessionEngine,
+    SessionState,
+    SessionTimings,
+    SessionListener,
+    SessionStorage,
+    SessionClock,
+    ManualClock,
+    MemorySessionStorage,
+)
 
-__all__ = ['CameraManager', 'BaseCamera']
+__all__ = [
+    'CameraManager',
+    'BaseCamera',
+    'CaptureEngine',
+    'FrameRingBuffer',
+    'SyntheticCamera',
+    'ReplayCamera',
+    'SessionEngine',
+    'SessionState',
+    'SessionTimings',
+    'SessionListener',
+    'SessionStorage',
+    'SessionClock',
+    'ManualClock',
+    'MemorySessionStorage',
+]
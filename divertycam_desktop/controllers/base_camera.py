@@ -2,16 +2,39 @@
 Clase base abstracta para controladores de cámara
 """
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+import numpy as np
 from PIL import Image
 
 
+def parse_resolution(resolution, default: Tuple[int, int] = (1280, 720)) -> Tuple[int, int]:
+    """Convierte '1280x720' en (1280, 720)"""
+    if isinstance(resolution, str) and 'x' in resolution:
+        width, height = resolution.split('x')
+        return int(width), int(height)
+    return default
+
+
+def parse_camera_index(camera_id, default: int = 0) -> int:
+    """Convierte PhotoboothConfig.camera_id ('1') en el índice de la webcam"""
+    if isinstance(camera_id, int):
+        return camera_id
+    if isinstance(camera_id, str) and camera_id.strip().isdigit():
+        return int(camera_id.strip())
+    return default
+
+
 class BaseCamera(ABC):
     """Clase base para todos los controladores de cámara"""
 
+    # Modos de operación
+    MODE_PREVIEW = 'preview'  # Stream reducido para la vista previa
+    MODE_STILL = 'still'      # Resolución completa para la foto
+
     def __init__(self):
         self.is_connected = False
         self.camera_info = {}
+        self.mode = self.MODE_PREVIEW
 
     @abstractmethod
     def connect(self) -> bool:
@@ -33,6 +56,43 @@ class BaseCamera(ABC):
         """Obtiene una vista previa en tiempo real"""
         pass
 
+    def capture_at(self, shutter_time: float, sharpest_of: int = 1) -> Optional[Image.Image]:
+        """
+        Captura la imagen correspondiente a un instante de disparo (zero shutter lag)
+
+        Args:
+            shutter_time: Instante del disparo (time.monotonic)
+            sharpest_of: Elegir el más nítido entre esta cantidad de frames vecinos
+
+        Las cámaras sin pre-roll capturan en el momento de la llamada.
+        """
+        return self.capture()
+
+    def get_capture_jpeg(self, image: Image.Image) -> Optional[bytes]:
+        """
+        Retorna el bitstream JPEG original de una imagen capturada, si la cámara
+        lo entregó comprimido (MJPEG). Permite guardar la foto sin recodificarla.
+
+        Args:
+            image: Imagen retornada por capture() o capture_at()
+
+        Returns:
+            Bytes JPEG, o None si la imagen no proviene de un frame comprimido
+        """
+        return None
+
+    def get_preview_frame(self) -> Optional[np.ndarray]:
+        """
+        Obtiene el frame de preview como array numpy BGR (convención OpenCV)
+
+        Las implementaciones que ya trabajan con arrays deben sobrescribirlo
+        para evitar la conversión desde PIL.
+        """
+        preview = self.get_preview()
+        if preview is None:
+            return None
+        return np.ascontiguousarray(np.asarray(preview.convert('RGB'))[:, :, ::-1])
+
     @abstractmethod
     def get_settings(self) -> Dict:
         """Obtiene las configuraciones disponibles"""
@@ -43,6 +103,22 @@ class BaseCamera(ABC):
         """Configura un parámetro de la cámara"""
         pass
 
+    def set_mode(self, mode: str) -> bool:
+        """
+        Cambia entre modo preview y modo foto
+
+        Las cámaras sin doble stream solo registran el modo; capture()
+        siempre retorna la imagen a resolución completa.
+        """
+        if mode not in (self.MODE_PREVIEW, self.MODE_STILL):
+            return False
+        self.mode = mode
+        return True
+
+    def get_capture_stats(self) -> Dict:
+        """Retorna estadísticas de captura (fps, frames perdidos, etc.)"""
+        return {}
+
     def get_camera_info(self) -> Dict:
         """Retorna información de la cámara"""
         return self.camera_info
@@ -0,0 +1,221 @@
+"""
+Clase base para cámaras que generan frames BGR a un ritmo fijo
+Usada por las cámaras sintética y de reproducción (sin hardware)
+"""
+import logging
+import time
+from abc import abstractmethod
+from typing import Optional, Dict, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .base_camera import BaseCamera, parse_resolution
+from .capture_engine import CaptureEngine, select_zsl_frame
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedCamera(BaseCamera):
+    """
+    Cámara cuyos frames se producen en el hilo de un CaptureEngine
+
+    Las subclases implementan _open() y _read_next(); esta clase se encarga
+    del ritmo (fps), del buffer y de capture/preview/zero shutter lag.
+    """
+
+    camera_type = 'buffered'
+
+    def __init__(self, resolution='1280x720', fps: float = 30.0, buffer_size: int = 4):
+        """
+        Args:
+            resolution: Resolución de los frames generados (ej: '1280x720')
+            fps: Frames por segundo (0 = sin límite, para medir throughput)
+            buffer_size: Capacidad del buffer circular / pre-roll
+        """
+        super().__init__()
+        self.resolution_width, self.resolution_height = parse_resolution(resolution)
+        self.fps = fps
+        self.buffer_size = buffer_size
+
+        self.capture_engine: Optional[CaptureEngine] = None
+        self.last_shutter_latency: Optional[float] = None
+        self._next_frame_time = 0.0
+
+        self.camera_info = {
+            'type': self.camera_type,
+            'name': self.camera_type,
+            'resolution': f'{self.resolution_width}x{self.resolution_height}'
+        }
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.resolution_width, self.resolution_height
+
+    @abstractmethod
+    def _open(self) -> bool:
+        """Prepara la fuente de frames"""
+        pass
+
+    @abstractmethod
+    def _read_next(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Produce el siguiente frame BGR a la resolución configurada"""
+        pass
+
+    def _close(self):
+        """Libera la fuente de frames"""
+        pass
+
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Lee un frame respetando los fps configurados (ejecutado en el hilo de captura)"""
+        if self.fps and self.fps > 0:
+            interval = 1.0 / self.fps
+            now = time.monotonic()
+            if self._next_frame_time > now:
+                time.sleep(self._next_frame_time - now)
+            # No acumular retraso si la generación es más lenta que los fps
+            self._next_frame_time = max(self._next_frame_time + interval, time.monotonic() - interval)
+
+        return self._read_next()
+
+    def _fit_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Redimensiona un frame a la resolución configurada si es necesario"""
+        if (frame.shape[1], frame.shape[0]) == self.size:
+            return frame
+        return cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+
+    def connect(self) -> bool:
+        """Abre la fuente e inicia el hilo de captura"""
+        try:
+            if not self._open():
+                logger.error(f"No se pudo abrir la cámara {self.camera_type}")
+                return False
+
+            self._next_frame_time = time.monotonic()
+            self.capture_engine = CaptureEngine(
+                self._read_frame,
+                buffer_size=self.buffer_size,
+                name=self.camera_type
+            )
+            self.capture_engine.start()
+
+            if self.capture_engine.wait_for_frame(timeout=2.0) is None:
+                logger.error(f"La cámara {self.camera_type} no produjo frames")
+                self.disconnect()
+                return False
+
+            self.is_connected = True
+            logger.info(
+                f"Cámara {self.camera_type} conectada: "
+                f"{self.resolution_width}x{self.resolution_height} @ {self.fps} fps"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error conectando cámara {self.camera_type}: {e}")
+            return False
+
+    def disconnect(self):
+        """Detiene el hilo de captura y libera la fuente"""
+        try:
+            if self.capture_engine:
+                self.capture_engine.stop()
+                self.capture_engine = None
+            self._close()
+            self.is_connected = False
+            logger.info(f"Cámara {self.camera_type} desconectada")
+        except Exception as e:
+            logger.error(f"Error desconectando cámara {self.camera_type}: {e}")
+
+    @staticmethod
+    def _frame_to_image(frame: np.ndarray) -> Image.Image:
+        """Convierte un frame BGR a PIL Image"""
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def capture(self) -> Optional[Image.Image]:
+        """Retorna el frame más reciente como PIL Image"""
+        if not self.is_connected or not self.capture_engine:
+            logger.error(f"Cámara {self.camera_type} no conectada")
+            return None
+
+        item = self.capture_engine.latest_frame()
+        if item is None:
+            logger.error("No hay frames disponibles")
+            return None
+
+        image = self._frame_to_image(item.frame)
+        logger.info(f"Imagen capturada: {image.size}")
+        return image
+
+    def capture_at(self, shutter_time: float, sharpest_of: int = 1) -> Optional[Image.Image]:
+        """Retorna el frame del pre-roll más cercano al instante del disparo"""
+        if not self.is_connected or not self.capture_engine:
+            logger.error(f"Cámara {self.camera_type} no conectada")
+            return None
+
+        self.capture_engine.wait_until(shutter_time)
+        item = select_zsl_frame(self.capture_engine.buffer.snapshot(), shutter_time, sharpest_of)
+        if item is None:
+            return self.capture()
+
+        self.last_shutter_latency = item.timestamp - shutter_time
+        image = self._frame_to_image(item.frame)
+        logger.info(
+            f"Imagen capturada (ZSL): {image.size}, frame {item.index}, "
+            f"latencia disparo->frame {self.last_shutter_latency * 1000:+.0f} ms"
+        )
+        return image
+
+    def get_preview(self) -> Optional[Image.Image]:
+        """Retorna el frame más reciente para el preview"""
+        frame = self.get_preview_frame()
+        return self._frame_to_image(frame) if frame is not None else None
+
+    def get_preview_frame(self) -> Optional[np.ndarray]:
+        """Retorna el frame BGR más reciente sin copiarlo"""
+        if not self.is_connected or not self.capture_engine:
+            return None
+        item = self.capture_engine.latest_frame()
+        return item.frame if item is not None else None
+
+    def get_capture_stats(self) -> Dict:
+        """Retorna estadísticas del motor de captura"""
+        if not self.capture_engine:
+            return {}
+        stats = self.capture_engine.get_stats()
+        stats['mode'] = self.mode
+        if self.last_shutter_latency is not None:
+            stats['shutter_latency_ms'] = round(self.last_shutter_latency * 1000, 1)
+        return stats
+
+    def get_settings(self) -> Dict:
+        """Retorna la configuración actual"""
+        if not self.is_connected:
+            return {}
+        stats = self.get_capture_stats()
+        return {
+            'resolution': f'{self.resolution_width}x{self.resolution_height}',
+            'fps': self.fps,
+            'capture_fps': stats.get('fps', 0.0),
+            'frames_dropped': stats.get('frames_dropped', 0),
+        }
+
+    def set_setting(self, setting: str, value) -> bool:
+        """Configura fps o resolución"""
+        try:
+            if setting == 'fps':
+                self.fps = float(value)
+            elif setting == 'resolution':
+                self.resolution_width, self.resolution_height = parse_resolution(value, self.size)
+                self.camera_info['resolution'] = f'{self.resolution_width}x{self.resolution_height}'
+            else:
+                logger.warning(f"Configuración no soportada: {setting}")
+                return False
+
+            logger.info(f"Configuración {setting} = {value}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error configurando {setting}: {e}")
+            return False
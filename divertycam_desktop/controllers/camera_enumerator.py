@@ -0,0 +1,201 @@
+"""
+Servicio de enumeración de webcams
+Lista los dispositivos sin abrirlos cuando es posible (sysfs en Linux), sondea
+los candidatos en paralelo con timeout y cachea el resultado hasta detectar
+un cambio de hardware (conexión/desconexión)
+"""
+import logging
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+import cv2
+
+from .webcam_capabilities import get_device_key
+
+logger = logging.getLogger(__name__)
+
+SYSFS_VIDEO_DIR = Path("/sys/class/video4linux")
+
+# Índices a probar cuando no se puede listar el hardware
+MAX_CAMERA_INDEX = 10
+
+# Tiempo máximo para el sondeo de todos los candidatos
+PROBE_TIMEOUT = 3.0
+
+# Sin detección de hot-plug, los resultados caducan tras este tiempo
+CACHE_TTL = 30.0
+
+
+def list_sysfs_candidates(sysfs_dir: Path = SYSFS_VIDEO_DIR) -> Optional[List[Dict]]:
+    """
+    Lista los nodos /dev/video* de captura leyendo sysfs, sin abrirlos
+
+    Returns:
+        Lista de candidatos, o None si sysfs no está disponible
+    """
+    if not sys.platform.startswith('linux') or not sysfs_dir.exists():
+        return None
+
+    candidates = []
+    for node in sysfs_dir.iterdir():
+        match = re.fullmatch(r'video(\d+)', node.name)
+        if not match:
+            continue
+
+        index = int(match.group(1))
+
+        # Los drivers UVC crean un segundo nodo de metadatos por cámara (index != 0)
+        try:
+            node_index = (node / "index").read_text().strip()
+            if node_index and node_index != '0':
+                continue
+        except OSError:
+            pass
+
+        try:
+            name = (node / "name").read_text().strip()
+        except OSError:
+            name = f'Webcam {index}'
+
+        candidates.append({
+            'index': index,
+            'name': name,
+            'path': f'/dev/video{index}',
+            'device_key': get_device_key(index),
+        })
+
+    return sorted(candidates, key=lambda c: c['index'])
+
+
+def probe_camera(index: int) -> bool:
+    """Abre la cámara y verifica que entregue un frame"""
+    cap = cv2.VideoCapture(index)
+    try:
+        if not cap.isOpened():
+            return False
+        ret, _ = cap.read()
+        return bool(ret)
+    finally:
+        cap.release()
+
+
+class CameraEnumerator:
+    """Enumera webcams en paralelo y cachea el resultado por identidad de dispositivo"""
+
+    def __init__(self, probe_timeout: float = PROBE_TIMEOUT, max_workers: int = 4):
+        self.probe_timeout = probe_timeout
+        self.max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self._cached: Optional[List[Dict]] = None
+        self._cached_signature: Optional[Tuple] = None
+        self._cached_at = 0.0
+
+    def _get_candidates(self) -> Tuple[List[Dict], bool]:
+        """
+        Candidatos a sondear
+
+        Returns:
+            (candidatos, True si provienen de sysfs)
+        """
+        candidates = list_sysfs_candidates()
+        if candidates is not None:
+            return candidates, True
+
+        return [
+            {'index': i, 'name': f'Webcam {i}', 'path': None, 'device_key': f'index:{i}'}
+            for i in range(MAX_CAMERA_INDEX)
+        ], False
+
+    @staticmethod
+    def _signature(candidates: List[Dict]) -> Tuple:
+        """Firma del hardware conectado: cambia con cada conexión/desconexión"""
+        return tuple((c['index'], c['device_key']) for c in candidates)
+
+    def _probe_all(self, candidates: List[Dict]) -> List[Dict]:
+        """Sondea los candidatos en paralelo; los que no respondan a tiempo se descartan"""
+        if not candidates:
+            return []
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(candidates)))
+        try:
+            futures = {executor.submit(probe_camera, c['index']): c for c in candidates}
+            done, not_done = wait(futures, timeout=self.probe_timeout)
+
+            for future in not_done:
+                logger.warning(f"Timeout sondeando cámara {futures[future]['index']}")
+
+            available = []
+            for future in done:
+                candidate = futures[future]
+                try:
+                    if future.result():
+                        available.append({
+                            'index': candidate['index'],
+                            'type': 'webcam',
+                            'name': candidate['name'],
+                            'path': candidate['path'],
+                            'device_key': candidate['device_key'],
+                        })
+                except Exception as e:
+                    logger.debug(f"Error sondeando cámara {candidate['index']}: {e}")
+
+            return sorted(available, key=lambda c: c['index'])
+
+        finally:
+            # No esperar a los sondeos colgados: terminarán en segundo plano
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def enumerate(self, force: bool = False) -> List[Dict]:
+        """
+        Lista las webcams disponibles
+
+        Args:
+            force: Ignorar la caché y volver a sondear
+
+        Returns:
+            Lista de cámaras: {'index', 'type', 'name', 'path', 'device_key'}
+        """
+        with self._lock:
+            candidates, hotplug_aware = self._get_candidates()
+            signature = self._signature(candidates)
+
+            if not force and self._cached is not None:
+                if hotplug_aware and signature == self._cached_signature:
+                    return list(self._cached)
+                if not hotplug_aware and time.monotonic() - self._cached_at < CACHE_TTL:
+                    return list(self._cached)
+
+            start = time.perf_counter()
+            cameras = self._probe_all(candidates)
+            logger.info(
+                f"Enumeración de cámaras: {len(cameras)}/{len(candidates)} disponibles "
+                f"en {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+
+            self._cached = cameras
+            self._cached_signature = signature
+            self._cached_at = time.monotonic()
+            return list(cameras)
+
+    def invalidate(self):
+        """Descarta la caché"""
+        with self._lock:
+            self._cached = None
+            self._cached_signature = None
+
+
+_default_enumerator: Optional[CameraEnumerator] = None
+
+
+def get_camera_enumerator() -> CameraEnumerator:
+    """Enumerador compartido por toda la aplicación (conserva la caché)"""
+    global _default_enumerator
+    if _default_enumerator is None:
+        _default_enumerator = CameraEnumerator()
+    return _default_enumerator
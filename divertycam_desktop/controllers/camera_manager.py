@@ -7,6 +7,9 @@ from enum import Enum
 
 from .base_camera import BaseCamera
 from .webcam_camera import WebcamCamera
+from .synthetic_camera import SyntheticCamera
+from .replay_camera import ReplayCamera
+from .camera_enumerator import get_camera_enumerator
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +20,8 @@ class CameraType(Enum):
     NIKON_DSLR = "nikon_dslr"
     USB_PTP = "usb_ptp"
     WINDOWS_CAMERA = "windows_camera"
+    SYNTHETIC = "synthetic"  # Patrones generados (pruebas sin hardware)
+    REPLAY = "replay"        # Video o carpeta de imágenes (pruebas sin hardware)
 
 
 class CameraManager:
@@ -26,13 +31,18 @@ class CameraManager:
         self.current_camera: Optional[BaseCamera] = None
         self.camera_type: Optional[CameraType] = None
 
-    def detect_cameras(self) -> List[Dict]:
-        """Detecta todas las cámaras disponibles en el sistema"""
+    def detect_cameras(self, force: bool = False) -> List[Dict]:
+        """
+        Detecta todas las cámaras disponibles en el sistema
+
+        Args:
+            force: Ignorar la caché de enumeración y volver a sondear
+        """
         cameras = []
 
-        # Detectar webcams
+        # Detectar webcams (en paralelo y con caché hasta un cambio de hardware)
         try:
-            webcams = WebcamCamera.list_available_cameras()
+            webcams = get_camera_enumerator().enumerate(force=force)
             cameras.extend(webcams)
         except Exception as e:
             logger.error(f"Error detectando webcams: {e}")
@@ -55,13 +65,24 @@ class CameraManager:
             camera_index: Índice de la cámara (para webcams)
             resolution: Resolución de la cámara (ej: '1280x720', '1920x1080')
             **kwargs: Parámetros adicionales específicos del tipo de cámara
+                (ej: 'source' y 'fps' para las cámaras sintética y de reproducción)
 
         Returns:
             Instancia de BaseCamera o None si hay error
         """
         try:
             if camera_type == CameraType.WEBCAM.value:
-                return WebcamCamera(camera_index, resolution=resolution)
+                return WebcamCamera(camera_index, resolution=resolution, **kwargs)
+
+            elif camera_type == CameraType.SYNTHETIC.value:
+                return SyntheticCamera(resolution=resolution, **kwargs)
+
+            elif camera_type == CameraType.REPLAY.value:
+                source = kwargs.pop('source', None)
+                if not source:
+                    logger.error("La cámara de reproducción requiere 'source' (video o carpeta)")
+                    return None
+                return ReplayCamera(source, resolution=resolution, **kwargs)
 
             elif camera_type == CameraType.NIKON_DSLR.value:
                 # TODO: Implementar cuando esté listo
@@ -0,0 +1,388 @@
+"""
+Motor de captura en hilo dedicado
+Lee frames de la cámara fuera del hilo de la GUI y los guarda en un buffer circular
+"""
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Callable, Tuple
+
+import cv2
+import numpy as np
+
+from .mjpeg import jpeg_size
+
+logger = logging.getLogger(__name__)
+
+# Función de lectura: retorna (ok, frame) igual que cv2.VideoCapture.read()
+ReadFunction = Callable[[], Tuple[bool, Optional[np.ndarray]]]
+
+# Transformación opcional para derivar el frame de preview (ej: reducir resolución)
+PreviewTransform = Callable[[np.ndarray], np.ndarray]
+
+# Decodificador de preview para frames comprimidos (bytes JPEG -> BGR)
+EncodedPreviewDecoder = Callable[[bytes], Optional[np.ndarray]]
+
+
+@dataclass
+class TimestampedFrame:
+    """
+    Frame capturado con su marca de tiempo (time.monotonic)
+
+    Si la cámara entrega el bitstream comprimido (MJPEG), se guarda en
+    'encoded' y los píxeles a resolución completa solo se decodifican la
+    primera vez que se accede a 'frame'.
+    """
+    pixels: Optional[np.ndarray]
+    timestamp: float
+    index: int
+    preview: Optional[np.ndarray] = None
+    encoded: Optional[bytes] = None
+    size: Optional[Tuple[int, int]] = None
+
+    def __post_init__(self):
+        if self.size is None and self.pixels is not None:
+            self.size = (self.pixels.shape[1], self.pixels.shape[0])
+
+    @property
+    def frame(self) -> Optional[np.ndarray]:
+        """Píxeles BGR a resolución completa (decodificados bajo demanda)"""
+        if self.pixels is None and self.encoded is not None:
+            self.pixels = cv2.imdecode(np.frombuffer(self.encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return self.pixels
+
+    @property
+    def preview_frame(self) -> np.ndarray:
+        """Frame para preview (reducido si hay uno disponible)"""
+        return self.preview if self.preview is not None else self.frame
+
+
+# Ancho máximo de la copia reducida usada para medir el enfoque
+FOCUS_MEASURE_WIDTH = 320
+
+
+def focus_measure(frame: np.ndarray) -> float:
+    """
+    Medida de nitidez barata: varianza del Laplaciano sobre una copia reducida
+    en escala de grises. Valores mayores indican una imagen más nítida.
+    """
+    height, width = frame.shape[:2]
+    if width > FOCUS_MEASURE_WIDTH:
+        scale = FOCUS_MEASURE_WIDTH / width
+        frame = cv2.resize(frame, (FOCUS_MEASURE_WIDTH, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def select_zsl_frame(
+    frames: List['TimestampedFrame'],
+    shutter_time: float,
+    sharpest_of: int = 1
+) -> Optional['TimestampedFrame']:
+    """
+    Elige el frame del pre-roll más cercano al instante del disparo
+
+    Args:
+        frames: Frames candidatos, del más antiguo al más nuevo
+        shutter_time: Instante del disparo (time.monotonic)
+        sharpest_of: Si es mayor que 1, elige el más nítido entre esa cantidad
+            de frames vecinos al más cercano
+
+    Returns:
+        Frame elegido, o None si no hay candidatos
+    """
+    if not frames:
+        return None
+
+    closest = min(range(len(frames)), key=lambda i: abs(frames[i].timestamp - shutter_time))
+    if sharpest_of <= 1:
+        return frames[closest]
+
+    # Ventana de vecinos centrada en el frame más cercano
+    start = max(0, closest - sharpest_of // 2)
+    end = min(len(frames), start + sharpest_of)
+    start = max(0, end - sharpest_of)
+
+    return max(frames[start:end], key=lambda item: focus_measure(item.preview_frame))
+
+
+class FrameRingBuffer:
+    """Buffer circular thread-safe que conserva los últimos N frames"""
+
+    def __init__(self, capacity: int = 4, fps_window: int = 30):
+        """
+        Args:
+            capacity: Número máximo de frames almacenados
+            fps_window: Número de frames usados para calcular los FPS
+        """
+        self.capacity = max(1, capacity)
+        self._frames = deque(maxlen=self.capacity)
+        self._timestamps = deque(maxlen=max(2, fps_window))
+        self._lock = threading.Lock()
+
+        self._next_index = 0
+        self._last_consumed_index = -1
+        self.frames_captured = 0
+        self.frames_dropped = 0
+
+    def push(
+        self,
+        frame: Optional[np.ndarray],
+        timestamp: Optional[float] = None,
+        preview: Optional[np.ndarray] = None,
+        encoded: Optional[bytes] = None,
+        size: Optional[Tuple[int, int]] = None
+    ) -> TimestampedFrame:
+        """Agrega un frame al buffer, descartando el más antiguo si está lleno"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        with self._lock:
+            # El frame más reciente nunca fue consumido: se pierde
+            if self._frames and self._frames[-1].index > self._last_consumed_index:
+                self.frames_dropped += 1
+
+            item = TimestampedFrame(
+                pixels=frame,
+                timestamp=timestamp,
+                index=self._next_index,
+                preview=preview,
+                encoded=encoded,
+                size=size
+            )
+            self._next_index += 1
+            self._frames.append(item)
+            self._timestamps.append(timestamp)
+            self.frames_captured += 1
+
+        return item
+
+    def latest(self) -> Optional[TimestampedFrame]:
+        """Retorna el frame más reciente y lo marca como consumido"""
+        with self._lock:
+            if not self._frames:
+                return None
+
+            item = self._frames[-1]
+            self._last_consumed_index = max(self._last_consumed_index, item.index)
+            return item
+
+    def snapshot(self) -> List[TimestampedFrame]:
+        """Retorna una copia de los frames almacenados (del más antiguo al más nuevo)"""
+        with self._lock:
+            return list(self._frames)
+
+    def fps(self) -> float:
+        """Calcula los FPS reales sobre la ventana de frames recientes"""
+        with self._lock:
+            if len(self._timestamps) < 2:
+                return 0.0
+
+            elapsed = self._timestamps[-1] - self._timestamps[0]
+            if elapsed <= 0:
+                return 0.0
+
+            return (len(self._timestamps) - 1) / elapsed
+
+    def clear(self):
+        """Vacía el buffer (los contadores se conservan)"""
+        with self._lock:
+            self._frames.clear()
+            self._timestamps.clear()
+
+    def get_stats(self) -> Dict:
+        """Retorna contadores del buffer"""
+        fps = self.fps()
+        with self._lock:
+            return {
+                'frames_captured': self.frames_captured,
+                'frames_dropped': self.frames_dropped,
+                'buffered': len(self._frames),
+                'capacity': self.capacity,
+                'fps': round(fps, 2),
+            }
+
+
+class CaptureEngine:
+    """Ejecuta la lectura de la cámara en un hilo dedicado"""
+
+    def __init__(
+        self,
+        read_function: ReadFunction,
+        buffer_size: int = 4,
+        name: str = "capture",
+        preview_transform: Optional[PreviewTransform] = None,
+        encoded_preview: Optional[EncodedPreviewDecoder] = None
+    ):
+        """
+        Args:
+            read_function: Función que lee un frame, con la firma de cv2.VideoCapture.read()
+                (puede retornar bytes JPEG en lugar de un array)
+            buffer_size: Capacidad del buffer circular
+            name: Nombre del hilo (para logs)
+            preview_transform: Función aplicada en el hilo de captura para generar el preview
+            encoded_preview: Decodificador del preview para frames comprimidos
+        """
+        self.read_function = read_function
+        self.preview_transform = preview_transform
+        self.encoded_preview = encoded_preview
+        self.buffer = FrameRingBuffer(capacity=buffer_size)
+        self.name = name
+
+        self.read_failures = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._frame_event = threading.Condition()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Inicia el hilo de captura"""
+        if self.is_running:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"Motor de captura '{self.name}' iniciado")
+
+    def stop(self, timeout: float = 2.0):
+        """Detiene el hilo de captura y espera a que termine"""
+        if not self._thread:
+            return
+
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+        if self._thread.is_alive():
+            logger.warning(f"El hilo de captura '{self.name}' no terminó en {timeout}s")
+
+        self._thread = None
+        logger.info(f"Motor de captura '{self.name}' detenido")
+
+    def _run(self):
+        """Bucle principal del hilo de captura"""
+        while not self._stop_event.is_set():
+            try:
+                ret, frame = self.read_function()
+            except Exception as e:
+                logger.error(f"Error leyendo frame: {e}")
+                ret, frame = False, None
+
+            if not ret or frame is None:
+                self.read_failures += 1
+                # Evitar un bucle ocupado si la cámara deja de responder
+                self._stop_event.wait(0.01)
+                continue
+
+            if isinstance(frame, bytes):
+                self.push_encoded(frame)
+            else:
+                self.push_frame(frame)
+
+    def push_frame(self, frame: np.ndarray, timestamp: Optional[float] = None) -> TimestampedFrame:
+        """Agrega un frame al buffer y notifica a quien esté esperando"""
+        # Marcar el tiempo antes de cualquier procesamiento del frame
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        preview = None
+        if self.preview_transform is not None:
+            try:
+                preview = self.preview_transform(frame)
+            except Exception as e:
+                logger.error(f"Error generando frame de preview: {e}")
+
+        item = self.buffer.push(frame, timestamp, preview)
+        with self._frame_event:
+            self._frame_event.notify_all()
+        return item
+
+    def push_encoded(self, data: bytes, timestamp: Optional[float] = None) -> TimestampedFrame:
+        """
+        Agrega un frame comprimido (JPEG) al buffer sin decodificarlo a resolución completa
+
+        Solo se decodifica el preview, usando encoded_preview si está configurado.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        preview = None
+        try:
+            if self.encoded_preview is not None:
+                preview = self.encoded_preview(data)
+        except Exception as e:
+            logger.error(f"Error decodificando preview: {e}")
+
+        item = self.buffer.push(None, timestamp, preview, encoded=data, size=jpeg_size(data))
+        with self._frame_event:
+            self._frame_event.notify_all()
+        return item
+
+    def latest_frame(self) -> Optional[TimestampedFrame]:
+        """Retorna el frame más reciente sin bloquear"""
+        return self.buffer.latest()
+
+    def wait_for_frame(self, timeout: float = 1.0, after_index: int = -1) -> Optional[TimestampedFrame]:
+        """
+        Espera hasta que haya un frame con índice mayor a after_index
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos
+            after_index: Índice del último frame conocido
+
+        Returns:
+            El frame más reciente, o None si se agotó el tiempo
+        """
+        deadline = time.monotonic() + timeout
+
+        with self._frame_event:
+            while True:
+                item = self.buffer.latest()
+                if item is not None and item.index > after_index:
+                    return item
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_running:
+                    return None
+
+                self._frame_event.wait(remaining)
+
+    def wait_until(self, timestamp: float, timeout: float = 1.0) -> Optional[TimestampedFrame]:
+        """
+        Espera hasta tener un frame capturado en o después de un instante
+
+        Args:
+            timestamp: Instante (time.monotonic) que debe cubrir el buffer
+            timeout: Tiempo máximo de espera en segundos
+
+        Returns:
+            El frame más reciente (puede ser anterior al instante si se agotó el tiempo)
+        """
+        deadline = time.monotonic() + timeout
+        latest = self.buffer.latest()
+
+        while latest is None or latest.timestamp < timestamp:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            after_index = latest.index if latest is not None else -1
+            item = self.wait_for_frame(remaining, after_index)
+            if item is None:
+                # Tiempo agotado o motor detenido: no habrá frames nuevos
+                break
+            latest = item
+
+        return latest
+
+    def get_stats(self) -> Dict:
+        """Retorna estadísticas de captura"""
+        stats = self.buffer.get_stats()
+        stats['read_failures'] = self.read_failures
+        stats['running'] = self.is_running
+        return stats
@@ -0,0 +1,113 @@
+"""
+Utilidades para frames MJPEG (bitstream JPEG entregado por la webcam)
+Permiten guardar la foto sin decodificar/recodificar y decodificar a escala
+reducida en el dominio DCT cuando solo se necesita un preview
+"""
+import io
+import logging
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Marcadores JPEG
+SOI = b'\xff\xd8'
+MARKER_DHT = 0xC4
+MARKER_SOS = 0xDA
+# SOF0..SOF15 excepto DHT (C4), JPG (C8) y DAC (CC)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Factores de reducción que libjpeg aplica durante la decodificación
+REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+def _iter_segments(data: bytes):
+    """Recorre los segmentos de la cabecera JPEG hasta SOS: (marcador, offset, longitud)"""
+    if not data.startswith(SOI):
+        return
+
+    pos = 2
+    end = len(data)
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            return
+        marker = data[pos + 1]
+        # Bytes de relleno entre segmentos
+        if marker == 0xFF:
+            pos += 1
+            continue
+
+        length = (data[pos + 2] << 8) | data[pos + 3]
+        yield marker, pos, length
+
+        if marker == MARKER_SOS:
+            return
+        pos += 2 + length
+
+
+def is_jpeg(data) -> bool:
+    """Verifica que los datos comiencen con la marca SOI de JPEG"""
+    return data is not None and len(data) > 4 and bytes(data[:2]) == SOI
+
+
+def has_huffman_tables(data: bytes) -> bool:
+    """
+    Verifica que el JPEG incluya tablas Huffman (DHT)
+
+    Muchas webcams omiten las tablas estándar en MJPEG; esos frames no son
+    archivos JPEG válidos por sí solos y deben decodificarse y recodificarse.
+    """
+    return any(marker == MARKER_DHT for marker, _, _ in _iter_segments(data))
+
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Lee (ancho, alto) de la cabecera SOF sin decodificar la imagen"""
+    for marker, pos, _ in _iter_segments(data):
+        if marker in SOF_MARKERS and pos + 9 <= len(data):
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            return width, height
+    return None
+
+
+def decode_reduced(data: bytes, min_size: Optional[Tuple[int, int]] = None) -> Optional[np.ndarray]:
+    """
+    Decodifica un JPEG a BGR usando la mayor reducción DCT (1/2, 1/4, 1/8)
+    que mantenga la imagen al menos del tamaño indicado
+
+    Args:
+        data: Bitstream JPEG
+        min_size: (ancho, alto) mínimo requerido; None decodifica a tamaño completo
+
+    Returns:
+        Array BGR, o None si no se pudo decodificar
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    flag = cv2.IMREAD_COLOR
+
+    if min_size is not None:
+        size = jpeg_size(data)
+        if size is not None:
+            for factor, reduced_flag in REDUCED_DECODE_FLAGS:
+                if size[0] // factor >= min_size[0] and size[1] // factor >= min_size[1]:
+                    flag = reduced_flag
+                    break
+
+    return cv2.imdecode(buffer, flag)
+
+
+def open_jpeg(data: bytes) -> Image.Image:
+    """
+    Abre un JPEG en memoria como PIL Image sin decodificarlo todavía
+
+    PIL solo lee la cabecera; los píxeles se decodifican al usarlos, y
+    Image.draft() permite hacerlo a escala reducida.
+    """
+    return Image.open(io.BytesIO(data))
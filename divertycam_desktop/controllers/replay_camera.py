@@ -0,0 +1,132 @@
+"""
+Cámara de reproducción para pruebas y benchmarks sin hardware
+Reproduce un archivo de video o una carpeta de imágenes a fps y resolución configurables
+"""
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+import cv2
+import numpy as np
+
+from .buffered_camera import BufferedCamera
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+# Imágenes decodificadas que se conservan en memoria (modo carpeta)
+MAX_CACHED_IMAGES = 64
+
+
+class ReplayCamera(BufferedCamera):
+    """Reproduce un video o una carpeta de imágenes en bucle"""
+
+    camera_type = 'replay'
+
+    def __init__(
+        self,
+        source,
+        resolution='1280x720',
+        fps: float = 30.0,
+        buffer_size: int = 4,
+        loop: bool = True,
+        **kwargs
+    ):
+        """
+        Args:
+            source: Ruta a un archivo de video o a una carpeta con imágenes
+            resolution: Resolución de salida (los frames se redimensionan)
+            fps: Frames por segundo de reproducción (0 = sin límite)
+            buffer_size: Capacidad del buffer circular / pre-roll
+            loop: Volver al inicio al terminar
+        """
+        super().__init__(resolution=resolution, fps=fps, buffer_size=buffer_size)
+        self.source = Path(source) if source else None
+        self.loop = loop
+
+        self._video: Optional[cv2.VideoCapture] = None
+        self._images: List[Path] = []
+        self._image_position = 0
+        self._image_cache: "OrderedDict[Path, np.ndarray]" = OrderedDict()
+
+        self.camera_info['name'] = f"Replay {self.source.name}" if self.source else "Replay"
+
+    def _open(self) -> bool:
+        if not self.source or not self.source.exists():
+            logger.error(f"Fuente de reproducción no encontrada: {self.source}")
+            return False
+
+        if self.source.is_dir():
+            self._images = sorted(
+                p for p in self.source.iterdir()
+                if p.suffix.lower() in IMAGE_EXTENSIONS
+            )
+            self._image_position = 0
+            if not self._images:
+                logger.error(f"No hay imágenes en {self.source}")
+                return False
+            logger.info(f"Reproduciendo {len(self._images)} imágenes de {self.source}")
+            return True
+
+        self._video = cv2.VideoCapture(str(self.source))
+        if not self._video.isOpened():
+            logger.error(f"No se pudo abrir el video {self.source}")
+            self._video = None
+            return False
+
+        logger.info(f"Reproduciendo video {self.source}")
+        return True
+
+    def _close(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+        self._image_cache.clear()
+
+    def _read_next(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._video is not None:
+            return self._read_video()
+        if self._images:
+            return self._read_image()
+        return False, None
+
+    def _read_video(self) -> Tuple[bool, Optional[np.ndarray]]:
+        ret, frame = self._video.read()
+
+        if not ret and self.loop:
+            # Fin del video: volver al inicio
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._video.read()
+
+        if not ret or frame is None:
+            return False, None
+
+        return True, self._fit_frame(frame)
+
+    def _read_image(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._image_position >= len(self._images):
+            if not self.loop:
+                return False, None
+            self._image_position = 0
+
+        path = self._images[self._image_position]
+        self._image_position += 1
+
+        frame = self._image_cache.get(path)
+        if frame is None:
+            frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if frame is None:
+                logger.warning(f"No se pudo leer la imagen {path}")
+                return False, None
+
+            frame = self._fit_frame(frame)
+            self._image_cache[path] = frame
+            if len(self._image_cache) > MAX_CACHED_IMAGES:
+                self._image_cache.popitem(last=False)
+        else:
+            self._image_cache.move_to_end(path)
+
+        # Los consumidores no modifican los frames, se puede compartir el array
+        return True, frame
@@ -0,0 +1,674 @@
+"""
+Motor de sesiones del photobooth (independiente de Qt)
+
+Máquina de estados de una sesión: cuenta regresiva, disparo, visualización de
+cada foto, espera del guardado de las fotos y registro del collage. El reloj,
+la cámara y el almacenamiento se inyectan, de modo que la misma lógica corre
+en la ventana del photobooth (QTimer, base de datos, hilos de guardado) y sin
+interfaz (reloj simulado y almacenamiento en memoria) para pruebas de carga.
+
+La vista se entera de los cambios a través de un SessionListener; el motor no
+conoce widgets ni muestra diálogos.
+
+Todos los métodos se llaman desde un solo hilo (el de la ventana, o el del
+benchmark): las respuestas del almacenamiento deben entregarse en ese hilo.
+"""
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .base_camera import BaseCamera
+
+logger = logging.getLogger(__name__)
+
+
+class SessionState(Enum):
+    """Estados de una sesión del photobooth"""
+    IDLE = 'idle'              # Sin sesión
+    READY = 'ready'            # Sesión creada, esperando "¡TOMAR FOTOS!"
+    COUNTDOWN = 'countdown'    # Cuenta regresiva antes de una foto
+    CAPTURING = 'capturing'    # Esperando el instante del disparo
+    REVIEWING = 'reviewing'    # Mostrando la foto tomada / pausa entre fotos
+    SAVING = 'saving'          # Esperando a que se guarden las fotos
+    COMPOSING = 'composing'    # Esperando el collage y registrándolo
+    COMPLETED = 'completed'    # Collage listo
+    FAILED = 'failed'          # No se pudo generar el collage
+
+
+# Estados cuya duración se mide (READY depende del invitado, no del sistema)
+TIMED_STATES = (
+    SessionState.COUNTDOWN,
+    SessionState.CAPTURING,
+    SessionState.REVIEWING,
+    SessionState.SAVING,
+    SessionState.COMPOSING,
+)
+
+FINAL_STATES = (SessionState.COMPLETED, SessionState.FAILED)
+
+
+@dataclass(frozen=True)
+class SessionTimings:
+    """Tiempos de una sesión en segundos"""
+    countdown: int = 3             # Valor inicial de la cuenta regresiva
+    between_photos: float = 3.0    # Pausa extra entre fotos
+    display: float = 2.0           # Visualización de cada foto tomada
+    shutter_delay: float = 0.5     # Del fin de la cuenta ("¡Sonríe!") al disparo
+    tick: float = 1.0              # Duración de cada número de la cuenta
+
+    @classmethod
+    def from_config(cls, config_data: Dict[str, Any]) -> 'SessionTimings':
+        """Tiempos desde la configuración del photobooth del evento"""
+        return cls(
+            countdown=int(config_data.get('tiempo_cuenta_regresiva') or 3),
+            between_photos=float(config_data.get('tiempo_entre_fotos') or 3),
+            display=float(config_data.get('tiempo_visualizacion_foto') or 2),
+        )
+
+
+@dataclass
+class SessionMetrics:
+    """
+    Duración de cada etapa de una sesión
+
+    durations es el tiempo del reloj del motor en cada estado (incluye las
+    esperas programadas); work es el tiempo real consumido por el motor, la
+    cámara y el almacenamiento al atender los eventos de cada estado.
+    """
+    session_id: str
+    photos: int = 0
+    durations: Dict[str, float] = field(default_factory=dict)
+    work: Dict[str, float] = field(default_factory=dict)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def total(self) -> Optional[float]:
+        """Segundos de reloj desde la primera cuenta regresiva hasta el collage"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def summary(self) -> str:
+        stages = ", ".join(
+            f"{name} {seconds:.2f}s" for name, seconds in self.durations.items()
+        )
+        total = self.total
+        return f"{stages}; total {total:.2f}s" if total is not None else stages
+
+
+class SessionClock(ABC):
+    """Reloj y temporizador del motor"""
+
+    @abstractmethod
+    def now(self) -> float:
+        """Instante actual en segundos (la ventana usa time.monotonic)"""
+        pass
+
+    @abstractmethod
+    def call_later(self, delay: float, callback: Callable[[], None]) -> Any:
+        """
+        Ejecuta callback() dentro de delay segundos
+
+        Returns:
+            Identificador para cancel()
+        """
+        pass
+
+    @abstractmethod
+    def cancel(self, handle: Any):
+        """Cancela una llamada programada (sin efecto si ya se ejecutó)"""
+        pass
+
+
+class ManualClock(SessionClock):
+    """
+    Reloj simulado: el tiempo solo avanza al ejecutar las llamadas programadas
+
+    Permite correr en milisegundos sesiones que en la realidad duran minutos.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._queue: List[Tuple[float, int, Callable[[], None]]] = []
+        self._cancelled = set()
+        self._sequence = itertools.count()
+
+    def now(self) -> float:
+        return self._now
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> int:
+        handle = next(self._sequence)
+        heapq.heappush(self._queue, (self._now + max(0.0, delay), handle, callback))
+        return handle
+
+    def cancel(self, handle: int):
+        self._cancelled.add(handle)
+
+    def pending(self) -> int:
+        """Llamadas programadas sin ejecutar"""
+        return len(self._queue) - len(self._cancelled)
+
+    def run_next(self) -> bool:
+        """
+        Avanza hasta la próxima llamada programada y la ejecuta
+
+        Returns:
+            False si no quedaba ninguna
+        """
+        while self._queue:
+            due, handle, callback = heapq.heappop(self._queue)
+            if handle in self._cancelled:
+                self._cancelled.discard(handle)
+                continue
+            self._now = max(self._now, due)
+            callback()
+            return True
+        return False
+
+    def advance(self, seconds: float):
+        """Ejecuta en orden las llamadas de los próximos seconds segundos"""
+        until = self._now + seconds
+        while self._queue and self._queue[0][0] <= until:
+            self.run_next()
+        self._now = until
+
+    def run_until(self, condition: Callable[[], bool], max_calls: int = 100000) -> bool:
+        """
+        Ejecuta llamadas programadas hasta que condition() sea verdadera
+
+        Returns:
+            False si se agotaron las llamadas antes de cumplirse
+        """
+        for _ in range(max_calls):
+            if condition():
+                return True
+            if not self.run_next():
+                break
+        return condition()
+
+
+class SessionStorage(ABC):
+    """
+    Persistencia de una sesión: fotos, collage y registro en la base de datos
+
+    Las operaciones lentas (escribir fotos, codificar el collage) pueden ser
+    asíncronas; sus resultados se entregan con callbacks en el hilo del motor.
+    """
+
+    @abstractmethod
+    def create_session(self, session_id: str) -> int:
+        """
+        Registra una sesión nueva y empieza a preparar su collage
+
+        Returns:
+            Número de fotos de la plantilla, o 0 si no se pudo crear
+        """
+        pass
+
+    @abstractmethod
+    def add_photo(self, session_id: str, frame_index: int, photo: Image.Image, jpeg_data: Optional[bytes]):
+        """Encola el guardado de una foto y su pegado en el collage"""
+        pass
+
+    def pending_photos(self, session_id: str) -> int:
+        """Fotos de la sesión que aún no terminan de guardarse"""
+        return 0
+
+    @abstractmethod
+    def finish_session(self, session_id: str, collage_id: str):
+        """Encola la codificación del collage (todas las fotos ya se entregaron)"""
+        pass
+
+    @abstractmethod
+    def when_photos_saved(self, session_id: str, callback: Callable[[str], None]):
+        """Ejecuta callback(session_id) cuando las fotos de la sesión estén guardadas"""
+        pass
+
+    @abstractmethod
+    def complete_session(self, session_id: str):
+        """Marca la sesión como completada (fotos ya guardadas)"""
+        pass
+
+    @abstractmethod
+    def when_collage_ready(self, session_id: str, callback: Callable[[str, Optional[Dict[str, Path]]], None]):
+        """
+        Ejecuta callback(session_id, derivados) cuando el collage esté codificado
+
+        derivados es None si la composición durante la sesión falló.
+        """
+        pass
+
+    @abstractmethod
+    def register_collage(
+        self,
+        session_id: str,
+        collage_id: str,
+        composed: Optional[Dict[str, Path]]
+    ) -> Optional[Dict[str, Path]]:
+        """
+        Registra el collage de la sesión
+
+        Args:
+            composed: Derivados ya compuestos, o None para generarlo desde las fotos
+
+        Returns:
+            Derivados registrados ('print', 'screen', ...), o None si hubo error
+        """
+        pass
+
+    def cancel_session(self, session_id: str):
+        """Abandona una sesión (lo ya encolado termina sin efecto)"""
+        pass
+
+
+class MemorySessionStorage(SessionStorage):
+    """
+    Almacenamiento en memoria para correr el motor sin base de datos
+
+    Simula la latencia del guardado de cada foto y de la codificación del
+    collage con el reloj del motor.
+    """
+
+    def __init__(
+        self,
+        clock: SessionClock,
+        num_photos: int = 4,
+        save_delay: float = 0.0,
+        compose_delay: float = 0.0
+    ):
+        self.clock = clock
+        self.num_photos = num_photos
+        self.save_delay = save_delay
+        self.compose_delay = compose_delay
+
+        self.sessions: Dict[str, str] = {}  # session_id -> estado
+        self.photos: Dict[str, List[int]] = {}
+        self.collages: Dict[str, Dict[str, Path]] = {}
+        self._pending: Dict[str, int] = {}
+        self._saved_waiters: Dict[str, List[Callable[[str], None]]] = {}
+        self._composed: Dict[str, Optional[Dict[str, Path]]] = {}
+        self._collage_waiters: Dict[str, List[Callable]] = {}
+
+    def create_session(self, session_id: str) -> int:
+        self.sessions[session_id] = 'active'
+        self.photos[session_id] = []
+        return self.num_photos
+
+    def add_photo(self, session_id: str, frame_index: int, photo: Image.Image, jpeg_data: Optional[bytes]):
+        self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        self.clock.call_later(self.save_delay, lambda: self._photo_saved(session_id, frame_index))
+
+    def _photo_saved(self, session_id: str, frame_index: int):
+        self.photos.setdefault(session_id, []).append(frame_index)
+        remaining = self._pending.get(session_id, 1) - 1
+        if remaining > 0:
+            self._pending[session_id] = remaining
+            return
+        self._pending.pop(session_id, None)
+        for callback in self._saved_waiters.pop(session_id, []):
+            callback(session_id)
+
+    def pending_photos(self, session_id: str) -> int:
+        return self._pending.get(session_id, 0)
+
+    def finish_session(self, session_id: str, collage_id: str):
+        derivatives = {'print': Path(f"collage_{collage_id}.jpg"), 'screen': Path(f"collage_{collage_id}_screen.jpg")}
+        self.clock.call_later(self.compose_delay, lambda: self._collage_composed(session_id, derivatives))
+
+    def _collage_composed(self, session_id: str, derivatives: Optional[Dict[str, Path]]):
+        waiters = self._collage_waiters.pop(session_id, [])
+        if not waiters:
+            self._composed[session_id] = derivatives
+        for callback in waiters:
+            callback(session_id, derivatives)
+
+    def when_photos_saved(self, session_id: str, callback: Callable[[str], None]):
+        if self.pending_photos(session_id) == 0:
+            callback(session_id)
+            return
+        self._saved_waiters.setdefault(session_id, []).append(callback)
+
+    def complete_session(self, session_id: str):
+        self.sessions[session_id] = 'completed'
+
+    def when_collage_ready(self, session_id: str, callback: Callable[[str, Optional[Dict[str, Path]]], None]):
+        if session_id in self._composed:
+            callback(session_id, self._composed.pop(session_id))
+            return
+        self._collage_waiters.setdefault(session_id, []).append(callback)
+
+    def register_collage(
+        self,
+        session_id: str,
+        collage_id: str,
+        composed: Optional[Dict[str, Path]]
+    ) -> Optional[Dict[str, Path]]:
+        if not composed:
+            return None
+        self.collages[collage_id] = composed
+        return composed
+
+    def cancel_session(self, session_id: str):
+        self._saved_waiters.pop(session_id, None)
+        self._collage_waiters.pop(session_id, None)
+        self._composed.pop(session_id, None)
+
+
+class SessionListener:
+    """
+    Notificaciones del motor a la vista (por defecto no hacen nada)
+
+    La ventana del photobooth sobrescribe las que necesita.
+    """
+
+    def on_state_changed(self, state: SessionState):
+        pass
+
+    def on_countdown(self, value: int):
+        """Número de la cuenta regresiva; 0 es "¡Sonríe!" """
+        pass
+
+    def on_progress(self, captured: int, total: int):
+        pass
+
+    def on_photo_captured(self, frame_index: int, total: int, photo: Image.Image):
+        pass
+
+    def on_capture_failed(self, message: str):
+        """La foto no se tomó; la sesión vuelve a READY con las fotos ya tomadas"""
+        pass
+
+    def on_result(self, derivatives: Dict[str, Path]):
+        pass
+
+    def on_session_failed(self, message: str):
+        pass
+
+
+class SessionEngine:
+    """Máquina de estados de las sesiones del photobooth"""
+
+    def __init__(
+        self,
+        clock: SessionClock,
+        storage: SessionStorage,
+        camera: Optional[BaseCamera] = None,
+        timings: SessionTimings = SessionTimings(),
+        listener: Optional[SessionListener] = None,
+        zero_shutter_lag: bool = False,
+        sharpest_of: int = 1
+    ):
+        """
+        Args:
+            clock: Reloj y temporizador (QtClock en la ventana, ManualClock sin interfaz)
+            storage: Persistencia de fotos y collages
+            camera: Cámara conectada (puede asignarse después con camera = ...)
+            timings: Tiempos de la cuenta regresiva y de visualización
+            listener: Vista que recibe las notificaciones
+            zero_shutter_lag: Tomar el frame del instante del disparo (capture_at)
+            sharpest_of: Frames vecinos entre los que se elige el más nítido
+        """
+        self.clock = clock
+        self.storage = storage
+        self.camera = camera
+        self.timings = timings
+        self.listener = listener or SessionListener()
+        self.zero_shutter_lag = zero_shutter_lag
+        self.sharpest_of = sharpest_of
+
+        self.state = SessionState.IDLE
+        self.session_id: Optional[str] = None
+        self.collage_id: Optional[str] = None
+        self.total_photos = 0
+        self.captured = 0
+        self.countdown_value = 0
+        self.metrics: Optional[SessionMetrics] = None
+
+        self._timer = None
+        self._countdown_start = 0.0
+        self._state_since = 0.0
+        self._shutter_time: Optional[float] = None
+
+    # --- API de la vista ---
+
+    def begin_session(self) -> bool:
+        """
+        Crea una sesión nueva y la deja lista para tomar fotos
+
+        Returns:
+            False si el almacenamiento no pudo crearla
+        """
+        self.reset()
+        session_id = str(uuid.uuid4())
+        try:
+            total = self.storage.create_session(session_id)
+        except Exception as e:
+            logger.error(f"Error creando sesión: {e}", exc_info=True)
+            total = 0
+        if not total:
+            return False
+
+        self.session_id = session_id
+        self.total_photos = total
+        self.captured = 0
+        self.metrics = SessionMetrics(session_id)
+        logger.info(f"Sesión creada: {session_id}, {total} fotos")
+
+        self._set_state(SessionState.READY)
+        self.listener.on_progress(self.captured, self.total_photos)
+        return True
+
+    def start_photos(self):
+        """Inicia (o retoma tras un error de captura) la toma automática de fotos"""
+        if self.state != SessionState.READY:
+            return
+        if self.metrics.started_at is None:
+            self.metrics.started_at = self.clock.now()
+        self._timed(self._start_countdown, stage=SessionState.COUNTDOWN)
+
+    def reset(self):
+        """Abandona la sesión en curso y vuelve a IDLE"""
+        self._cancel_timer()
+        if self.session_id is not None and self.state not in FINAL_STATES:
+            self.storage.cancel_session(self.session_id)
+        self.session_id = None
+        self.collage_id = None
+        self.total_photos = 0
+        self.captured = 0
+        self._shutter_time = None
+        if self.state != SessionState.IDLE:
+            self._set_state(SessionState.IDLE)
+
+    # --- Transiciones ---
+
+    def _set_state(self, state: SessionState):
+        now = self.clock.now()
+        if self.metrics is not None and self.state in TIMED_STATES:
+            name = self.state.value
+            self.metrics.durations[name] = self.metrics.durations.get(name, 0.0) + now - self._state_since
+        self._state_since = now
+        self.state = state
+        self.listener.on_state_changed(state)
+
+    def _timed(self, handler: Callable, *args, stage: Optional[SessionState] = None):
+        """Ejecuta un evento y suma su tiempo real a la etapa en la que llegó"""
+        stage = stage or self.state
+        start = time.perf_counter()
+        try:
+            handler(*args)
+        finally:
+            if self.metrics is not None and stage in TIMED_STATES:
+                elapsed = time.perf_counter() - start
+                self.metrics.work[stage.value] = self.metrics.work.get(stage.value, 0.0) + elapsed
+
+    def _schedule(self, delay: float, handler: Callable[[], None], stage: Optional[SessionState] = None):
+        """Programa el siguiente evento (stage: etapa que inicia, para medir su tiempo)"""
+        self._cancel_timer()
+
+        def fire():
+            self._timer = None
+            self._timed(handler, stage=stage)
+
+        self._timer = self.clock.call_later(delay, fire)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self.clock.cancel(self._timer)
+            self._timer = None
+
+    def _session_callback(self, handler: Callable) -> Callable:
+        """Callback del almacenamiento que se ignora si la sesión ya cambió"""
+        session_id = self.session_id
+
+        def callback(callback_session_id: str, *args):
+            if callback_session_id != session_id or self.session_id != session_id:
+                return
+            self._timed(handler, *args)
+
+        return callback
+
+    def _start_countdown(self):
+        self.countdown_value = self.timings.countdown
+        self._countdown_start = self.clock.now()
+        self._set_state(SessionState.COUNTDOWN)
+        self.listener.on_countdown(self.countdown_value)
+        self._schedule(self.timings.tick, self._on_tick)
+
+    def _on_tick(self):
+        self.countdown_value -= 1
+
+        if self.countdown_value > 0:
+            self.listener.on_countdown(self.countdown_value)
+        elif self.countdown_value == 0:
+            self.listener.on_countdown(0)
+            # Pasar a resolución completa mientras se muestra "¡Sonríe!"
+            if self.camera:
+                self.camera.set_mode(self.camera.MODE_STILL)
+        else:
+            # El disparo ocurre a shutter_delay del fin de la cuenta aunque el timer se retrase
+            self._set_state(SessionState.CAPTURING)
+            self._shutter_time = self.clock.now() + self.timings.shutter_delay
+            self._schedule(self.timings.shutter_delay, self._capture)
+            return
+
+        # Siguiente número contado desde el inicio (los retrasos no se acumulan)
+        ticks = self.timings.countdown - self.countdown_value + 1
+        due = self._countdown_start + ticks * self.timings.tick
+        self._schedule(max(0.0, due - self.clock.now()), self._on_tick)
+
+    def _capture(self):
+        try:
+            photo = self._take_photo()
+        except Exception as e:
+            logger.error(f"Error capturando foto: {e}", exc_info=True)
+            self._set_state(SessionState.READY)
+            self.listener.on_capture_failed(f"Error capturando foto: {e}")
+            return
+
+        if not photo:
+            logger.error("No se pudo capturar la foto")
+            self._set_state(SessionState.READY)
+            self.listener.on_capture_failed("No se pudo capturar la foto")
+            return
+
+        frame_index = self.captured
+        self.captured += 1
+        self.metrics.photos = self.captured
+        try:
+            # Con MJPEG se guarda el JPEG de la cámara tal cual (sin recodificar)
+            jpeg_data = self.camera.get_capture_jpeg(photo)
+            self.storage.add_photo(self.session_id, frame_index, photo, jpeg_data)
+        except Exception as e:
+            logger.error(f"Error encolando foto: {e}", exc_info=True)
+
+        logger.info(f"Foto {self.captured}/{self.total_photos} capturada exitosamente")
+        self._set_state(SessionState.REVIEWING)
+        self.listener.on_progress(self.captured, self.total_photos)
+        self.listener.on_photo_captured(frame_index, self.total_photos, photo)
+
+        if self.captured >= self.total_photos:
+            self._schedule(self.timings.display, self._finish, SessionState.SAVING)
+        else:
+            delay = self.timings.display + self.timings.between_photos
+            self._schedule(delay, self._start_countdown, SessionState.COUNTDOWN)
+
+    def _take_photo(self) -> Optional[Image.Image]:
+        """Captura la foto y vuelve al stream de preview"""
+        if not self.camera:
+            logger.error("Cámara no disponible")
+            return None
+
+        try:
+            if self.zero_shutter_lag and self._shutter_time is not None:
+                photo = self.camera.capture_at(self._shutter_time, sharpest_of=self.sharpest_of)
+            else:
+                photo = self.camera.capture()
+        finally:
+            # Aunque la captura falle, el preview no debe quedar a resolución completa
+            self._shutter_time = None
+            self.camera.set_mode(self.camera.MODE_PREVIEW)
+
+        stats = self.camera.get_capture_stats()
+        if 'switch_latency_ms' in stats:
+            logger.info(f"Latencia de cambio de resolución: {stats['switch_latency_ms']} ms")
+        return photo
+
+    def _finish(self):
+        """Codifica el collage mientras terminan de guardarse las fotos"""
+        self._set_state(SessionState.SAVING)
+        self.collage_id = str(uuid.uuid4())
+        try:
+            self.storage.finish_session(self.session_id, self.collage_id)
+
+            pending = self.storage.pending_photos(self.session_id)
+            if pending:
+                logger.info(f"Esperando a que se guarden {pending} fotos de la sesión")
+
+            self.storage.when_photos_saved(self.session_id, self._session_callback(self._on_photos_saved))
+        except Exception as e:
+            logger.error(f"Error finalizando sesión: {e}", exc_info=True)
+            self._fail(f"Error: {e}")
+
+    def _on_photos_saved(self):
+        try:
+            self.storage.complete_session(self.session_id)
+            logger.info("Sesión completada, generando collage...")
+            self._set_state(SessionState.COMPOSING)
+            self.storage.when_collage_ready(self.session_id, self._session_callback(self._on_collage_ready))
+        except Exception as e:
+            logger.error(f"Error completando sesión: {e}", exc_info=True)
+            self._fail(f"Error: {e}")
+
+    def _on_collage_ready(self, composed: Optional[Dict[str, Path]]):
+        try:
+            # Si la composición durante la sesión falló, se genera desde las fotos guardadas
+            derivatives = self.storage.register_collage(self.session_id, self.collage_id, composed)
+        except Exception as e:
+            logger.error(f"Error registrando collage: {e}", exc_info=True)
+            derivatives = None
+
+        if not derivatives:
+            self._fail("Hubo un problema generando el collage")
+            return
+
+        self._end(SessionState.COMPLETED)
+        self.listener.on_result(derivatives)
+
+    def _fail(self, message: str):
+        self._end(SessionState.FAILED)
+        self.listener.on_session_failed(message)
+
+    def _end(self, state: SessionState):
+        self._set_state(state)
+        self.metrics.finished_at = self.clock.now()
+        logger.info(f"Sesión {self.session_id} {state.value}: {self.metrics.summary()}")
@@ -0,0 +1,117 @@
+"""
+Cámara sintética para pruebas y benchmarks sin hardware
+Genera patrones en movimiento con el número de frame incrustado
+"""
+import logging
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .buffered_camera import BufferedCamera
+
+logger = logging.getLogger(__name__)
+
+# Barras de color (BGR) del fondo
+COLOR_BARS = [
+    (255, 255, 255), (0, 255, 255), (255, 255, 0), (0, 255, 0),
+    (255, 0, 255), (0, 0, 255), (255, 0, 0), (0, 0, 0),
+]
+
+# Código binario del número de frame en la esquina superior izquierda
+COUNTER_BITS = 32
+COUNTER_BLOCK = 8
+
+
+def decode_frame_counter(frame: np.ndarray) -> Optional[int]:
+    """
+    Lee el número de frame incrustado por SyntheticCamera
+
+    Args:
+        frame: Imagen BGR o RGB (el código es blanco/negro) a la resolución original
+
+    Returns:
+        Número de frame, o None si la imagen es demasiado pequeña
+    """
+    if frame.shape[1] < COUNTER_BITS * COUNTER_BLOCK or frame.shape[0] < COUNTER_BLOCK:
+        return None
+
+    half = COUNTER_BLOCK // 2
+    value = 0
+    for bit in range(COUNTER_BITS):
+        pixel = frame[half, bit * COUNTER_BLOCK + half]
+        if int(np.mean(pixel)) > 127:
+            value |= 1 << bit
+    return value
+
+
+class SyntheticCamera(BufferedCamera):
+    """Genera frames con barras de color desplazándose, un círculo en movimiento y un contador"""
+
+    camera_type = 'synthetic'
+
+    def __init__(self, resolution='1280x720', fps: float = 30.0, buffer_size: int = 4, **kwargs):
+        super().__init__(resolution=resolution, fps=fps, buffer_size=buffer_size)
+        self.frame_counter = 0
+        self._background: Optional[np.ndarray] = None
+        self._bars_period = 1
+        self._start_time = 0.0
+
+    def _open(self) -> bool:
+        """Prepara el fondo con barras repetidas para desplazarlo con un slice"""
+        width, height = self.size
+        bar_width = max(1, width // len(COLOR_BARS))
+
+        bars = np.zeros((height, bar_width * len(COLOR_BARS), 3), dtype=np.uint8)
+        for i, color in enumerate(COLOR_BARS):
+            bars[:, i * bar_width:(i + 1) * bar_width] = color
+
+        # Repetir hasta cubrir un periodo más un ancho de pantalla
+        self._bars_period = bars.shape[1]
+        repeats = int(np.ceil(width / self._bars_period)) + 1
+        self._background = np.tile(bars, (1, repeats, 1))
+
+        self.frame_counter = 0
+        self._start_time = time.monotonic()
+        return True
+
+    def _close(self):
+        self._background = None
+
+    def _read_next(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Genera el siguiente frame"""
+        if self._background is None:
+            return False, None
+
+        width, height = self.size
+        n = self.frame_counter
+        self.frame_counter += 1
+
+        # Fondo desplazándose horizontalmente
+        offset = (n * 4) % self._bars_period
+        frame = self._background[:, offset:offset + width].copy()
+
+        # Círculo rebotando
+        radius = max(8, min(width, height) // 10)
+        period = 120
+        phase = (n % period) / period
+        cx = int(radius + (width - 2 * radius) * abs(2 * phase - 1))
+        cy = int(height / 2 + (height / 3) * np.sin(2 * np.pi * phase))
+        cv2.circle(frame, (cx, cy), radius, (40, 40, 200), -1)
+
+        # Contador legible por máquina (bits blancos/negros)
+        for bit in range(COUNTER_BITS):
+            color = 255 if (n >> bit) & 1 else 0
+            x = bit * COUNTER_BLOCK
+            frame[:COUNTER_BLOCK, x:x + COUNTER_BLOCK] = color
+
+        # Contador y tiempo legibles por humanos
+        elapsed = time.monotonic() - self._start_time
+        scale = max(0.5, height / 720)
+        text = f"#{n}  t={elapsed:7.3f}s"
+        origin = (16, int(COUNTER_BLOCK + 40 * scale))
+        cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), int(4 * scale), cv2.LINE_AA)
+        cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), int(2 * scale), cv2.LINE_AA)
+
+        return True, frame
@@ -2,33 +2,99 @@
 Controlador para cámaras web (USB webcam)
 """
 import logging
+import threading
+import time
 import cv2
 import numpy as np
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from PIL import Image
 
-from .base_camera import BaseCamera
+from .base_camera import BaseCamera, parse_resolution
+from .capture_engine import CaptureEngine, TimestampedFrame, select_zsl_frame
+from .mjpeg import is_jpeg, has_huffman_tables, jpeg_size, decode_reduced, open_jpeg
+from .webcam_capabilities import get_device_key, load_or_probe, mode_matches, select_best_mode, CapabilityCache
 
 logger = logging.getLogger(__name__)
 
+# Estrategias de doble stream (preview reducido + foto a resolución completa)
+DUAL_STREAM_SWITCH = 'switch'      # Cambiar la resolución del dispositivo al capturar
+DUAL_STREAM_DECIMATE = 'decimate'  # Capturar siempre a resolución completa y reducir el preview
+DUAL_STREAM_AUTO = 'auto'          # Medir el cambio de resolución y elegir al conectar
+
+# Latencia máxima aceptable para cambiar de resolución en modo automático
+MAX_SWITCH_LATENCY = 0.5
+
+# Frames a descartar como máximo mientras el driver aplica una nueva resolución
+MAX_SWITCH_FRAMES = 15
+
+# Propiedades de imagen configurables con set_setting
+IMAGE_PROPERTIES = {
+    'brightness': cv2.CAP_PROP_BRIGHTNESS,
+    'contrast': cv2.CAP_PROP_CONTRAST,
+    'saturation': cv2.CAP_PROP_SATURATION,
+}
+
 
 class WebcamCamera(BaseCamera):
     """Controlador para cámaras web estándar usando OpenCV"""
 
-    def __init__(self, camera_index=0, resolution='1280x720'):
+    def __init__(
+        self,
+        camera_index=0,
+        resolution='1280x720',
+        buffer_size=4,
+        preview_resolution=None,
+        dual_stream=DUAL_STREAM_AUTO,
+        negotiate_format=True,
+        mjpeg_passthrough=True
+    ):
         super().__init__()
         self.camera_index = camera_index
         self.capture_device = None
 
+        # Motor de captura en hilo dedicado
+        self.buffer_size = buffer_size
+        self.capture_engine: Optional[CaptureEngine] = None
+
+        # El lock protege solo el dispositivo (al liberarlo) y la cola de cambios de
+        # propiedades: el hilo de captura los aplica entre lecturas, así la ventana
+        # nunca espera a un read() bloqueante
+        self._device_lock = threading.Lock()
+        self._pending_properties: List[Tuple[int, float]] = []
+        self._device_settings: Dict = {}
+
         # Parsear resolución
-        if isinstance(resolution, str) and 'x' in resolution:
-            width, height = resolution.split('x')
-            self.resolution_width = int(width)
-            self.resolution_height = int(height)
-        else:
-            # Valores por defecto
-            self.resolution_width = 1280
-            self.resolution_height = 720
+        self.resolution_width, self.resolution_height = parse_resolution(resolution)
+
+        # Doble stream: solo si el preview es más pequeño que la foto
+        self.preview_width, self.preview_height = parse_resolution(
+            preview_resolution, (self.resolution_width, self.resolution_height)
+        )
+        self.dual_stream_requested = dual_stream
+        self.dual_stream_strategy: Optional[str] = None
+        if self.preview_width * self.preview_height >= self.resolution_width * self.resolution_height:
+            self.preview_width, self.preview_height = self.resolution_width, self.resolution_height
+
+        # Cambios de resolución pendientes (los aplica el hilo de captura)
+        self._switch_lock = threading.Lock()
+        self._pending_size: Optional[Tuple[int, int]] = None
+        self._switch_requested_at: Optional[float] = None
+        self._switch_target: Optional[Tuple[int, int]] = None
+        self.last_switch_latency: Optional[float] = None
+        self.switch_latencies = []
+
+        # Zero shutter lag: distancia entre el disparo y el frame elegido
+        self.last_shutter_latency: Optional[float] = None
+
+        # Negociación de formato (FourCC) a partir de la tabla de capacidades
+        self.negotiate_format = negotiate_format
+        self.capabilities = []
+        self.active_mode: Optional[Dict] = None
+
+        # MJPEG passthrough: conservar el bitstream JPEG de la cámara sin recodificar
+        self.mjpeg_passthrough = mjpeg_passthrough
+        self.passthrough_active = False
+        self._last_capture: Optional[Tuple[Image.Image, bytes]] = None
 
         self.camera_info = {
             'type': 'webcam',
@@ -37,6 +103,18 @@ class WebcamCamera(BaseCamera):
             'resolution': f'{self.resolution_width}x{self.resolution_height}'
         }
 
+    @property
+    def still_size(self) -> Tuple[int, int]:
+        return self.resolution_width, self.resolution_height
+
+    @property
+    def preview_size(self) -> Tuple[int, int]:
+        return self.preview_width, self.preview_height
+
+    @property
+    def has_dual_stream(self) -> bool:
+        return self.preview_size != self.still_size
+
     def connect(self) -> bool:
         """Conecta con la webcam"""
         try:
@@ -46,18 +124,76 @@ class WebcamCamera(BaseCamera):
                 logger.error(f"No se pudo abrir la webcam {self.camera_index}")
                 return False
 
-            # Configurar resolución
-            self.capture_device.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution_width)
-            self.capture_device.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution_height)
-            logger.info(f"Resolución configurada: {self.resolution_width}x{self.resolution_height}")
+            # Obtener modos soportados (caché en disco o sondeo)
+            if self.negotiate_format:
+                try:
+                    self.capabilities = load_or_probe(self.capture_device, self.camera_index)
+                except Exception as e:
+                    logger.warning(f"No se pudieron sondear los modos de la webcam: {e}")
+                    self.capabilities = []
+
+            # Configurar formato y resolución
+            self._apply_size(self.still_size)
+            if self.active_mode:
+                logger.info(
+                    f"Resolución configurada: {self.resolution_width}x{self.resolution_height} "
+                    f"({self.active_mode['fourcc']} @ {self.active_mode['fps']} fps)"
+                )
+            else:
+                logger.info(f"Resolución configurada: {self.resolution_width}x{self.resolution_height}")
 
             # Leer frame de prueba
-            ret, _ = self.capture_device.read()
+            ret, frame = self.capture_device.read()
+
+            # La tabla en caché puede ser de otra cámara (misma clave tras cambiarlas)
+            if ret and self.active_mode and not mode_matches(self.capture_device, self.active_mode, frame):
+                device_key = get_device_key(self.camera_index)
+                logger.warning(f"El modo en caché de '{device_key}' no corresponde a la cámara conectada; se vuelve a sondear")
+                CapabilityCache().invalidate(device_key)
+                self.active_mode = None
+                try:
+                    self.capabilities = load_or_probe(self.capture_device, self.camera_index, force=True)
+                except Exception as e:
+                    logger.warning(f"No se pudieron sondear los modos de la webcam: {e}")
+                    self.capabilities = []
+                self._apply_size(self.still_size)
+                ret, frame = self.capture_device.read()
+
             if not ret:
                 logger.error("No se pudo leer de la webcam")
                 self.capture_device.release()
                 return False
 
+            # Elegir cómo servir el preview reducido
+            self.dual_stream_strategy = self._choose_dual_stream_strategy()
+            if self.dual_stream_strategy == DUAL_STREAM_SWITCH:
+                self._apply_size(self.preview_size)
+                ret, frame = self._read_with_size(self.preview_size)
+                if not ret:
+                    logger.error("No se pudo leer de la webcam en resolución de preview")
+                    self.capture_device.release()
+                    return False
+
+            # Recibir el JPEG de la cámara sin decodificar, si es posible
+            encoded = self._enable_passthrough()
+            self._refresh_settings()
+
+            # Iniciar lectura continua en segundo plano
+            preview_transform = self._decimate if self.dual_stream_strategy == DUAL_STREAM_DECIMATE else None
+            self.capture_engine = CaptureEngine(
+                self._read_frame,
+                buffer_size=self.buffer_size,
+                name=f"webcam-{self.camera_index}",
+                preview_transform=preview_transform,
+                encoded_preview=self._decode_preview if self.passthrough_active else None
+            )
+            if encoded is not None:
+                self.capture_engine.push_encoded(encoded)
+            else:
+                self.capture_engine.push_frame(frame)
+            self.capture_engine.start()
+            self.mode = self.MODE_PREVIEW
+
             self.is_connected = True
             logger.info(f"Webcam {self.camera_index} conectada correctamente")
             return True
@@ -69,32 +205,280 @@ class WebcamCamera(BaseCamera):
     def disconnect(self):
         """Desconecta la webcam"""
         try:
-            if self.capture_device:
-                self.capture_device.release()
+            # Detener el hilo antes de liberar el dispositivo
+            if self.capture_engine:
+                self.capture_engine.stop()
+                self.capture_engine = None
+
+            with self._device_lock:
+                device = self.capture_device
                 self.capture_device = None
+            if device:
+                device.release()
             self.is_connected = False
             logger.info("Webcam desconectada")
         except Exception as e:
             logger.error(f"Error desconectando webcam: {e}")
 
+    def _apply_size(self, size: Tuple[int, int]):
+        """
+        Configura la resolución del dispositivo con el formato más rápido
+        (requiere tener el dispositivo bloqueado)
+        """
+        mode = select_best_mode(self.capabilities, *size) if self.capabilities else None
+
+        # El FourCC debe configurarse antes que la resolución (V4L2)
+        if mode and mode != self.active_mode:
+            self.capture_device.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode['fourcc']))
+        self.active_mode = mode
+
+        self.capture_device.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+        self.capture_device.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+
+    def _read_with_size(self, size: Tuple[int, int]):
+        """Lee frames hasta obtener uno con la resolución indicada"""
+        for _ in range(MAX_SWITCH_FRAMES):
+            ret, frame = self.capture_device.read()
+            if ret and frame is not None and (frame.shape[1], frame.shape[0]) == size:
+                return ret, frame
+        return False, None
+
+    def _measure_switch_latency(self) -> Optional[float]:
+        """Mide el tiempo de ida y vuelta preview -> foto (antes de iniciar el hilo)"""
+        latencies = []
+        for size in (self.preview_size, self.still_size):
+            start = time.perf_counter()
+            self._apply_size(size)
+            ret, _ = self._read_with_size(size)
+            if not ret:
+                return None
+            latencies.append(time.perf_counter() - start)
+        return max(latencies)
+
+    def _choose_dual_stream_strategy(self) -> Optional[str]:
+        """Decide entre cambiar la resolución o reducir el preview en el hilo de captura"""
+        if not self.has_dual_stream:
+            return None
+
+        if self.dual_stream_requested == DUAL_STREAM_DECIMATE:
+            return DUAL_STREAM_DECIMATE
+
+        latency = self._measure_switch_latency()
+        if latency is None:
+            logger.warning("La webcam no soporta la resolución de preview, se usará reducción por software")
+            self._apply_size(self.still_size)
+            return DUAL_STREAM_DECIMATE
+
+        self._record_switch_latency(latency)
+
+        if self.dual_stream_requested == DUAL_STREAM_SWITCH or latency <= MAX_SWITCH_LATENCY:
+            strategy = DUAL_STREAM_SWITCH
+        else:
+            strategy = DUAL_STREAM_DECIMATE
+
+        logger.info(
+            f"Doble stream: preview {self.preview_width}x{self.preview_height}, "
+            f"foto {self.resolution_width}x{self.resolution_height}, "
+            f"cambio de resolución {latency * 1000:.0f} ms -> estrategia '{strategy}'"
+        )
+        return strategy
+
+    def _record_switch_latency(self, latency: float):
+        """Guarda la latencia de un cambio de resolución"""
+        self.last_switch_latency = latency
+        self.switch_latencies.append(latency)
+        # Conservar solo las mediciones recientes
+        del self.switch_latencies[:-20]
+
+    def _enable_passthrough(self) -> Optional[bytes]:
+        """
+        Desactiva la conversión a BGR de OpenCV para recibir el JPEG crudo
+
+        Solo aplica si todos los modos usados son MJPEG y los frames incluyen
+        tablas Huffman (si no, no son archivos JPEG válidos por sí solos).
+
+        Returns:
+            El primer frame JPEG, o None si el passthrough no está disponible
+        """
+        self.passthrough_active = False
+        if not self.mjpeg_passthrough or not self.capabilities:
+            return None
+
+        sizes = [self.still_size]
+        if self.dual_stream_strategy == DUAL_STREAM_SWITCH:
+            sizes.append(self.preview_size)
+        for size in sizes:
+            mode = select_best_mode(self.capabilities, *size)
+            if not mode or mode['fourcc'] != 'MJPG':
+                return None
+
+        self.capture_device.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        ret, raw = self.capture_device.read()
+        data = raw.reshape(-1).tobytes() if ret and raw is not None and raw.ndim <= 2 else None
+
+        if data is not None and is_jpeg(data) and has_huffman_tables(data):
+            self.passthrough_active = True
+            logger.info("MJPEG passthrough activo: las fotos se guardarán sin recodificar")
+            return data
+
+        if data is not None and is_jpeg(data):
+            logger.info("MJPEG sin tablas Huffman, se decodificará y recodificará cada foto")
+        else:
+            logger.info("El backend no entrega MJPEG crudo, se usará la conversión de OpenCV")
+
+        self.capture_device.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        return None
+
+    def _decode_preview(self, data: bytes) -> Optional[np.ndarray]:
+        """Decodifica el preview con reducción DCT (ejecutado en el hilo de captura)"""
+        return decode_reduced(data, self.preview_size)
+
+    @staticmethod
+    def _frame_size(frame) -> Optional[Tuple[int, int]]:
+        """Tamaño (ancho, alto) de un frame decodificado o JPEG"""
+        if isinstance(frame, bytes):
+            return jpeg_size(frame)
+        return frame.shape[1], frame.shape[0]
+
+    def _decimate(self, frame: np.ndarray) -> np.ndarray:
+        """Reduce un frame a la resolución de preview (ejecutado en el hilo de captura)"""
+        height, width = frame.shape[:2]
+        if width <= self.preview_width and height <= self.preview_height:
+            return frame
+        return cv2.resize(frame, self.preview_size, interpolation=cv2.INTER_AREA)
+
+    def _read_frame(self):
+        """Lee un frame del dispositivo (ejecutado en el hilo de captura)"""
+        with self._switch_lock:
+            pending = self._pending_size
+            self._pending_size = None
+
+        with self._device_lock:
+            device = self.capture_device
+            properties = self._pending_properties
+            self._pending_properties = []
+
+        if device is None:
+            return False, None
+
+        # Cambios pedidos desde otros hilos, aplicados entre dos lecturas
+        if pending is not None or properties:
+            if pending is not None:
+                self._apply_size(pending)
+            for prop, value in properties:
+                device.set(prop, value)
+            self._refresh_settings()
+
+        ret, frame = device.read()
+
+        # En passthrough el frame es el bitstream JPEG (array 1-D)
+        if ret and frame is not None and self.passthrough_active and frame.ndim <= 2:
+            frame = frame.reshape(-1).tobytes()
+
+        # Medir la latencia desde la solicitud hasta el primer frame con la nueva resolución
+        if ret and frame is not None:
+            with self._switch_lock:
+                if (self._switch_target is not None
+                        and self._frame_size(frame) == self._switch_target):
+                    latency = time.monotonic() - self._switch_requested_at
+                    self._record_switch_latency(latency)
+                    logger.info(
+                        f"Resolución cambiada a {self._switch_target[0]}x{self._switch_target[1]} "
+                        f"en {latency * 1000:.0f} ms"
+                    )
+                    self._switch_target = None
+
+        return ret, frame
+
+    def set_mode(self, mode: str) -> bool:
+        """
+        Cambia entre modo preview y modo foto
+
+        Con la estrategia 'switch' el cambio de resolución se aplica en el hilo
+        de captura, así que esta llamada no bloquea.
+        """
+        if not super().set_mode(mode):
+            return False
+
+        if self.dual_stream_strategy == DUAL_STREAM_SWITCH:
+            size = self.still_size if mode == self.MODE_STILL else self.preview_size
+            with self._switch_lock:
+                self._pending_size = size
+                self._switch_target = size
+                self._switch_requested_at = time.monotonic()
+
+        return True
+
+    def _wait_for_size(self, size: Tuple[int, int], timeout: float = 3.0) -> Optional[TimestampedFrame]:
+        """Espera el primer frame con la resolución indicada"""
+        deadline = time.monotonic() + timeout
+        item = self.capture_engine.latest_frame()
+
+        while item is None or item.size != size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            after_index = item.index if item is not None else -1
+            item = self.capture_engine.wait_for_frame(remaining, after_index)
+
+        return item
+
+    def _latest_still(self) -> Optional[TimestampedFrame]:
+        """Obtiene el frame más reciente a resolución completa"""
+        if self.dual_stream_strategy != DUAL_STREAM_SWITCH:
+            return self.capture_engine.latest_frame()
+
+        if self.mode == self.MODE_STILL:
+            return self._wait_for_size(self.still_size)
+
+        # Cambio transitorio a resolución completa solo para esta foto
+        self.set_mode(self.MODE_STILL)
+        try:
+            return self._wait_for_size(self.still_size)
+        finally:
+            self.set_mode(self.MODE_PREVIEW)
+
+    def _frame_to_image(self, frame: np.ndarray) -> Image.Image:
+        """Convierte un frame BGR de OpenCV a PIL Image"""
+        # Convertir BGR (OpenCV) a RGB (PIL)
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(frame_rgb)
+
+    def _still_to_image(self, item: TimestampedFrame) -> Image.Image:
+        """
+        Convierte un frame capturado en la imagen de la foto
+
+        Con MJPEG passthrough retorna el JPEG sin decodificar (PIL lo decodifica
+        solo si alguien usa los píxeles) y conserva el bitstream para guardarlo.
+        """
+        if item.encoded is not None:
+            image = open_jpeg(item.encoded)
+            self._last_capture = (image, item.encoded)
+            return image
+
+        self._last_capture = None
+        return self._frame_to_image(item.frame)
+
+    def get_capture_jpeg(self, image: Image.Image) -> Optional[bytes]:
+        """Retorna el JPEG original de la última foto, si es la imagen indicada"""
+        if self._last_capture is not None and self._last_capture[0] is image:
+            return self._last_capture[1]
+        return None
+
     def capture(self) -> Optional[Image.Image]:
-        """Captura una imagen de la webcam"""
-        if not self.is_connected or not self.capture_device:
+        """Captura una imagen de la webcam (frame más reciente del buffer)"""
+        if not self.is_connected or not self.capture_engine:
             logger.error("Webcam no conectada")
             return None
 
         try:
-            ret, frame = self.capture_device.read()
+            item = self._latest_still()
 
-            if not ret or frame is None:
+            if item is None:
                 logger.error("No se pudo capturar frame de la webcam")
                 return None
 
-            # Convertir BGR (OpenCV) a RGB (PIL)
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # Convertir a PIL Image
-            image = Image.fromarray(frame_rgb)
+            image = self._still_to_image(item)
 
             logger.info(f"Imagen capturada: {image.size}")
             return image
@@ -103,9 +487,87 @@ class WebcamCamera(BaseCamera):
             logger.error(f"Error capturando imagen: {e}")
             return None
 
+    def capture_at(self, shutter_time: float, sharpest_of: int = 1) -> Optional[Image.Image]:
+        """
+        Captura el frame del pre-roll más cercano al instante del disparo
+
+        Args:
+            shutter_time: Instante del disparo (time.monotonic)
+            sharpest_of: Elegir el más nítido entre esta cantidad de frames vecinos
+        """
+        if not self.is_connected or not self.capture_engine:
+            logger.error("Webcam no conectada")
+            return None
+
+        try:
+            # Si el disparo es posterior al último frame, esperar a que llegue uno nuevo
+            self.capture_engine.wait_until(shutter_time)
+
+            # Solo sirven frames a resolución completa
+            frames = [
+                item for item in self.capture_engine.buffer.snapshot()
+                if item.size == self.still_size
+            ]
+            if not frames:
+                logger.warning("Pre-roll sin frames a resolución completa, se captura el frame actual")
+                return self.capture()
+
+            item = select_zsl_frame(frames, shutter_time, sharpest_of)
+            latency = item.timestamp - shutter_time
+            self.last_shutter_latency = latency
+
+            image = self._still_to_image(item)
+            logger.info(
+                f"Imagen capturada (ZSL): {image.size}, frame {item.index}, "
+                f"latencia disparo->frame {latency * 1000:+.0f} ms"
+            )
+            return image
+
+        except Exception as e:
+            logger.error(f"Error capturando imagen: {e}")
+            return None
+
     def get_preview(self) -> Optional[Image.Image]:
-        """Obtiene un frame de preview (igual que capturar para webcam)"""
-        return self.capture()
+        """Obtiene el frame más reciente para el preview sin bloquear"""
+        if not self.is_connected or not self.capture_engine:
+            return None
+
+        try:
+            item = self.capture_engine.latest_frame()
+            if item is None:
+                return None
+
+            return self._frame_to_image(item.preview_frame)
+
+        except Exception as e:
+            logger.error(f"Error obteniendo preview: {e}")
+            return None
+
+    def get_preview_frame(self) -> Optional[np.ndarray]:
+        """Retorna el frame BGR más reciente sin convertirlo ni copiarlo"""
+        if not self.is_connected or not self.capture_engine:
+            return None
+
+        item = self.capture_engine.latest_frame()
+        return item.preview_frame if item is not None else None
+
+    def get_capture_stats(self) -> Dict:
+        """Retorna estadísticas del motor de captura y del doble stream"""
+        if not self.capture_engine:
+            return {}
+
+        stats = self.capture_engine.get_stats()
+        stats['mode'] = self.mode
+        stats['dual_stream'] = self.dual_stream_strategy
+        stats['mjpeg_passthrough'] = self.passthrough_active
+        if self.last_shutter_latency is not None:
+            stats['shutter_latency_ms'] = round(self.last_shutter_latency * 1000, 1)
+        if self.switch_latencies:
+            stats['switch_latency_ms'] = round(self.last_switch_latency * 1000, 1)
+            stats['switch_latency_avg_ms'] = round(
+                sum(self.switch_latencies) / len(self.switch_latencies) * 1000, 1
+            )
+        return stats
 
     def get_settings(self) -> Dict:
         """Obtiene configuraciones disponibles de la webcam"""
@@ -113,17 +575,14 @@ class WebcamCamera(BaseCamera):
             return {}
 
         try:
-            width = int(self.capture_device.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(self.capture_device.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = int(self.capture_device.get(cv2.CAP_PROP_FPS))
-
-            return {
-                'resolution': f'{width}x{height}',
-                'fps': fps,
-                'brightness': self.capture_device.get(cv2.CAP_PROP_BRIGHTNESS),
-                'contrast': self.capture_device.get(cv2.CAP_PROP_CONTRAST),
-                'saturation': self.capture_device.get(cv2.CAP_PROP_SATURATION),
-            }
+            # Valores leídos por el hilo de captura tras el último cambio (sin tocar el dispositivo)
+            settings = dict(self._device_settings)
+            settings['fourcc'] = self.active_mode['fourcc'] if self.active_mode else None
+
+            stats = self.get_capture_stats()
+            settings['capture_fps'] = stats.get('fps', 0.0)
+            settings['frames_dropped'] = stats.get('frames_dropped', 0)
+            return settings
 
         except Exception as e:
             logger.error(f"Error obteniendo configuraciones: {e}")
@@ -135,17 +594,20 @@ class WebcamCamera(BaseCamera):
             return False
 
         try:
-            setting_map = {
-                'resolution': self._set_resolution,
-                'brightness': lambda v: self.capture_device.set(cv2.CAP_PROP_BRIGHTNESS, v),
-                'contrast': lambda v: self.capture_device.set(cv2.CAP_PROP_CONTRAST, v),
-                'saturation': lambda v: self.capture_device.set(cv2.CAP_PROP_SATURATION, v),
-            }
-
-            if setting in setting_map:
-                result = setting_map[setting](value)
+            if setting == 'resolution':
+                result = self._set_resolution(value)
+                logger.info(f"Configuración {setting} = {value}")
+                return result
+
+            if setting in IMAGE_PROPERTIES:
+                if self._capture_running():
+                    with self._device_lock:
+                        self._pending_properties.append((IMAGE_PROPERTIES[setting], value))
+                else:
+                    self.capture_device.set(IMAGE_PROPERTIES[setting], value)
+                    self._refresh_settings()
                 logger.info(f"Configuración {setting} = {value}")
-                return result if isinstance(result, bool) else True
+                return True
 
             logger.warning(f"Configuración no soportada: {setting}")
             return False
@@ -154,33 +616,59 @@ class WebcamCamera(BaseCamera):
             logger.error(f"Error configurando {setting}: {e}")
             return False
 
+    def _capture_running(self) -> bool:
+        return self.capture_engine is not None and self.capture_engine.is_running
+
+    def _refresh_settings(self):
+        """Lee las propiedades del dispositivo (hilo de captura, o antes de iniciarlo)"""
+        device = self.capture_device
+        width = int(device.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(device.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        settings = {
+            'resolution': f'{width}x{height}',
+            'fps': int(device.get(cv2.CAP_PROP_FPS)),
+        }
+        for name, prop in IMAGE_PROPERTIES.items():
+            settings[name] = device.get(prop)
+        self._device_settings = settings
+
     def _set_resolution(self, resolution_str: str) -> bool:
         """Configura la resolución de la cámara"""
         try:
             # Formato esperado: "1280x720"
             width, height = map(int, resolution_str.split('x'))
-            self.capture_device.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-            self.capture_device.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            self.resolution_width, self.resolution_height = width, height
+            self.camera_info['resolution'] = f'{width}x{height}'
+
+            # En modo preview con doble stream el dispositivo sigue en resolución reducida
+            if self.dual_stream_strategy == DUAL_STREAM_SWITCH and self.mode == self.MODE_PREVIEW:
+                return True
+
+            if self._capture_running():
+                with self._switch_lock:
+                    self._pending_size = (width, height)
+            else:
+                self._apply_size((width, height))
+                self._refresh_settings()
             return True
         except Exception as e:
             logger.error(f"Error configurando resolución: {e}")
             return False
 
+    @staticmethod
+    def probe_modes(camera_index: int = 0, force: bool = True) -> list:
+        """Abre la webcam, sondea sus modos (FourCC × resolución × fps) y actualiza la caché"""
+        cap = cv2.VideoCapture(camera_index)
+        try:
+            if not cap.isOpened():
+                logger.error(f"No se pudo abrir la webcam {camera_index} para sondear modos")
+                return []
+            return load_or_probe(cap, camera_index, force=force)
+        finally:
+            cap.release()
+
     @staticmethod
     def list_available_cameras() -> list:
         """Lista las webcams disponibles en el sistema"""
-        available = []
-
-        for i in range(10):  # Probar hasta 10 cámaras
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                ret, _ = cap.read()
-                if ret:
-                    available.append({
-                        'index': i,
-                        'type': 'webcam',
-                        'name': f'Webcam {i}'
-                    })
-                cap.release()
-
-        return available
+        from .camera_enumerator import get_camera_enumerator
+        return get_camera_enumerator().enumerate()
@@ -0,0 +1,247 @@
+"""
+Sondeo de capacidades de webcams (FourCC × resolución × fps)
+La tabla sondeada se guarda en disco por dispositivo para no repetir el sondeo
+"""
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, List
+
+import cv2
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Formatos a probar, en orden de preferencia ante empate de fps
+CANDIDATE_FOURCCS = ['MJPG', 'YUYV']
+
+# Resoluciones a probar (las mismas que ofrece la configuración del photobooth)
+CANDIDATE_RESOLUTIONS = [
+    (640, 480),
+    (1280, 720),
+    (1920, 1080),
+    (2560, 1440),
+    (3840, 2160),
+]
+
+# Frames usados para medir los fps reales de cada modo
+PROBE_WARMUP_FRAMES = 3
+PROBE_MEASURE_FRAMES = 6
+
+CAPABILITIES_FILE = config.DATA_DIR / "camera_capabilities.json"
+
+
+def fourcc_to_str(value: float) -> str:
+    """Convierte el valor de CAP_PROP_FOURCC a texto ('MJPG')"""
+    code = int(value)
+    return ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+
+
+def get_device_key(camera_index: int) -> str:
+    """
+    Identificador estable del dispositivo para la caché
+
+    En Linux usa el nombre y los IDs USB de sysfs, así la caché sobrevive a
+    cambios de índice. En otros sistemas recurre al índice; WebcamCamera
+    valida el modo en caché al conectar (mode_matches) y vuelve a sondear si
+    en ese índice hay otra cámara.
+    """
+    sysfs = Path(f"/sys/class/video4linux/video{camera_index}")
+    try:
+        if sysfs.exists():
+            name = (sysfs / "name").read_text().strip()
+            usb_dir = (sysfs / "device").resolve().parent
+            vendor = usb_dir / "idVendor"
+            product = usb_dir / "idProduct"
+            if vendor.exists() and product.exists():
+                return f"{vendor.read_text().strip()}:{product.read_text().strip()}:{name}"
+            return f"v4l:{name}"
+    except Exception as e:
+        logger.debug(f"No se pudo leer sysfs para video{camera_index}: {e}")
+
+    return f"index:{camera_index}"
+
+
+class CapabilityCache:
+    """Caché en disco de las tablas de capacidades por dispositivo"""
+
+    def __init__(self, path: Path = CAPABILITIES_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load_all(self) -> Dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))
+        except Exception as e:
+            logger.warning(f"Caché de capacidades ilegible, se ignorará: {e}")
+            return {}
+
+    def _write_all(self, data: Dict):
+        # Escritura atómica para no corromper la caché si se interrumpe
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(data, indent=2), encoding='utf-8')
+        tmp_path.replace(self.path)
+
+    def get(self, device_key: str) -> Optional[List[Dict]]:
+        """Retorna la tabla de un dispositivo, o None si no está en caché"""
+        with self._lock:
+            entry = self._load_all().get(device_key)
+        return entry.get('modes') if entry else None
+
+    def put(self, device_key: str, modes: List[Dict]):
+        """Guarda la tabla de un dispositivo"""
+        with self._lock:
+            data = self._load_all()
+            data[device_key] = {'probed_at': time.time(), 'modes': modes}
+            self._write_all(data)
+
+    def invalidate(self, device_key: str):
+        """Elimina la tabla de un dispositivo"""
+        with self._lock:
+            data = self._load_all()
+            if data.pop(device_key, None) is not None:
+                self._write_all(data)
+
+
+def _measure_fps(capture_device, num_frames: int = PROBE_MEASURE_FRAMES) -> float:
+    """Mide los fps reales leyendo algunos frames"""
+    start = time.perf_counter()
+    read = 0
+    for _ in range(num_frames):
+        ret, _ = capture_device.read()
+        if ret:
+            read += 1
+    elapsed = time.perf_counter() - start
+
+    return read / elapsed if elapsed > 0 and read else 0.0
+
+
+def probe_capabilities(capture_device) -> List[Dict]:
+    """
+    Sondea los modos soportados por un dispositivo abierto
+
+    Args:
+        capture_device: cv2.VideoCapture abierto
+
+    Returns:
+        Lista de modos: {'fourcc', 'width', 'height', 'fps', 'nominal_fps'}
+    """
+    modes = []
+
+    for fourcc in CANDIDATE_FOURCCS:
+        for width, height in CANDIDATE_RESOLUTIONS:
+            # El FourCC debe configurarse antes que la resolución (V4L2)
+            capture_device.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            capture_device.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            capture_device.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+            # Descartar los primeros frames, que pueden venir del modo anterior
+            ret, frame = False, None
+            for _ in range(PROBE_WARMUP_FRAMES):
+                ret, frame = capture_device.read()
+
+            # El driver ajustó a otro modo: no está soportado tal cual
+            if not ret or frame is None or (frame.shape[1], frame.shape[0]) != (width, height):
+                continue
+            actual_fourcc = fourcc_to_str(capture_device.get(cv2.CAP_PROP_FOURCC))
+            if actual_fourcc and actual_fourcc != fourcc:
+                continue
+
+            fps = _measure_fps(capture_device)
+            if fps <= 0:
+                continue
+
+            modes.append({
+                'fourcc': fourcc,
+                'width': width,
+                'height': height,
+                'fps': round(fps, 1),
+                'nominal_fps': capture_device.get(cv2.CAP_PROP_FPS),
+            })
+            logger.info(f"Modo soportado: {fourcc} {width}x{height} @ {fps:.1f} fps")
+
+    return modes
+
+
+def mode_matches(capture_device, mode: Dict, frame) -> bool:
+    """
+    Comprueba que el dispositivo entrega el modo configurado
+
+    Sirve para validar una tabla en caché: fuera de Linux la clave es el
+    índice, y en ese índice puede haber otra cámara tras desconectarlas.
+    """
+    if frame is None or frame.ndim < 2 or (frame.shape[1], frame.shape[0]) != (mode['width'], mode['height']):
+        return False
+    actual_fourcc = fourcc_to_str(capture_device.get(cv2.CAP_PROP_FOURCC))
+    return not actual_fourcc or actual_fourcc == mode['fourcc']
+
+
+def select_best_mode(modes: List[Dict], width: int, height: int) -> Optional[Dict]:
+    """
+    Elige el modo más rápido para una resolución
+
+    Ante fps similares (±10%) se prefiere el orden de CANDIDATE_FOURCCS.
+    """
+    candidates = [m for m in modes if m['width'] == width and m['height'] == height]
+    if not candidates:
+        return None
+
+    best_fps = max(m['fps'] for m in candidates)
+    fast = [m for m in candidates if m['fps'] >= best_fps * 0.9]
+
+    def preference(mode):
+        fourcc = mode['fourcc']
+        return CANDIDATE_FOURCCS.index(fourcc) if fourcc in CANDIDATE_FOURCCS else len(CANDIDATE_FOURCCS)
+
+    return min(fast, key=preference)
+
+
+def get_supported_resolutions(modes: List[Dict]) -> List[str]:
+    """Lista de resoluciones únicas ('1920x1080'), de menor a mayor"""
+    sizes = sorted({(m['width'], m['height']) for m in modes}, key=lambda s: s[0] * s[1])
+    return [f"{w}x{h}" for w, h in sizes]
+
+
+def get_cached_resolutions(camera_index: int = 0, cache: Optional[CapabilityCache] = None) -> List[str]:
+    """Resoluciones de la tabla en caché de un dispositivo, sin abrirlo"""
+    cache = cache or CapabilityCache()
+    modes = cache.get(get_device_key(camera_index))
+    return get_supported_resolutions(modes) if modes else []
+
+
+def load_or_probe(capture_device, camera_index: int, cache: Optional[CapabilityCache] = None,
+                  force: bool = False) -> List[Dict]:
+    """
+    Obtiene la tabla de capacidades desde la caché o sondeando el dispositivo
+
+    Args:
+        capture_device: cv2.VideoCapture abierto
+        camera_index: Índice de la cámara
+        cache: Caché a usar (por defecto la de DATA_DIR)
+        force: Ignorar la caché y volver a sondear
+
+    Returns:
+        Lista de modos soportados
+    """
+    cache = cache or CapabilityCache()
+    device_key = get_device_key(camera_index)
+
+    if not force:
+        modes = cache.get(device_key)
+        if modes:
+            logger.info(f"Capacidades de '{device_key}' cargadas desde caché ({len(modes)} modos)")
+            return modes
+
+    start = time.perf_counter()
+    modes = probe_capabilities(capture_device)
+    logger.info(f"Sondeo de '{device_key}': {len(modes)} modos en {time.perf_counter() - start:.1f}s")
+
+    if modes:
+        cache.put(device_key, modes)
+
+    return modes
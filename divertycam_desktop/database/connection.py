@@ -49,6 +49,12 @@ def init_db():
     try:
         from .migrate_add_balance_blancos import migrate_add_balance_blancos
         migrate_add_balance_blancos()
+
+        from .migrate_add_collage_derivatives import migrate_add_collage_derivatives
+        migrate_add_collage_derivatives()
+
+        from .migrate_collage_result_versions import migrate_collage_result_versions
+        migrate_collage_result_versions()
     except Exception as e:
         logger.warning(f"Error ejecutando migraciones: {e}")
 
@@ -0,0 +1,41 @@
+"""
+Migración: Agregar rutas de los derivados del collage a collage_results
+"""
+import logging
+from sqlalchemy import text
+from .connection import get_engine
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_COLUMNS = ('screen_path', 'web_path', 'thumbnail_path')
+
+
+def migrate_add_collage_derivatives():
+    """Agrega las columnas screen_path, web_path y thumbnail_path a collage_results si no existen"""
+    engine = get_engine()
+
+    try:
+        with engine.connect() as conn:
+            # Verificar qué columnas ya existen
+            result = conn.execute(text("PRAGMA table_info(collage_results)"))
+            columns = [row[1] for row in result]
+
+            missing = [column for column in DERIVATIVE_COLUMNS if column not in columns]
+            if missing:
+                for column in missing:
+                    logger.info(f"Agregando columna '{column}' a collage_results...")
+                    conn.execute(text(f"ALTER TABLE collage_results ADD COLUMN {column} VARCHAR(500)"))
+                conn.commit()
+
+                logger.info("Columnas de derivados agregadas exitosamente")
+            else:
+                logger.info("Columnas de derivados ya existen")
+
+    except Exception as e:
+        logger.error(f"Error en migración: {e}", exc_info=True)
+        raise
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    migrate_add_collage_derivatives()
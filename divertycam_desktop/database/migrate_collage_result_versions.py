@@ -0,0 +1,54 @@
+"""
+Migración: Versiones de CollageResult
+
+Agrega version y template_hash a collage_results y reemplaza el UNIQUE de
+session_id por UNIQUE(session_id, version). SQLite no permite quitar una
+restricción con ALTER TABLE, así que la tabla se reconstruye con el esquema
+del modelo y se copian las filas (quedan como versión 1).
+"""
+import logging
+from sqlalchemy import text
+from .connection import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_collage_result_versions():
+    """Reconstruye collage_results con versiones si todavía no tiene la columna version"""
+    from .models import CollageResult
+
+    engine = get_engine()
+
+    try:
+        with engine.connect() as conn:
+            # Verificar si la columna ya existe
+            result = conn.execute(text("PRAGMA table_info(collage_results)"))
+            old_columns = [row[1] for row in result]
+
+            if 'version' in old_columns:
+                logger.info("Columna 'version' ya existe en collage_results")
+                return
+
+            logger.info("Reconstruyendo collage_results con versiones...")
+
+            conn.execute(text("ALTER TABLE collage_results RENAME TO collage_results_old"))
+            CollageResult.__table__.create(conn)
+
+            columns = ", ".join(c for c in old_columns if c in CollageResult.__table__.columns)
+            conn.execute(text(
+                f"INSERT INTO collage_results ({columns}, version) "
+                f"SELECT {columns}, 1 FROM collage_results_old"
+            ))
+            conn.execute(text("DROP TABLE collage_results_old"))
+            conn.commit()
+
+            logger.info("Tabla collage_results migrada exitosamente")
+
+    except Exception as e:
+        logger.error(f"Error en migración: {e}", exc_info=True)
+        raise
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    migrate_collage_result_versions()
@@ -4,7 +4,7 @@ Migrados desde Django models
 """
 from sqlalchemy import (
     Column, Integer, String, DateTime, Boolean, ForeignKey,
-    Text, Date, Float, JSON
+    Text, Date, Float, JSON, UniqueConstraint
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -217,11 +217,21 @@ class CollageSession(Base):
     template = relationship("CollageTemplate", back_populates="sessions")
     evento = relationship("Evento", back_populates="collage_sessions")
     photos = relationship("SessionPhoto", back_populates="session", cascade="all, delete-orphan")
-    result = relationship("CollageResult", back_populates="session", uselist=False, cascade="all, delete-orphan")
+    results = relationship(
+        "CollageResult",
+        back_populates="session",
+        order_by="CollageResult.version",
+        cascade="all, delete-orphan"
+    )
 
     def __repr__(self):
         return f"<CollageSession {self.session_id} - {self.status}>"
 
+    @property
+    def result(self):
+        """Versión más reciente del collage (None si no se generó)"""
+        return self.results[-1] if self.results else None
+
 
 class SessionPhoto(Base):
     """Foto individual de una sesión de collage"""
@@ -244,22 +254,38 @@ class SessionPhoto(Base):
 
 
 class CollageResult(Base):
-    """Resultado final de un collage"""
+    """Resultado final de un collage (una fila por versión; re-renders agregan versiones)"""
     __tablename__ = 'collage_results'
+    __table_args__ = (
+        UniqueConstraint('session_id', 'version', name='uq_collage_results_session_version'),
+    )
 
     collage_id = Column(String(36), primary_key=True)
 
     # Foreign Key
-    session_id = Column(String(36), ForeignKey('collage_sessions.session_id', ondelete='CASCADE'), nullable=False, unique=True)
+    session_id = Column(String(36), ForeignKey('collage_sessions.session_id', ondelete='CASCADE'), nullable=False)
+
+    version = Column(Integer, nullable=False, default=1)
+    template_hash = Column(String(40), nullable=True)  # Contenido de la plantilla usada (render_plan.template_content_hash)
 
-    image_path = Column(String(500), nullable=False)  # Ruta al collage final
+    image_path = Column(String(500), nullable=False)  # Ruta al collage final (master de impresión)
+    screen_path = Column(String(500), nullable=True)  # Vista previa para la pantalla de resultado
+    web_path = Column(String(500), nullable=True)  # Versión para compartir (WebP/JPEG liviano)
+    thumbnail_path = Column(String(500), nullable=True)  # Miniatura
     print_count = Column(Integer, default=0)
     share_count = Column(Integer, default=0)
 
     created_at = Column(DateTime, server_default=func.now())
 
     # Relaciones
-    session = relationship("CollageSession", back_populates="result")
+    session = relationship("CollageSession", back_populates="results")
 
     def __repr__(self):
-        return f"<CollageResult {self.collage_id}>"
+        return f"<CollageResult {self.collage_id} v{self.version}>"
+
+    def set_derivatives(self, paths):
+        """Guarda las rutas de los derivados ({'print': ruta, 'screen': ruta, ...})"""
+        self.image_path = str(paths['print'])
+        self.screen_path = str(paths['screen']) if paths.get('screen') else None
+        self.web_path = str(paths['web']) if paths.get('web') else None
+        self.thumbnail_path = str(paths['thumbnail']) if paths.get('thumbnail') else None
@@ -19,6 +19,9 @@ from database import init_db
 # Importar ventana principal
 from ui.main_window import MainWindow
 
+# Importar utilidades
+from utils import set_default_render_backend, set_print_settings, set_color_settings
+
 
 def setup_logging():
     """Configura el sistema de logging"""
@@ -40,6 +43,14 @@ def main():
 
     logger.info(f"Iniciando {config.APP_NAME} v{config.APP_VERSION}")
 
+    # Backend de render y papel de impresión de los collages de esta instalación
+    set_default_render_backend(config.COLLAGE_SETTINGS['render_backend'])
+    set_print_settings(config.PRINT_SETTINGS['default_paper_size'], config.PRINT_SETTINGS['dpi'])
+    set_color_settings(
+        config.PRINT_SETTINGS['rendering_intent'],
+        profiles_dir=config.PRINT_SETTINGS['icc_profiles_dir'] or None
+    )
+
     # Crear aplicación Qt
     app = QApplication(sys.argv)
     app.setApplicationName(config.APP_NAME)
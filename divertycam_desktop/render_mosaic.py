@@ -0,0 +1,73 @@
+"""
+Mosaico de fotos de un evento (sin interfaz gráfica)
+
+Completa el índice de mosaico del evento con las fotos que falten y compone
+la imagen objetivo con las fotos del evento. Con salida .tif el póster se
+escribe por bandas sin tenerlo completo en memoria.
+
+Uso:
+    python render_mosaic.py --evento 12 --imagen logo.jpg --salida mosaico.tif [--papel 60x90] [--columnas 80]
+"""
+import argparse
+import logging
+import sys
+
+import config
+from database import init_db
+from utils import set_print_settings
+from utils.mosaic import DEFAULT_BLEND, DEFAULT_COLUMNS, render_mosaic, sync_event_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--evento", type=int, required=True, help="ID del evento")
+    parser.add_argument("--imagen", required=True, help="Imagen objetivo del mosaico")
+    parser.add_argument("--salida", required=True, help="Archivo de salida (.tif para el póster, .jpg para vista previa)")
+    parser.add_argument("--papel", default="60x90", help="Papel del póster en cm o nombre (A4, 15x21, ...)")
+    parser.add_argument("--columnas", type=int, default=DEFAULT_COLUMNS, help="Celdas por fila")
+    parser.add_argument("--mezcla", type=float, default=DEFAULT_BLEND, help="Mezcla de la imagen objetivo (0 a 1)")
+    parser.add_argument(
+        "--dpi",
+        type=float,
+        default=config.PRINT_SETTINGS['dpi'],
+        help="Resolución del póster"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(config.LOG_FILE)]
+    )
+
+    init_db()
+    set_print_settings(config.PRINT_SETTINGS['default_paper_size'], args.dpi)
+
+    index = sync_event_index(args.evento)
+    if not len(index):
+        print(f"El evento {args.evento} no tiene fotos")
+        return 1
+
+    result = render_mosaic(
+        index,
+        args.imagen,
+        args.salida,
+        paper_size=args.papel,
+        dpi=args.dpi,
+        columns=args.columnas,
+        blend=args.mezcla
+    )
+    if result is None:
+        print("Error generando el mosaico (ver log)")
+        return 1
+
+    width, height = result['size']
+    print(
+        f"Mosaico {width}x{height} ({result['columns']}x{result['rows']} celdas) con "
+        f"{result['photos_used']} de {len(index)} fotos: {result['path']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
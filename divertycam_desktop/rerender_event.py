@@ -0,0 +1,99 @@
+"""
+Re-render en lote de los collages de un evento (sin interfaz gráfica)
+
+Aplica una plantilla a todas las sesiones completadas del evento y guarda
+cada collage como nueva versión de CollageResult. Si se interrumpe, volver a
+ejecutar el mismo comando continúa con las sesiones que faltan.
+
+Uso:
+    python rerender_event.py --evento 12 --plantilla <template_id> [--workers 4] [--backend opencv] [--dpi 300]
+"""
+import argparse
+import logging
+import sys
+
+import config
+from database import init_db
+from utils import set_print_settings, set_color_settings
+from utils.batch_rerender import RerenderProgress, rerender_event
+
+
+def format_seconds(seconds) -> str:
+    """Segundos como h:mm:ss"""
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def print_progress(progress: RerenderProgress):
+    """Una línea de estado que se sobrescribe en la terminal"""
+    sys.stdout.write(
+        f"\r{progress.processed}/{progress.total} collages"
+        f"  {progress.throughput:.2f}/s"
+        f"  ETA {format_seconds(progress.eta)}"
+        f"  errores {progress.failed}   "
+    )
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--evento", type=int, required=True, help="ID del evento")
+    parser.add_argument("--plantilla", required=True, help="template_id de la plantilla a aplicar")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (default: uno por CPU)")
+    parser.add_argument(
+        "--backend",
+        default=config.COLLAGE_SETTINGS['render_backend'],
+        help="Backend de render: pil u opencv"
+    )
+    parser.add_argument(
+        "--dpi",
+        type=float,
+        default=config.PRINT_SETTINGS['dpi'],
+        help="Resolución de impresión de los collages"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(config.LOG_FILE)]
+    )
+
+    init_db()
+    set_print_settings(config.PRINT_SETTINGS['default_paper_size'], args.dpi)
+    set_color_settings(
+        config.PRINT_SETTINGS['rendering_intent'],
+        profiles_dir=config.PRINT_SETTINGS['icc_profiles_dir'] or None
+    )
+
+    try:
+        progress = rerender_event(
+            args.evento,
+            args.plantilla,
+            workers=args.workers,
+            render_backend=args.backend,
+            on_progress=print_progress
+        )
+    except KeyboardInterrupt:
+        print("\nInterrumpido. Ejecutar de nuevo el mismo comando para continuar.")
+        return 130
+
+    if progress is None:
+        print(f"Plantilla {args.plantilla} no encontrada")
+        return 1
+
+    print()
+    print(
+        f"Listo: {progress.done} collages nuevos, {progress.skipped} ya actualizados, "
+        f"{progress.failed} con error en {format_seconds(progress.elapsed)}"
+    )
+    for session_id in progress.failed_sessions:
+        print(f"  Error en sesión {session_id}")
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
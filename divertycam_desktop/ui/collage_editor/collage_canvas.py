@@ -1,12 +1,17 @@
 """
 Canvas interactivo para editar plantillas de collage
 """
+import logging
+
 from PySide6.QtWidgets import QGraphicsScene, QGraphicsView, QGraphicsPixmapItem
 from PySide6.QtCore import Qt, QRectF, Signal
 from PySide6.QtGui import QColor, QPen, QBrush, QPainter, QPixmap, QImage
 from PIL import Image
+from utils.render_targets import EDITOR_DPI, MM_PER_INCH
 from .photo_frame_item import PhotoFrameItem
 
+logger = logging.getLogger(__name__)
+
 
 class CollageCanvas(QGraphicsScene):
     """Escena gráfica para el editor de collage"""
@@ -22,8 +27,9 @@ class CollageCanvas(QGraphicsScene):
             height_cm: Alto del canvas en centímetros
             aspect_ratio: Relación de aspecto de la cámara
         """
-        # Conversión cm a píxeles (96 DPI)
-        self.cm_to_pixel = 37.8
+        # Conversión cm a píxeles (96 DPI): solo es el espacio de diseño, el
+        # collage se renderiza a la resolución de cada salida (render_targets)
+        self.cm_to_pixel = EDITOR_DPI / MM_PER_INCH * 10
         width_px = width_cm * self.cm_to_pixel
         height_px = height_cm * self.cm_to_pixel
 
@@ -42,8 +48,9 @@ class CollageCanvas(QGraphicsScene):
         self.background_color = QColor(255, 255, 255)
         self.background_image_item = None  # Item gráfico para la imagen de fondo
         self.background_image_path = None  # Ruta de la imagen de fondo
-        self.overlay_image = None
+        self.overlay_image = None  # Ruta del PNG superpuesto (marco decorativo sobre las fotos)
         self.overlay_opacity = 1.0
+        self.overlay_item = None
 
         self.setBackgroundBrush(QBrush(self.background_color))
 
@@ -180,6 +187,46 @@ class CollageCanvas(QGraphicsScene):
             self.background_image_item = None
             self.background_image_path = None
 
+    def set_overlay_image(self, image_path: str, opacity: float = None) -> bool:
+        """
+        Establece el PNG que va encima de las fotos (se estira al tamaño del canvas)
+
+        Returns:
+            True si se pudo cargar la imagen
+        """
+        self.remove_overlay_image()
+
+        pixmap = QPixmap(image_path)
+        if pixmap.isNull():
+            logger.warning(f"No se pudo cargar el marco superpuesto: {image_path}")
+            return False
+
+        canvas_rect = self.sceneRect()
+        pixmap = pixmap.scaled(
+            int(canvas_rect.width()), int(canvas_rect.height()),
+            Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+        )
+
+        if opacity is not None:
+            self.overlay_opacity = opacity
+
+        # Encima de todo, pero sin capturar los clicks (los marcos siguen editables)
+        self.overlay_item = QGraphicsPixmapItem(pixmap)
+        self.overlay_item.setZValue(1000)
+        self.overlay_item.setOpacity(self.overlay_opacity)
+        self.overlay_item.setAcceptedMouseButtons(Qt.NoButton)
+        self.addItem(self.overlay_item)
+
+        self.overlay_image = image_path
+        return True
+
+    def remove_overlay_image(self):
+        """Elimina el marco superpuesto"""
+        if self.overlay_item:
+            self.removeItem(self.overlay_item)
+            self.overlay_item = None
+        self.overlay_image = None
+
     def get_template_data(self) -> dict:
         """Retorna los datos de la plantilla actual"""
         # Obtener datos de todos los frames
@@ -188,8 +235,10 @@ class CollageCanvas(QGraphicsScene):
             frames_data.append(frame.get_frame_data())
 
         canvas_data = {
-            'width': int(self.width()),
-            'height': int(self.height()),
+            'width': round(self.width()),
+            'height': round(self.height()),
+            'width_mm': self.width_cm * 10,
+            'height_mm': self.height_cm * 10,
             'background_color': self.background_color.name()
         }
 
@@ -197,6 +246,11 @@ class CollageCanvas(QGraphicsScene):
         # se guarda separadamente en el modelo CollageTemplate.background_image)
         # El generador de collages obtendrá la ruta desde el modelo, no desde este JSON
 
+        # El PNG superpuesto sí va en el JSON (el editor guarda la ruta ya copiada a media/)
+        if self.overlay_image:
+            canvas_data['overlay_image'] = self.overlay_image
+            canvas_data['overlay_opacity'] = self.overlay_opacity
+
         return {
             'num_photos': len(self.frames),
             'canvas': canvas_data,
@@ -237,7 +291,13 @@ class CollageCanvas(QGraphicsScene):
 
     def mousePressEvent(self, event):
         """Maneja clicks en el canvas"""
-        item = self.itemAt(event.scenePos(), self.views()[0].transform())
+        items = [
+            item for item in self.items(
+                event.scenePos(), Qt.IntersectsItemShape, Qt.DescendingOrder, self.views()[0].transform()
+            )
+            if item is not self.overlay_item
+        ]
+        item = items[0] if items else None
 
         if isinstance(item, PhotoFrameItem):
             self.select_frame(item)
@@ -9,16 +9,25 @@ from typing import Optional
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QLabel, QPushButton, QLineEdit, QTextEdit, QSpinBox, QDoubleSpinBox,
-    QColorDialog, QFileDialog, QGroupBox, QMessageBox, QScrollArea, QSlider
+    QColorDialog, QFileDialog, QGroupBox, QMessageBox, QScrollArea, QSlider, QDialog
 )
 from PySide6.QtCore import Qt, QSize, Signal
-from PySide6.QtGui import QColor, QFont
+from PySide6.QtGui import QColor, QFont, QImage, QPixmap
+from PIL import Image
 
 import config
 from database import get_session, Evento, CollageTemplate
 from .collage_canvas import CollageCanvas, CollageCanvasView
 from .photo_frame_item import PhotoFrameItem
-from utils import copy_background_image, get_absolute_path
+from utils import (
+    CollageGenerator,
+    PREVIEW_TARGET,
+    collage_text_values,
+    copy_background_image,
+    copy_overlay_image,
+    get_absolute_path,
+    invalidate_template_cache
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +44,9 @@ class TemplateEditorWindow(QMainWindow):
         self.evento_id = evento_id
         self.template_id = template_id
         self.evento_nombre = ""
+        self.evento_fecha = None
         self.cliente_nombre = ""
+        self.text_layers = []  # Capas de texto de la plantilla (el editor no las modifica)
 
         # Cargar información del evento
         if not self.load_evento():
@@ -65,6 +76,7 @@ class TemplateEditorWindow(QMainWindow):
 
                 if evento:
                     self.evento_nombre = evento.nombre
+                    self.evento_fecha = evento.fecha_hora
                     self.cliente_nombre = evento.cliente.nombre_completo if evento.cliente else "Sin cliente"
                     return True
 
@@ -147,6 +159,10 @@ class TemplateEditorWindow(QMainWindow):
         self.btn_clear.clicked.connect(self.clear_canvas)
         canvas_buttons.addWidget(self.btn_clear)
 
+        self.btn_preview = QPushButton("👁 Vista Previa")
+        self.btn_preview.clicked.connect(self.show_preview)
+        canvas_buttons.addWidget(self.btn_preview)
+
         self.btn_save = QPushButton("💾 Guardar Plantilla")
         self.btn_save.clicked.connect(self.save_template)
         self.btn_save.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
@@ -265,6 +281,18 @@ class TemplateEditorWindow(QMainWindow):
         bg_image_layout.addWidget(self.btn_remove_bg)
         layout.addLayout(bg_image_layout)
 
+        # Marco superpuesto (PNG con transparencia encima de las fotos)
+        layout.addWidget(QLabel("Marco superpuesto (PNG):"))
+        overlay_layout = QHBoxLayout()
+        self.btn_load_overlay = QPushButton("Cargar PNG")
+        self.btn_load_overlay.clicked.connect(self.load_overlay_image)
+        overlay_layout.addWidget(self.btn_load_overlay)
+
+        self.btn_remove_overlay = QPushButton("Quitar")
+        self.btn_remove_overlay.clicked.connect(self.remove_overlay_image)
+        overlay_layout.addWidget(self.btn_remove_overlay)
+        layout.addLayout(overlay_layout)
+
         group.setLayout(layout)
         parent_layout.addWidget(group)
 
@@ -374,6 +402,27 @@ class TemplateEditorWindow(QMainWindow):
         """Quita la imagen de fondo"""
         self.canvas.remove_background_image()
 
+    def load_overlay_image(self):
+        """Carga el PNG que se superpone a las fotos"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Seleccionar Marco Superpuesto",
+            "",
+            "Imágenes PNG (*.png)"
+        )
+
+        if file_path and not self.canvas.set_overlay_image(file_path):
+            QMessageBox.warning(
+                self,
+                "Error",
+                f"No se pudo cargar el marco superpuesto:\n{file_path}\n\n"
+                "Verifique que sea un archivo PNG válido."
+            )
+
+    def remove_overlay_image(self):
+        """Quita el marco superpuesto"""
+        self.canvas.remove_overlay_image()
+
     def on_frame_selected(self, frame: PhotoFrameItem):
         """Maneja la selección de un marco"""
         self.no_selection_label.setVisible(False)
@@ -434,6 +483,47 @@ class TemplateEditorWindow(QMainWindow):
         """Elimina el marco seleccionado"""
         self.canvas.delete_selected_frame()
 
+    def show_preview(self):
+        """Renderiza la plantilla a resolución de pantalla con fotos de prueba"""
+        if len(self.canvas.frames) == 0:
+            QMessageBox.warning(self, "Error", "Agregue al menos un marco a la plantilla")
+            return
+
+        try:
+            template_data = self.canvas.get_template_data()
+            if self.canvas.background_image_path:
+                template_data['canvas']['background_image'] = self.canvas.background_image_path
+            if self.text_layers:
+                template_data['text_layers'] = self.text_layers
+
+            # Misma geometría que la impresión, a pocos DPI
+            generator = CollageGenerator(
+                template_data,
+                workers=1,
+                text_values=collage_text_values(self.evento_nombre, self.evento_fecha),
+                target=PREVIEW_TARGET
+            )
+            generator.begin()
+            for index, frame in enumerate(generator.plan.frames):
+                generator.render_frame(index, Image.new('RGB', (frame.width, frame.height), '#9E9E9E'))
+            generator.apply_overlay()
+            image = generator.get_canvas().convert('RGB')
+
+        except Exception as e:
+            logger.error(f"Error generando vista previa: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Error al generar la vista previa: {str(e)}")
+            return
+
+        qimage = QImage(image.tobytes(), image.width, image.height, image.width * 3, QImage.Format_RGB888).copy()
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Vista Previa")
+        layout = QVBoxLayout(dialog)
+        label = QLabel()
+        label.setPixmap(QPixmap.fromImage(qimage))
+        layout.addWidget(label)
+        dialog.exec()
+
     def save_template(self):
         """Guarda la plantilla en la base de datos"""
         try:
@@ -452,6 +542,22 @@ class TemplateEditorWindow(QMainWindow):
             template_data = self.canvas.get_template_data()
             template_data['nombre'] = name
             template_data['descripcion'] = self.txt_description.toPlainText()
+            if self.text_layers:
+                template_data['text_layers'] = self.text_layers
+
+            # Copiar el marco superpuesto a media/overlays y guardar su ruta relativa
+            if self.canvas.overlay_image:
+                try:
+                    template_data['canvas']['overlay_image'] = copy_overlay_image(self.canvas.overlay_image)
+                except Exception as e:
+                    logger.error(f"Error copiando marco superpuesto: {e}")
+                    template_data['canvas'].pop('overlay_image', None)
+                    template_data['canvas'].pop('overlay_opacity', None)
+                    QMessageBox.warning(
+                        self,
+                        "Advertencia",
+                        f"No se pudo copiar el marco superpuesto: {str(e)}\nLa plantilla se guardará sin él."
+                    )
 
             # Copiar imagen de fondo si existe
             background_image_path = None
@@ -483,6 +589,9 @@ class TemplateEditorWindow(QMainWindow):
                         template.background_color = self.canvas.background_color.name()
                         template.background_image = background_image_path  # Guardar ruta de imagen
                         template.template_data = json.dumps(template_data)
+
+                        # Las capas base renderizadas de la versión anterior ya no sirven
+                        invalidate_template_cache(self.template_id)
                 else:
                     # Crear nueva plantilla
                     template_id = str(uuid.uuid4())
@@ -552,6 +661,19 @@ class TemplateEditorWindow(QMainWindow):
                     template_data = json.loads(template_data)
 
                 self.canvas.load_template_data(template_data)
+                self.text_layers = template_data.get('text_layers', [])
+
+                # Cargar marco superpuesto si existe
+                overlay_image = template_data.get('canvas', {}).get('overlay_image')
+                if overlay_image:
+                    absolute_path = get_absolute_path(overlay_image)
+                    if absolute_path:
+                        self.canvas.set_overlay_image(
+                            str(absolute_path),
+                            template_data['canvas'].get('overlay_opacity', 1.0)
+                        )
+                    else:
+                        logger.warning(f"Marco superpuesto no encontrado: {overlay_image}")
 
                 logger.info(f"Plantilla cargada: {template_id}")
 
@@ -13,6 +13,7 @@ from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QFont
 
 from database import get_session, CollageTemplate, PhotoboothConfig
+from utils import invalidate_template_cache
 from .template_editor_window import TemplateEditorWindow
 
 logger = logging.getLogger(__name__)
@@ -303,6 +304,7 @@ class TemplateListWindow(QMainWindow):
                     if template:
                         session.delete(template)
                         session.commit()
+                        invalidate_template_cache(template_id)
 
                         QMessageBox.information(self, "Éxito", "Plantilla eliminada correctamente")
                         self.load_templates()
@@ -0,0 +1,130 @@
+"""
+Widget de preview de cámara
+Pinta frames numpy directamente en pantalla sin copias intermedias
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QImage, QPainter, QPen, QColor
+
+logger = logging.getLogger(__name__)
+
+
+class CameraPreviewWidget(QWidget):
+    """
+    Muestra frames BGR (convención OpenCV) envolviendo el buffer numpy en un
+    QImage sin copiarlo. El escalado, el espejo y el letterbox se aplican al
+    pintar, así que no hay conversiones por frame fuera de paintEvent.
+    """
+
+    def __init__(self, parent=None, mirror: bool = False, smooth: bool = True):
+        """
+        Args:
+            parent: Widget padre
+            mirror: Si reflejar horizontalmente el preview (efecto espejo)
+            smooth: Si usar escalado bilineal al pintar
+        """
+        super().__init__(parent)
+
+        self.mirror = mirror
+        self.smooth = smooth
+        self.border_color = QColor("#4CAF50")
+        self.border_width = 3
+        self.background_color = QColor(Qt.black)
+
+        # El frame se conserva para que el buffer del QImage siga vivo
+        self._frame: Optional[np.ndarray] = None
+        self._image: Optional[QImage] = None
+
+        # Pintamos todo el área nosotros mismos
+        self.setAttribute(Qt.WA_OpaquePaintEvent, True)
+        self.setAttribute(Qt.WA_NoSystemBackground, True)
+
+    def set_frame(self, frame: Optional[np.ndarray]):
+        """
+        Establece el frame a mostrar
+
+        Args:
+            frame: Array uint8 HxWx3 en orden BGR, o None para limpiar
+        """
+        if frame is None:
+            self.clear()
+            return
+
+        # Mismo frame que el anterior: nada que repintar
+        if frame is self._frame:
+            return
+
+        if frame.dtype != np.uint8 or frame.ndim != 3 or frame.shape[2] != 3:
+            logger.warning(f"Formato de frame no soportado: {frame.dtype} {frame.shape}")
+            return
+
+        # QImage necesita filas contiguas; los frames de OpenCV ya lo son
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+
+        height, width = frame.shape[:2]
+        self._frame = frame
+        self._image = QImage(frame.data, width, height, frame.strides[0], QImage.Format_BGR888)
+        self.update()
+
+    def clear(self):
+        """Limpia el preview"""
+        self._frame = None
+        self._image = None
+        self.update()
+
+    def set_mirror(self, mirror: bool):
+        """Activa o desactiva el efecto espejo"""
+        self.mirror = mirror
+        self.update()
+
+    def _target_rect(self, image_width: int, image_height: int) -> QRectF:
+        """Calcula el rectángulo destino manteniendo proporción (letterbox)"""
+        inner = QRectF(self.rect()).adjusted(
+            self.border_width, self.border_width,
+            -self.border_width, -self.border_width
+        )
+
+        scale = min(inner.width() / image_width, inner.height() / image_height)
+        target_width = image_width * scale
+        target_height = image_height * scale
+
+        x = inner.x() + (inner.width() - target_width) / 2
+        y = inner.y() + (inner.height() - target_height) / 2
+
+        return QRectF(x, y, target_width, target_height)
+
+    def paintEvent(self, event):
+        """Dibuja el frame escalado, centrado y opcionalmente reflejado"""
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.background_color)
+
+        if self._image is not None and not self._image.isNull():
+            if self.smooth:
+                painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+
+            target = self._target_rect(self._image.width(), self._image.height())
+
+            if self.mirror:
+                # Reflejar alrededor del eje vertical del rectángulo destino
+                painter.save()
+                painter.translate(target.x() + target.width(), target.y())
+                painter.scale(-1, 1)
+                painter.drawImage(QRectF(0, 0, target.width(), target.height()), self._image)
+                painter.restore()
+            else:
+                painter.drawImage(target, self._image)
+
+        if self.border_width > 0:
+            pen = QPen(self.border_color)
+            pen.setWidth(self.border_width)
+            painter.setPen(pen)
+            half = self.border_width / 2
+            painter.drawRect(QRectF(self.rect()).adjusted(half, half, -half, -half))
+
+        painter.end()
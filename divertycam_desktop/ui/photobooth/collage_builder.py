@@ -0,0 +1,193 @@
+"""
+Composición incremental del collage durante la sesión del photobooth
+
+El canvas (con fondo) se prepara al crear la sesión y cada foto se ajusta y
+pega en su marco en un hilo de fondo apenas se captura. Al terminar la sesión
+solo queda la última foto y la codificación de los derivados (impresión,
+pantalla, web y miniatura), también en el hilo de fondo.
+"""
+import logging
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Callable
+
+from PIL import Image
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+from utils import CollageGenerator, RenderTarget
+
+logger = logging.getLogger(__name__)
+
+
+class _BuildSignals(QObject):
+    """Señales emitidas desde el hilo de fondo (se entregan en el hilo de la ventana)"""
+    finished = Signal(str, object, str)  # session_id, {derivado: ruta} (vacío si falló), error
+
+
+class _BuildTask(QRunnable):
+    """Ejecuta un paso de la composición en el pool"""
+
+    def __init__(self, function: Callable, *args):
+        super().__init__()
+        self.function = function
+        self.args = args
+
+    def run(self):
+        self.function(*self.args)
+
+
+class SessionCollageBuilder(QObject):
+    """
+    Compone el collage de la sesión activa a medida que llegan las fotos
+
+    Usa un solo hilo: los pasos (canvas, fotos, guardado) se ejecutan en orden
+    y nunca dos a la vez sobre el mismo canvas.
+    """
+
+    collage_ready = Signal(str, str)  # session_id, ruta del collage
+    collage_failed = Signal(str, str)  # session_id, error
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.session_id: Optional[str] = None
+        self._generator: Optional[CollageGenerator] = None
+
+        self._signals = _BuildSignals()
+        self._signals.finished.connect(self._on_finished)
+
+        self._results: Dict[str, Optional[Dict[str, Path]]] = {}
+        self._waiters: Dict[str, List[Callable[[str, Optional[Dict[str, Path]]], None]]] = {}
+
+    def start(
+        self,
+        session_id: str,
+        template_data: Dict[str, Any],
+        text_values: Optional[Dict[str, str]] = None,
+        target: Optional[RenderTarget] = None
+    ):
+        """
+        Prepara el canvas de una nueva sesión en segundo plano
+
+        Args:
+            session_id: Sesión a componer
+            template_data: Plantilla (con 'background_image' en canvas si aplica)
+            text_values: Valores de las capas de texto ({evento}, {fecha}, {hora})
+            target: Resolución del collage (normalmente print_target())
+        """
+        self.session_id = session_id
+        self._generator = CollageGenerator(template_data, text_values=text_values, target=target)
+        self.pool.start(_BuildTask(self._begin, self._generator))
+
+    def add_photo(
+        self,
+        session_id: str,
+        frame_index: int,
+        photo: Image.Image,
+        jpeg_data: Optional[bytes] = None
+    ):
+        """
+        Encola el ajuste y pegado de una foto en su marco
+
+        Con el JPEG original de la cámara la foto se decodifica directamente a
+        la escala del marco.
+        """
+        if session_id != self.session_id or self._generator is None:
+            return
+        source = jpeg_data if jpeg_data is not None else photo
+        self.pool.start(_BuildTask(self._render_frame, self._generator, frame_index, source))
+
+    def finish(self, session_id: str, output_path: Path) -> bool:
+        """
+        Encola el guardado del collage y sus derivados
+
+        Args:
+            session_id: Sesión a guardar
+            output_path: Ruta del master de impresión (los derivados van a su lado)
+
+        Returns:
+            False si la sesión no se estaba componiendo (hay que generarlo desde disco)
+        """
+        if session_id != self.session_id or self._generator is None:
+            return False
+
+        self.pool.start(_BuildTask(self._save, self._generator, session_id, Path(output_path)))
+        self.session_id = None
+        self._generator = None
+        return True
+
+    def when_finished(self, session_id: str, callback: Callable[[str, Optional[Dict[str, Path]]], None]):
+        """
+        Ejecuta callback(session_id, derivados) cuando el collage de la sesión esté guardado
+
+        derivados es {'print': ruta, 'screen': ruta, ...}, o None si la
+        composición falló.
+        """
+        if session_id in self._results:
+            callback(session_id, self._results.pop(session_id))
+            return
+        self._waiters.setdefault(session_id, []).append(callback)
+
+    def cancel(self):
+        """Abandona la sesión en curso (los pasos ya encolados terminan sin efecto)"""
+        self.session_id = None
+        self._generator = None
+
+    def wait_for_all(self, timeout_ms: int = -1) -> bool:
+        """Bloquea hasta terminar los pasos encolados"""
+        return self.pool.waitForDone(timeout_ms)
+
+    @staticmethod
+    def _begin(generator: CollageGenerator):
+        try:
+            generator.begin()
+        except Exception as e:
+            logger.error(f"Error preparando canvas del collage: {e}", exc_info=True)
+
+    @staticmethod
+    def _render_frame(generator: CollageGenerator, frame_index: int, photo):
+        try:
+            generator.render_frame(frame_index, photo, add_border=True)
+            logger.info(f"Foto {frame_index + 1} compuesta en el collage")
+        except Exception as e:
+            logger.error(f"Error componiendo foto {frame_index + 1}: {e}", exc_info=True)
+
+    def _save(self, generator: CollageGenerator, session_id: str, output_path: Path):
+        paths = {}
+        error = ''
+        try:
+            missing = generator.missing_frames()
+            if missing:
+                error = f"Marcos sin foto: {missing}"
+            else:
+                paths = generator.save_derivatives(output_path)
+                if 'print' not in paths:
+                    error = "No se pudo guardar el master de impresión"
+        except Exception as e:
+            logger.error(f"Error guardando collage: {e}", exc_info=True)
+            error = str(e) or type(e).__name__
+
+        try:
+            self._signals.finished.emit(session_id, paths, error)
+        except RuntimeError:
+            # La ventana ya se cerró
+            pass
+
+    @Slot(str, object, str)
+    def _on_finished(self, session_id: str, paths: Dict[str, Path], error: str):
+        result = paths if not error else None
+        if result:
+            self.collage_ready.emit(session_id, str(paths['print']))
+        else:
+            logger.warning(f"No se pudo componer el collage de la sesión {session_id}: {error}")
+            self.collage_failed.emit(session_id, error)
+
+        waiters = self._waiters.pop(session_id, [])
+        if not waiters:
+            self._results[session_id] = result
+        for callback in waiters:
+            try:
+                callback(session_id, result)
+            except Exception as e:
+                logger.error(f"Error notificando collage de la sesión {session_id}: {e}", exc_info=True)
@@ -9,15 +9,54 @@ from PySide6.QtWidgets import (
     QLabel, QPushButton, QLineEdit, QSpinBox, QComboBox, QCheckBox,
     QColorDialog, QFileDialog, QGroupBox, QMessageBox, QScrollArea, QTabWidget
 )
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QObject, QRunnable, QThreadPool, Slot
 from PySide6.QtGui import QColor, QFont, QPixmap, QPalette, QBrush
 
 from database import get_session, Evento, PhotoboothConfig, CollageTemplate
 from utils import copy_background_image, get_absolute_path
+from controllers.base_camera import parse_camera_index
+from controllers.webcam_capabilities import get_cached_resolutions
+
+# Resoluciones ofrecidas cuando aún no se han sondeado los modos de la cámara
+DEFAULT_RESOLUTIONS = [
+    "640x480",
+    "1280x720",
+    "1920x1080",
+    "2560x1440",
+    "3840x2160"
+]
 
 logger = logging.getLogger(__name__)
 
 
+class _ProbeSignals(QObject):
+    finished = Signal(int, list)  # camera_index, modos
+
+
+class CameraModeProbe(QRunnable):
+    """Sondea los modos de una webcam fuera del hilo de la ventana (tarda varios segundos)"""
+
+    def __init__(self, camera_index: int):
+        super().__init__()
+        self.camera_index = camera_index
+        self.signals = _ProbeSignals()
+
+    def run(self):
+        from controllers.webcam_camera import WebcamCamera
+
+        modes = []
+        try:
+            modes = WebcamCamera.probe_modes(self.camera_index)
+        except Exception as e:
+            logger.error(f"Error sondeando modos de la webcam {self.camera_index}: {e}")
+
+        try:
+            self.signals.finished.emit(self.camera_index, modes)
+        except RuntimeError:
+            # La ventana ya se cerró
+            pass
+
+
 class PreviewFrame(QWidget):
     """Widget personalizado para el preview con manejo de resize"""
 
@@ -45,6 +84,11 @@ class ConfigPhotoboothWindow(QMainWindow):
         self.evento_nombre = ""
         self.config: Optional[PhotoboothConfig] = None
 
+        # Webcam configurada (PhotoboothConfig.camera_id) y sondeo de sus modos
+        self.camera_index = 0
+        self.probe_pool = QThreadPool(self)
+        self.probe_pool.setMaxThreadCount(1)
+
         # Cargar datos
         self.load_evento_data()
 
@@ -283,17 +327,19 @@ class ConfigPhotoboothWindow(QMainWindow):
         self.combo_tipo_camara.addItems(["Webcam", "DSLR Nikon", "USB PTP"])
         group_layout.addRow("Tipo de cámara:", self.combo_tipo_camara)
 
-        # Resolución
+        # Resolución (según los modos sondeados de la cámara)
         self.combo_resolucion = QComboBox()
-        self.combo_resolucion.addItems([
-            "640x480",
-            "1280x720",
-            "1920x1080",
-            "2560x1440",
-            "3840x2160"
-        ])
+        self.fill_resolution_options()
         self.combo_resolucion.setCurrentText("1280x720")
-        group_layout.addRow("Resolución:", self.combo_resolucion)
+
+        self.btn_detect_modes = QPushButton("🔍 Detectar")
+        self.btn_detect_modes.setToolTip("Sondea los formatos y resoluciones soportados por la cámara")
+        self.btn_detect_modes.clicked.connect(self.detect_camera_modes)
+
+        resolution_layout = QHBoxLayout()
+        resolution_layout.addWidget(self.combo_resolucion, 1)
+        resolution_layout.addWidget(self.btn_detect_modes)
+        group_layout.addRow("Resolución:", resolution_layout)
 
         # Balance de blancos
         self.combo_balance_blancos = QComboBox()
@@ -329,6 +375,44 @@ class ConfigPhotoboothWindow(QMainWindow):
 
         return widget
 
+    def fill_resolution_options(self):
+        """Llena el combo de resolución con la tabla de capacidades en caché"""
+        current = self.combo_resolucion.currentText()
+        resolutions = get_cached_resolutions(self.camera_index) or DEFAULT_RESOLUTIONS
+
+        self.combo_resolucion.clear()
+        self.combo_resolucion.addItems(resolutions)
+
+        if current:
+            self.combo_resolucion.setCurrentText(current)
+
+    def detect_camera_modes(self):
+        """Sondea en segundo plano los modos de la cámara configurada"""
+        self.btn_detect_modes.setEnabled(False)
+        self.btn_detect_modes.setText("Detectando...")
+
+        probe = CameraModeProbe(self.camera_index)
+        probe.signals.finished.connect(self.on_camera_modes_detected)
+        self.probe_pool.start(probe)
+
+    @Slot(int, list)
+    def on_camera_modes_detected(self, camera_index: int, modes: list):
+        """Actualiza las resoluciones disponibles con el resultado del sondeo"""
+        self.btn_detect_modes.setEnabled(True)
+        self.btn_detect_modes.setText("🔍 Detectar")
+
+        if not modes:
+            QMessageBox.warning(self, "Cámara", "No se pudieron detectar los modos de la cámara")
+            return
+
+        self.fill_resolution_options()
+        QMessageBox.information(
+            self,
+            "Cámara",
+            f"Se detectaron {len(modes)} modos. Resoluciones disponibles: "
+            f"{', '.join(get_cached_resolutions(camera_index))}"
+        )
+
     def create_timing_tab(self) -> QWidget:
         """Crea la pestaña de configuración de tiempos"""
         widget = QWidget()
@@ -510,7 +594,13 @@ class ConfigPhotoboothWindow(QMainWindow):
                     if tipo_index >= 0:
                         self.combo_tipo_camara.setCurrentIndex(tipo_index)
 
-                    self.combo_resolucion.setCurrentText(config.resolucion_camara or "1280x720")
+                    self.camera_index = parse_camera_index(config.camera_id)
+                    self.fill_resolution_options()
+
+                    resolucion = config.resolucion_camara or "1280x720"
+                    if self.combo_resolucion.findText(resolucion) < 0:
+                        self.combo_resolucion.addItem(resolucion)
+                    self.combo_resolucion.setCurrentText(resolucion)
                     self.combo_balance_blancos.setCurrentText(config.balance_blancos or "auto")
                     self.spin_iso.setValue(config.iso_valor or 400)
 
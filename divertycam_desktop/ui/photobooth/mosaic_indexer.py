@@ -0,0 +1,80 @@
+"""
+Índice de mosaico del evento actualizado durante la sesión
+
+Cada foto guardada por PhotoPersistence se agrega en un hilo de fondo al
+índice del evento (miniatura y firma de color, ver utils.mosaic), así el
+mosaico final no tiene que volver a leer todas las fotos del evento.
+"""
+import logging
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Slot
+
+from utils.mosaic import MosaicIndex, event_photo_paths
+
+logger = logging.getLogger(__name__)
+
+
+class _IndexTask(QRunnable):
+    """Ejecuta una actualización del índice en el pool"""
+
+    def __init__(self, function: Callable, *args):
+        super().__init__()
+        self.function = function
+        self.args = args
+
+    def run(self):
+        try:
+            self.function(*self.args)
+        except Exception as e:
+            logger.error(f"Error actualizando índice de mosaico: {e}")
+
+
+class MosaicIndexer(QObject):
+    """
+    Agrega las fotos del evento al índice de mosaico en segundo plano
+
+    Usa un solo hilo: el índice solo crece por el final y las escrituras no
+    deben intercalarse. La base de datos se consulta solo desde el hilo de la
+    ventana (la conexión SQLite es compartida).
+    """
+
+    def __init__(self, evento_id: int, parent=None):
+        super().__init__(parent)
+        self.evento_id = evento_id
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.index: Optional[MosaicIndex] = None
+
+        try:
+            self.index = MosaicIndex.for_event(evento_id)
+        except Exception as e:
+            logger.error(f"Error abriendo índice de mosaico del evento {evento_id}: {e}")
+
+    def backfill(self):
+        """Agrega las fotos del evento guardadas antes de abrir el índice (p. ej. de otra sesión de la app)"""
+        if self.index is None:
+            return
+        try:
+            paths = [path for path in event_photo_paths(self.evento_id) if path not in self.index]
+        except Exception as e:
+            logger.error(f"Error leyendo fotos del evento {self.evento_id} para el mosaico: {e}")
+            return
+        if paths:
+            logger.info(f"Índice de mosaico del evento {self.evento_id}: {len(paths)} fotos por agregar")
+            self.pool.start(_IndexTask(self._add_existing, paths))
+
+    def _add_existing(self, paths: List[str]):
+        added = self.index.add_photos(path for path in paths if Path(path).exists())
+        logger.info(f"Índice de mosaico del evento {self.evento_id}: {added} fotos agregadas, {len(self.index)} en total")
+
+    @Slot(str, int, str)
+    def on_photo_saved(self, session_id: str, frame_index: int, photo_path: str):
+        """Conectar a PhotoPersistence.photo_saved"""
+        if self.index is not None:
+            self.pool.start(_IndexTask(self.index.add_photo, photo_path))
+
+    def wait_for_all(self, timeout_ms: int = -1) -> bool:
+        """Bloquea hasta terminar las actualizaciones pendientes (usar al cerrar la ventana)"""
+        return self.pool.waitForDone(timeout_ms)
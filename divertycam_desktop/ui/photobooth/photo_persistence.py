@@ -0,0 +1,199 @@
+"""
+Guardado de fotos del photobooth fuera del hilo de la interfaz
+
+Cada foto se codifica a JPEG (si la cámara no entregó el JPEG original) y se
+escribe de forma atómica en un hilo de fondo; el registro SessionPhoto se
+inserta al recibir la señal, en el hilo de la ventana. La ventana recibe
+señales al terminar cada foto y puede esperar a que se guarden todas las
+fotos de una sesión antes de generar el collage.
+"""
+import io
+import logging
+from pathlib import Path
+from typing import Optional, Dict, List, Callable
+
+from PIL import Image
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+import config
+from database import get_session, SessionPhoto
+from utils import write_file_atomic
+
+logger = logging.getLogger(__name__)
+
+JPEG_QUALITY = 95
+
+
+class _SaveSignals(QObject):
+    """Señales emitidas desde el hilo de fondo (se entregan en el hilo de la ventana)"""
+    finished = Signal(str, int, str, str)  # session_id, frame_index, ruta, error ('' si ok)
+
+
+class PhotoSaveTask(QRunnable):
+    """Codifica y escribe una foto (sin tocar la base de datos)"""
+
+    def __init__(
+        self,
+        session_id: str,
+        frame_index: int,
+        photo_path: Path,
+        photo: Image.Image,
+        jpeg_data: Optional[bytes] = None
+    ):
+        super().__init__()
+        self.session_id = session_id
+        self.frame_index = frame_index
+        self.photo_path = photo_path
+        self.photo = photo
+        self.jpeg_data = jpeg_data
+        self.signals = _SaveSignals()
+
+    def run(self):
+        error = ''
+        try:
+            data = self.jpeg_data
+            if data is None:
+                buffer = io.BytesIO()
+                self.photo.save(buffer, "JPEG", quality=JPEG_QUALITY)
+                data = buffer.getvalue()
+
+            write_file_atomic(self.photo_path, data)
+
+        except Exception as e:
+            logger.error(f"Error guardando foto {self.photo_path}: {e}", exc_info=True)
+            error = str(e) or type(e).__name__
+
+        try:
+            self.signals.finished.emit(self.session_id, self.frame_index, str(self.photo_path), error)
+        except RuntimeError:
+            # La ventana ya se cerró; el archivo quedó escrito igualmente
+            pass
+
+
+class PhotoPersistence(QObject):
+    """
+    Cola de guardado de fotos en segundo plano
+
+    Por defecto usa un solo hilo: las fotos se escriben en orden. Los hilos de
+    fondo solo escriben archivos; la conexión SQLite es compartida por toda la
+    aplicación, así que SessionPhoto se registra en el hilo de la ventana. El
+    conteo de fotos pendientes se lleva por sesión y también se modifica solo
+    en el hilo de la ventana.
+    """
+
+    photo_saved = Signal(str, int, str)  # session_id, frame_index, ruta
+    photo_failed = Signal(str, int, str)  # session_id, frame_index, error
+    session_saved = Signal(str)  # session_id: ya no quedan fotos pendientes
+
+    def __init__(self, parent=None, max_threads: int = 1):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+
+        self._pending: Dict[str, int] = {}
+        self._failed: Dict[str, List[int]] = {}
+        self._waiters: Dict[str, List[Callable[[str], None]]] = {}
+
+    def submit(
+        self,
+        session_id: str,
+        frame_index: int,
+        photo: Image.Image,
+        jpeg_data: Optional[bytes] = None
+    ) -> Path:
+        """
+        Encola una foto para guardarla
+
+        Args:
+            session_id: Sesión a la que pertenece la foto
+            frame_index: Índice del marco del collage (0..n-1)
+            photo: Imagen capturada (no debe modificarse después)
+            jpeg_data: JPEG original de la cámara; si se indica no se recodifica
+
+        Returns:
+            Ruta donde quedará la foto
+        """
+        photo_path = config.PHOTOS_DIR / session_id / f"photo_{frame_index + 1}.jpg"
+
+        task = PhotoSaveTask(session_id, frame_index, photo_path, photo, jpeg_data)
+        task.signals.finished.connect(self._on_task_finished)
+
+        self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        self.pool.start(task)
+        return photo_path
+
+    def pending_count(self, session_id: str) -> int:
+        """Fotos de la sesión que aún no terminan de guardarse"""
+        return self._pending.get(session_id, 0)
+
+    def failed_frames(self, session_id: str) -> List[int]:
+        """Índices de las fotos de la sesión que no se pudieron guardar"""
+        return list(self._failed.get(session_id, []))
+
+    def when_session_saved(self, session_id: str, callback: Callable[[str], None]):
+        """
+        Ejecuta callback(session_id) cuando todas las fotos de la sesión estén guardadas
+
+        Solo espera las fotos de esa sesión: las de sesiones anteriores que sigan
+        en cola no la retrasan. Si no hay pendientes se ejecuta de inmediato.
+        """
+        if self.pending_count(session_id) == 0:
+            callback(session_id)
+            return
+        self._waiters.setdefault(session_id, []).append(callback)
+
+    def wait_for_all(self, timeout_ms: int = -1) -> bool:
+        """Bloquea hasta terminar todas las escrituras (usar al cerrar la ventana)"""
+        return self.pool.waitForDone(timeout_ms)
+
+    @Slot(str, int, str, str)
+    def _on_task_finished(self, session_id: str, frame_index: int, photo_path: str, error: str):
+        if not error:
+            error = self._register_photo(session_id, frame_index, photo_path)
+
+        remaining = self._pending.get(session_id, 1) - 1
+        if remaining > 0:
+            self._pending[session_id] = remaining
+        else:
+            self._pending.pop(session_id, None)
+
+        if error:
+            self._failed.setdefault(session_id, []).append(frame_index)
+            self.photo_failed.emit(session_id, frame_index, error)
+        else:
+            self.photo_saved.emit(session_id, frame_index, photo_path)
+
+        if remaining <= 0:
+            self.session_saved.emit(session_id)
+            for callback in self._waiters.pop(session_id, []):
+                try:
+                    callback(session_id)
+                except Exception as e:
+                    logger.error(f"Error notificando fin de guardado de la sesión {session_id}: {e}", exc_info=True)
+
+    def _register_photo(self, session_id: str, frame_index: int, photo_path: str) -> str:
+        """
+        Registra la foto ya escrita como SessionPhoto (en el hilo de la ventana)
+
+        Returns:
+            Mensaje de error, o '' si se registró
+        """
+        try:
+            with get_session() as session:
+                session.add(SessionPhoto(
+                    session_id=session_id,
+                    frame_index=frame_index,
+                    image_path=photo_path
+                ))
+                session.commit()
+
+            logger.info(f"Foto guardada: {photo_path}")
+            return ''
+
+        except Exception as e:
+            logger.error(f"Error registrando foto {photo_path}: {e}", exc_info=True)
+            return str(e) or type(e).__name__
+
+    def forget_session(self, session_id: str):
+        """Descarta el registro de errores de una sesión ya procesada"""
+        self._failed.pop(session_id, None)
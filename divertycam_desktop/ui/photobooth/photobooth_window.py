@@ -8,29 +8,39 @@ Flujo:
 4. Pantalla de Resultado con collage
 """
 import logging
-import uuid
 from pathlib import Path
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, Dict
 from PIL import Image
 
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QMessageBox, QStackedWidget
 )
-from PySide6.QtCore import Qt, QTimer, Signal
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QPixmap, QImage, QFont, QPalette, QBrush, QColor
 
 import config
-from database import get_session, Evento, PhotoboothConfig, CollageSession, SessionPhoto, CollageResult, CollageTemplate
-from controllers import CameraManager
-from utils import CollageGenerator, get_absolute_path
+from database import get_session, Evento, PhotoboothConfig
+from controllers import CameraManager, SessionEngine, SessionListener, SessionState, SessionTimings
+from controllers.base_camera import parse_camera_index
+from utils import get_absolute_path, print_target, RenderTarget
+from .camera_preview_widget import CameraPreviewWidget
+from .photo_persistence import PhotoPersistence
+from .collage_builder import SessionCollageBuilder
+from .mosaic_indexer import MosaicIndexer
+from .session_adapters import QtClock, DatabaseSessionStorage
 
 logger = logging.getLogger(__name__)
 
 
-class PhotoboothWindow(QMainWindow):
-    """Ventana del Photobooth con flujo de 3 pantallas"""
+class PhotoboothWindow(QMainWindow, SessionListener):
+    """
+    Ventana del Photobooth con flujo de 3 pantallas
+
+    Es solo la vista: el flujo de cada sesión (cuenta regresiva, captura,
+    guardado y collage) lo lleva SessionEngine, que notifica a la ventana
+    como SessionListener.
+    """
 
     def __init__(self, evento_id: int, parent=None):
         super().__init__(parent)
@@ -43,19 +53,24 @@ class PhotoboothWindow(QMainWindow):
         self.camera_manager = CameraManager()
         self.camera = None
 
-        # Datos de sesión
-        self.session_id = None
-        self.captured_photos: List[Image.Image] = []
-        self.current_photo_index = 0
-        self.total_photos = 0
+        # Motor de sesiones (se crea al cargar la configuración del evento)
+        self.engine: Optional[SessionEngine] = None
+        self.current_collage_path: Optional[Path] = None
 
         # Timers
         self.preview_timer = QTimer()
         self.preview_timer.timeout.connect(self.update_camera_preview)
 
-        self.countdown_timer = QTimer()
-        self.countdown_timer.timeout.connect(self.update_countdown)
-        self.countdown_value = 0
+        # Guardado de fotos en segundo plano
+        self.photo_persistence = PhotoPersistence(self)
+        self.photo_persistence.photo_failed.connect(self.on_photo_save_failed)
+
+        # Composición del collage a medida que se capturan las fotos
+        self.collage_builder = SessionCollageBuilder(self)
+
+        # Índice de fotos para el mosaico del evento
+        self.mosaic_indexer = MosaicIndexer(evento_id, self)
+        self.photo_persistence.photo_saved.connect(self.mosaic_indexer.on_photo_saved)
 
         # Cargar datos del evento
         if not self.load_evento_data():
@@ -63,6 +78,27 @@ class PhotoboothWindow(QMainWindow):
             self.close()
             return
 
+        camera_settings = config.CAMERA_SETTINGS
+        storage = DatabaseSessionStorage(
+            evento_id,
+            self.config_data['plantilla_collage_id'],
+            self.evento_nombre,
+            self.evento_fecha,
+            self.collage_target(),
+            self.photo_persistence,
+            self.collage_builder
+        )
+        self.engine = SessionEngine(
+            QtClock(self),
+            storage,
+            timings=SessionTimings.from_config(self.config_data),
+            listener=self,
+            zero_shutter_lag=camera_settings['zero_shutter_lag'],
+            sharpest_of=camera_settings['zsl_sharpest_of']
+        )
+
+        self.mosaic_indexer.backfill()
+
         # Inicializar UI
         self.init_ui()
 
@@ -82,6 +118,7 @@ class PhotoboothWindow(QMainWindow):
 
                 # Guardar datos básicos
                 self.evento_nombre = evento.nombre
+                self.evento_fecha = evento.fecha_hora
                 self.cliente_nombre = evento.cliente.nombre_completo if evento.cliente else "Sin cliente"
 
                 # Cargar configuración de photobooth
@@ -106,7 +143,10 @@ class PhotoboothWindow(QMainWindow):
                     'tiempo_entre_fotos': pb_config.tiempo_entre_fotos or 3,
                     'tiempo_visualizacion_foto': pb_config.tiempo_visualizacion_foto or 2,
                     'plantilla_collage_id': pb_config.plantilla_collage_id,
-                    'resolucion_camara': pb_config.resolucion_camara or '1280x720'
+                    'resolucion_camara': pb_config.resolucion_camara or '1280x720',
+                    'camera_index': parse_camera_index(pb_config.camera_id),
+                    'paper_size': pb_config.paper_size or config.PRINT_SETTINGS['default_paper_size'],
+                    'printer_name': pb_config.printer_name
                 }
 
                 return True
@@ -115,6 +155,10 @@ class PhotoboothWindow(QMainWindow):
             logger.error(f"Error cargando datos del evento: {e}", exc_info=True)
             return False
 
+    def collage_target(self) -> RenderTarget:
+        """Target de impresión con el papel y la impresora del photobooth"""
+        return print_target(self.config_data.get('paper_size'), printer_name=self.config_data.get('printer_name'))
+
     def init_ui(self):
         """Inicializa la interfaz con 3 pantallas"""
         self.setWindowTitle(f"Photobooth - {self.evento_nombre}")
@@ -275,12 +319,11 @@ class PhotoboothWindow(QMainWindow):
         camera.setPalette(palette)
 
         # Vista previa de la cámara
-        self.camera_preview_label = QLabel()
-        self.camera_preview_label.setAlignment(Qt.AlignCenter)
-        self.camera_preview_label.setMinimumSize(800, 600)
-        self.camera_preview_label.setStyleSheet("border: 3px solid #4CAF50;")
-        self.camera_preview_label.setScaledContents(False)
-        layout.addWidget(self.camera_preview_label, 1)
+        self.camera_preview = CameraPreviewWidget(
+            mirror=config.PHOTOBOOTH_SETTINGS.get('mirror_preview', True)
+        )
+        self.camera_preview.setMinimumSize(800, 600)
+        layout.addWidget(self.camera_preview, 1)
 
         # Indicador de progreso
         self.progress_label = QLabel("0 / 0 fotos")
@@ -421,9 +464,30 @@ class PhotoboothWindow(QMainWindow):
         try:
             # Inicializar cámara
             resolution = self.config_data['resolucion_camara']
-            self.camera = self.camera_manager.create_camera('webcam', resolution=resolution)
+            camera_settings = config.CAMERA_SETTINGS
+            buffer_size = camera_settings['zsl_preroll_frames'] if camera_settings['zero_shutter_lag'] else 4
+            camera_type = camera_settings['camera_type_override'] or 'webcam'
+            if camera_type == 'webcam':
+                camera_kwargs = {
+                    'preview_resolution': camera_settings['preview_resolution'],
+                    'dual_stream': camera_settings['dual_stream'],
+                    'mjpeg_passthrough': camera_settings['mjpeg_passthrough'],
+                }
+            else:
+                camera_kwargs = {
+                    'source': camera_settings['camera_source'],
+                    'fps': camera_settings['camera_fps'],
+                }
+
+            self.camera = self.camera_manager.create_camera(
+                camera_type,
+                camera_index=self.config_data['camera_index'],
+                resolution=resolution,
+                buffer_size=buffer_size,
+                **camera_kwargs
+            )
 
-            if not self.camera.connect():
+            if not self.camera or not self.camera.connect():
                 QMessageBox.critical(self, "Error", "No se pudo conectar a la cámara")
                 return
 
@@ -431,7 +495,8 @@ class PhotoboothWindow(QMainWindow):
             self.stack.setCurrentIndex(1)
 
             # Crear sesión en la base de datos
-            if not self.create_session():
+            self.engine.camera = self.camera
+            if not self.engine.begin_session():
                 QMessageBox.critical(self, "Error", "No se pudo crear la sesión")
                 return
 
@@ -447,88 +512,16 @@ class PhotoboothWindow(QMainWindow):
             logger.error(f"Error iniciando cámara: {e}", exc_info=True)
             QMessageBox.critical(self, "Error", f"Error iniciando cámara: {str(e)}")
 
-    def create_session(self) -> bool:
-        """Crea una nueva sesión de collage en la base de datos"""
-        try:
-            from database.seed import get_or_create_default_template
-
-            # Obtener plantilla
-            template_id = self.config_data['plantilla_collage_id']
-
-            if not template_id:
-                # Crear plantilla predeterminada
-                template_id = get_or_create_default_template(self.evento_id, 4)
-
-                if not template_id:
-                    logger.error("No se pudo crear plantilla predeterminada")
-                    return False
-
-            # Obtener número de fotos de la plantilla
-            with get_session() as session:
-                import json
-
-                template = session.query(CollageTemplate).filter(
-                    CollageTemplate.template_id == template_id
-                ).first()
-
-                if not template:
-                    logger.error("Plantilla no encontrada")
-                    return False
-
-                template_data = template.template_data
-                if isinstance(template_data, str):
-                    template_data = json.loads(template_data)
-
-                self.total_photos = template_data.get('num_photos', 4)
-
-                # Crear sesión
-                self.session_id = str(uuid.uuid4())
-
-                collage_session = CollageSession(
-                    session_id=self.session_id,
-                    template_id=template_id,
-                    evento_id=self.evento_id,
-                    status='active'
-                )
-
-                session.add(collage_session)
-                session.commit()
-
-                logger.info(f"Sesión creada: {self.session_id}, {self.total_photos} fotos")
-
-            # Actualizar UI
-            self.current_photo_index = 0
-            self.captured_photos = []
-            self.update_progress()
-
-            return True
-
-        except Exception as e:
-            logger.error(f"Error creando sesión: {e}", exc_info=True)
-            return False
-
     def update_camera_preview(self):
         """Actualiza el preview de la cámara"""
         try:
             if not self.camera:
                 return
 
-            preview = self.camera.get_preview()
-            if preview:
-                # Convertir PIL Image a QPixmap
-                preview_rgb = preview.convert('RGB')
-                data = preview_rgb.tobytes("raw", "RGB")
-                qimage = QImage(data, preview_rgb.width, preview_rgb.height, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(qimage)
-
-                # Escalar manteniendo proporción
-                scaled_pixmap = pixmap.scaled(
-                    self.camera_preview_label.size(),
-                    Qt.KeepAspectRatio,
-                    Qt.SmoothTransformation
-                )
-
-                self.camera_preview_label.setPixmap(scaled_pixmap)
+            # El widget pinta el buffer numpy directamente, sin copias
+            frame = self.camera.get_preview_frame()
+            if frame is not None:
+                self.camera_preview.set_frame(frame)
 
         except Exception as e:
             logger.error(f"Error actualizando preview: {e}")
@@ -536,14 +529,14 @@ class PhotoboothWindow(QMainWindow):
     def update_instructions(self):
         """Actualiza las instrucciones mostradas"""
         instruction_text = (
-            f"Se tomarán {self.total_photos} fotos con "
+            f"Se tomarán {self.engine.total_photos} fotos con "
             f"{self.config_data['tiempo_entre_fotos']} segundos entre cada una"
         )
         self.instruction_label.setText(instruction_text)
 
     def update_progress(self):
         """Actualiza el indicador de progreso"""
-        self.progress_label.setText(f"{len(self.captured_photos)} / {self.total_photos} fotos")
+        self.progress_label.setText(f"{self.engine.captured} / {self.engine.total_photos} fotos")
 
     def start_photo_session(self):
         """Inicia la captura automática de fotos"""
@@ -551,104 +544,78 @@ class PhotoboothWindow(QMainWindow):
             self.btn_start_session.setEnabled(False)
             self.btn_start_session.setText("📸 Tomando fotos...")
 
-            # Iniciar cuenta regresiva para la primera foto
-            self.start_countdown()
+            # El motor lleva la cuenta regresiva y la captura de cada foto
+            self.engine.start_photos()
 
         except Exception as e:
             logger.error(f"Error iniciando sesión de fotos: {e}", exc_info=True)
             QMessageBox.critical(self, "Error", f"Error: {str(e)}")
 
-    def start_countdown(self):
-        """Inicia la cuenta regresiva antes de tomar una foto"""
-        self.countdown_value = self.config_data['tiempo_cuenta_regresiva']
-        self.countdown_label.setText(str(self.countdown_value))
-
-        # Centrar y mostrar overlay
-        self.center_countdown_overlay()
-        self.countdown_label.setVisible(True)
-
-        self.countdown_timer.start(1000)
-
     def center_countdown_overlay(self):
         """Centra el overlay de cuenta regresiva"""
         parent_size = self.stack.currentWidget().size()
-        overlay_size = self.countdown_label.sizeHint()
 
         x = (parent_size.width() - 300) // 2
         y = (parent_size.height() - 200) // 2
 
         self.countdown_label.setGeometry(x, y, 300, 200)
 
-    def update_countdown(self):
-        """Actualiza la cuenta regresiva"""
-        self.countdown_value -= 1
+    # --- Notificaciones del motor de sesiones ---
 
-        if self.countdown_value > 0:
-            self.countdown_label.setText(str(self.countdown_value))
-        elif self.countdown_value == 0:
-            self.countdown_label.setText("¡Sonríe!")
-        else:
-            # Terminar countdown y capturar
-            self.countdown_timer.stop()
-            self.countdown_label.setVisible(False)
+    def on_state_changed(self, state: SessionState):
+        """Ajusta la pantalla de cámara a la etapa de la sesión"""
+        if state == SessionState.READY:
+            # Sesión nueva o foto fallida: esperar el botón
+            self.btn_start_session.setEnabled(True)
+            self.btn_start_session.setText("📸 ¡TOMAR FOTOS!")
 
-            # Capturar foto
-            QTimer.singleShot(500, self.capture_photo)
+        elif state == SessionState.COUNTDOWN:
+            if not self.preview_timer.isActive():
+                # Viene de mostrar la foto anterior: reanudar preview
+                self.camera_preview.clear()
+                self.update_progress()
+                self.preview_timer.start(33)
+                logger.info("Reanudando preview para siguiente foto")
 
-    def capture_photo(self):
-        """Captura una foto"""
-        try:
-            if not self.camera:
-                logger.error("Cámara no disponible")
-                return
+            # Centrar y mostrar overlay
+            self.center_countdown_overlay()
+            self.countdown_label.setVisible(True)
 
-            # Capturar imagen
-            photo = self.camera.capture()
+        elif state == SessionState.CAPTURING:
+            self.countdown_label.setVisible(False)
 
-            if not photo:
-                logger.error("No se pudo capturar la foto")
-                QMessageBox.warning(self, "Error", "No se pudo capturar la foto")
-                self.btn_start_session.setEnabled(True)
-                self.btn_start_session.setText("📸 ¡TOMAR FOTOS!")
-                return
+        elif state == SessionState.SAVING:
+            self.preview_timer.stop()
+            if self.engine.storage.pending_photos(self.engine.session_id):
+                self.progress_label.setText("Guardando fotos...")
 
-            # Guardar foto
-            self.captured_photos.append(photo)
+    def on_countdown(self, value: int):
+        """Muestra el número de la cuenta regresiva"""
+        self.countdown_label.setText(str(value) if value > 0 else "¡Sonríe!")
 
-            # Guardar en la base de datos
-            self.save_photo_to_db(photo)
+    def on_progress(self, captured: int, total: int):
+        self.update_progress()
 
-            # Actualizar progreso
-            self.update_progress()
+    def on_photo_captured(self, frame_index: int, total: int, photo: Image.Image):
+        # Un error mostrando la foto no interrumpe la sesión
+        try:
+            self.show_captured_photo(frame_index, total)
+        except Exception as e:
+            logger.error(f"Error mostrando foto: {e}", exc_info=True)
 
-            logger.info(f"Foto {len(self.captured_photos)}/{self.total_photos} capturada exitosamente")
+    def on_capture_failed(self, message: str):
+        """La sesión vuelve a READY: el botón permite reintentar la foto"""
+        QMessageBox.warning(self, "Error", message)
 
-            # Intentar mostrar foto capturada durante tiempo_visualizacion_foto
-            try:
-                self.show_captured_photo(photo)
-            except Exception as e:
-                logger.error(f"Error mostrando foto: {e}", exc_info=True)
-
-            # SIEMPRE continuar con el flujo, independiente de errores en visualización
-            # Verificar si terminamos
-            if len(self.captured_photos) >= self.total_photos:
-                # Todas las fotos capturadas - esperar tiempo de visualización + continuar
-                wait_time = self.config_data['tiempo_visualizacion_foto'] * 1000
-                logger.info(f"Sesión completa. Esperando {wait_time}ms antes de generar collage")
-                QTimer.singleShot(wait_time, self.finish_session)
-            else:
-                # Esperar tiempo de visualización + tiempo entre fotos antes de la siguiente
-                tiempo_vis = self.config_data['tiempo_visualizacion_foto']
-                tiempo_entre = self.config_data['tiempo_entre_fotos']
-                total_wait = (tiempo_vis + tiempo_entre) * 1000
-                logger.info(f"Esperando {tiempo_vis}s (visualización) + {tiempo_entre}s (entre fotos) = {total_wait}ms antes de siguiente foto")
-                QTimer.singleShot(total_wait, self.continue_to_next_photo)
+    def on_result(self, derivatives: Dict[str, Path]):
+        # Vista previa ya reducida si existe
+        self.show_result(derivatives['print'], derivatives.get('screen'))
 
-        except Exception as e:
-            logger.error(f"Error capturando foto: {e}", exc_info=True)
-            QMessageBox.critical(self, "Error", f"Error capturando foto: {str(e)}")
+    def on_session_failed(self, message: str):
+        QMessageBox.warning(self, "Advertencia", message)
+        self.restart_session()
 
-    def show_captured_photo(self, photo: Image.Image):
+    def show_captured_photo(self, frame_index: int, total: int):
         """Muestra la foto capturada temporalmente"""
         # VERSIÓN SIMPLIFICADA - Solo detener preview temporalmente
         try:
@@ -660,175 +627,28 @@ class PhotoboothWindow(QMainWindow):
 
             # TODO: Implementar visualización correcta de la foto
             # Por ahora solo mostramos un mensaje en el label del progreso
-            self.progress_label.setText(f"✓ Foto {len(self.captured_photos)}/{self.total_photos} capturada")
+            self.progress_label.setText(f"✓ Foto {frame_index + 1}/{total} capturada")
 
-            logger.info(f"Foto {len(self.captured_photos)} capturada. Esperando antes de continuar...")
+            logger.info(f"Foto {frame_index + 1} capturada. Esperando antes de continuar...")
 
         except Exception as e:
             logger.error(f"Error en show_captured_photo: {e}", exc_info=True)
 
-    def continue_to_next_photo(self):
-        """Continúa con la siguiente foto después de mostrar la capturada"""
-        try:
-            # Limpiar el preview label
-            self.camera_preview_label.clear()
-
-            # Actualizar el progreso de nuevo
-            self.update_progress()
-
-            # Reanudar preview de cámara
-            self.preview_timer.start(30)  # 30ms = ~33 fps
-
-            logger.info("Reanudando preview para siguiente foto")
-
-            # Comenzar countdown para la siguiente foto
-            self.start_countdown()
-
-        except Exception as e:
-            logger.error(f"Error continuando a siguiente foto: {e}", exc_info=True)
-
-    def save_photo_to_db(self, photo: Image.Image):
-        """Guarda la foto en la base de datos"""
-        try:
-            # Crear directorio si no existe
-            photos_dir = config.PHOTOS_DIR / self.session_id
-            photos_dir.mkdir(parents=True, exist_ok=True)
-
-            # Guardar imagen
-            photo_filename = f"photo_{len(self.captured_photos)}.jpg"
-            photo_path = photos_dir / photo_filename
-            photo.save(photo_path, "JPEG", quality=95)
-
-            # Guardar en BD
-            with get_session() as session:
-                session_photo = SessionPhoto(
-                    session_id=self.session_id,
-                    frame_index=len(self.captured_photos) - 1,
-                    image_path=str(photo_path)
-                )
-
-                session.add(session_photo)
-                session.commit()
+    def on_photo_save_failed(self, session_id: str, frame_index: int, error: str):
+        """Notifica que una foto no se pudo guardar"""
+        logger.error(f"No se pudo guardar la foto {frame_index + 1} de la sesión {session_id}: {error}")
 
-                logger.info(f"Foto guardada: {photo_path}")
+    def show_result(self, collage_path: Path, preview_path: Optional[Path] = None):
+        """
+        Muestra la pantalla de resultado con el collage
 
-        except Exception as e:
-            logger.error(f"Error guardando foto en DB: {e}", exc_info=True)
-
-    def finish_session(self):
-        """Finaliza la sesión y genera el collage"""
-        try:
-            # Detener preview
-            self.preview_timer.stop()
-
-            # Actualizar sesión en BD
-            with get_session() as session:
-                collage_session = session.query(CollageSession).filter(
-                    CollageSession.session_id == self.session_id
-                ).first()
-
-                if collage_session:
-                    collage_session.status = 'completed'
-                    collage_session.completed_at = datetime.now()
-                    session.commit()
-
-            logger.info("Sesión completada, generando collage...")
-
-            # Generar collage
-            collage_path = self.generate_collage()
-
-            if collage_path:
-                # Mostrar resultado
-                self.show_result(collage_path)
-            else:
-                QMessageBox.warning(self, "Advertencia", "Hubo un problema generando el collage")
-                self.restart_session()
-
-        except Exception as e:
-            logger.error(f"Error finalizando sesión: {e}", exc_info=True)
-            QMessageBox.critical(self, "Error", f"Error: {str(e)}")
-
-    def generate_collage(self) -> Optional[Path]:
-        """Genera el collage"""
-        try:
-            import json
-
-            with get_session() as session:
-                # Obtener sesión y plantilla
-                collage_session = session.query(CollageSession).filter(
-                    CollageSession.session_id == self.session_id
-                ).first()
-
-                if not collage_session:
-                    return None
-
-                template_db = session.query(CollageTemplate).filter(
-                    CollageTemplate.template_id == collage_session.template_id
-                ).first()
-
-                if not template_db:
-                    return None
-
-                # Obtener template data
-                template_data = template_db.template_data
-                if isinstance(template_data, str):
-                    template_data = json.loads(template_data)
-
-                # Agregar imagen de fondo al template_data desde el modelo
-                if template_db.background_image:
-                    template_data['canvas']['background_image'] = template_db.background_image
-                    logger.info(f"Imagen de fondo agregada al collage: {template_db.background_image}")
-
-                # Obtener fotos
-                photos = session.query(SessionPhoto).filter(
-                    SessionPhoto.session_id == self.session_id
-                ).order_by(SessionPhoto.frame_index).all()
-
-                if not photos:
-                    return None
-
-                image_paths = [photo.image_path for photo in photos]
-
-                # Generar collage
-                generator = CollageGenerator(template_data)
-
-                collage_id = str(uuid.uuid4())
-                output_filename = f"collage_{collage_id}.jpg"
-                output_path = config.COLLAGES_DIR / output_filename
-
-                result_path = generator.generate(
-                    images=image_paths,
-                    output_path=output_path,
-                    add_border=True
-                )
-
-                if not result_path:
-                    return None
-
-                # Guardar en BD
-                collage_result = CollageResult(
-                    collage_id=collage_id,
-                    session_id=self.session_id,
-                    image_path=str(result_path),
-                    print_count=0,
-                    share_count=0
-                )
-
-                session.add(collage_result)
-                session.commit()
-
-                logger.info(f"Collage generado: {result_path}")
-                return result_path
-
-        except Exception as e:
-            logger.error(f"Error generando collage: {e}", exc_info=True)
-            return None
-
-    def show_result(self, collage_path: Path):
-        """Muestra la pantalla de resultado con el collage"""
+        Args:
+            collage_path: Master de impresión
+            preview_path: Derivado para pantalla (evita decodificar el master)
+        """
         try:
             # Cargar imagen del collage
-            pixmap = QPixmap(str(collage_path))
+            pixmap = QPixmap(str(preview_path or collage_path))
 
             # Escalar manteniendo proporción
             scaled_pixmap = pixmap.scaled(
@@ -851,9 +671,7 @@ class PhotoboothWindow(QMainWindow):
     def restart_session(self):
         """Reinicia para una nueva sesión"""
         # Limpiar datos
-        self.session_id = None
-        self.captured_photos = []
-        self.current_photo_index = 0
+        self.engine.reset()
         self.current_collage_path = None
 
         # Volver a pantalla de bienvenida
@@ -863,6 +681,7 @@ class PhotoboothWindow(QMainWindow):
         if self.camera:
             self.camera.disconnect()
             self.camera = None
+        self.engine.camera = None
 
         # Detener preview
         self.preview_timer.stop()
@@ -884,7 +703,7 @@ class PhotoboothWindow(QMainWindow):
 
         # Detener timers
         self.preview_timer.stop()
-        self.countdown_timer.stop()
+        self.engine.reset()
 
         # Cerrar ventana
         self.close()
@@ -893,10 +712,18 @@ class PhotoboothWindow(QMainWindow):
         """Maneja el cierre de la ventana"""
         # Detener timers
         self.preview_timer.stop()
-        self.countdown_timer.stop()
+        if self.engine:
+            self.engine.reset()
 
         # Cerrar cámara
         if self.camera:
             self.camera.disconnect()
 
+        # Terminar de escribir las fotos en cola
+        if not self.photo_persistence.wait_for_all(10000):
+            logger.warning("Cerrando con fotos pendientes de guardar")
+        self.collage_builder.cancel()
+        self.collage_builder.wait_for_all(10000)
+        self.mosaic_indexer.wait_for_all(10000)
+
         event.accept()
@@ -0,0 +1,258 @@
+"""
+Adaptadores del motor de sesiones para la ventana del photobooth
+
+- QtClock: temporizador sobre QTimer (en el hilo de la ventana)
+- DatabaseSessionStorage: sesiones y collages en la base de datos, fotos
+  guardadas por PhotoPersistence y collage compuesto por SessionCollageBuilder
+"""
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from PIL import Image
+from PySide6.QtCore import QObject, QTimer
+
+import config
+from controllers.session_engine import SessionClock, SessionStorage
+from database import get_session, CollageSession, SessionPhoto, CollageResult, CollageTemplate
+from utils import (
+    CollageGenerator,
+    RenderTarget,
+    collage_text_values,
+    template_content_hash,
+    template_data_from_model,
+)
+from .collage_builder import SessionCollageBuilder
+from .photo_persistence import PhotoPersistence
+
+logger = logging.getLogger(__name__)
+
+
+class QtClock(SessionClock):
+    """Reloj del motor con time.monotonic (el de las cámaras) y QTimer"""
+
+    def __init__(self, parent: QObject):
+        self.parent = parent
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> QTimer:
+        timer = QTimer(self.parent)
+        timer.setSingleShot(True)
+        timer.timeout.connect(callback)
+        timer.timeout.connect(timer.deleteLater)
+        timer.start(max(0, round(delay * 1000)))
+        return timer
+
+    def cancel(self, handle: QTimer):
+        try:
+            handle.stop()
+            handle.deleteLater()
+        except RuntimeError:
+            # El timer ya se disparó y fue eliminado
+            pass
+
+
+class DatabaseSessionStorage(SessionStorage):
+    """Persistencia de las sesiones del photobooth de un evento"""
+
+    def __init__(
+        self,
+        evento_id: int,
+        template_id: Optional[str],
+        evento_nombre: str,
+        evento_fecha: Optional[datetime],
+        target: RenderTarget,
+        photo_persistence: PhotoPersistence,
+        collage_builder: SessionCollageBuilder
+    ):
+        """
+        Args:
+            evento_id: Evento del photobooth
+            template_id: Plantilla configurada (None = plantilla predeterminada)
+            evento_nombre: Nombre del evento (textos del collage)
+            evento_fecha: Fecha del evento (textos del collage)
+            target: Target de impresión del photobooth
+            photo_persistence: Cola de guardado de fotos
+            collage_builder: Composición del collage durante la sesión
+        """
+        self.evento_id = evento_id
+        self.template_id = template_id
+        self.evento_nombre = evento_nombre
+        self.evento_fecha = evento_fecha
+        self.target = target
+        self.photo_persistence = photo_persistence
+        self.collage_builder = collage_builder
+        self._composing: Dict[str, bool] = {}
+
+    def create_session(self, session_id: str) -> int:
+        from database.seed import get_or_create_default_template
+
+        template_id = self.template_id
+        if not template_id:
+            # Crear plantilla predeterminada
+            template_id = get_or_create_default_template(self.evento_id, 4)
+
+            if not template_id:
+                logger.error("No se pudo crear plantilla predeterminada")
+                return 0
+            # Las siguientes sesiones del evento usan la misma
+            self.template_id = template_id
+
+        with get_session() as session:
+            template = session.query(CollageTemplate).filter(
+                CollageTemplate.template_id == template_id
+            ).first()
+
+            if not template:
+                logger.error("Plantilla no encontrada")
+                return 0
+
+            template_data = template_data_from_model(template)
+
+            collage_session = CollageSession(
+                session_id=session_id,
+                template_id=template_id,
+                evento_id=self.evento_id,
+                status='active'
+            )
+
+            session.add(collage_session)
+            session.commit()
+
+        # Preparar el canvas del collage mientras se toman las fotos
+        self.collage_builder.start(
+            session_id,
+            template_data,
+            collage_text_values(self.evento_nombre, self.evento_fecha),
+            self.target
+        )
+        return template_data.get('num_photos', 4)
+
+    def add_photo(self, session_id: str, frame_index: int, photo: Image.Image, jpeg_data: Optional[bytes]):
+        self.photo_persistence.submit(session_id, frame_index, photo, jpeg_data)
+
+        # Pegar la foto en el collage en segundo plano
+        self.collage_builder.add_photo(session_id, frame_index, photo, jpeg_data)
+
+    def pending_photos(self, session_id: str) -> int:
+        return self.photo_persistence.pending_count(session_id)
+
+    def finish_session(self, session_id: str, collage_id: str):
+        output_path = config.COLLAGES_DIR / f"collage_{collage_id}.jpg"
+        self._composing[session_id] = self.collage_builder.finish(session_id, output_path)
+
+    def when_photos_saved(self, session_id: str, callback: Callable[[str], None]):
+        self.photo_persistence.when_session_saved(session_id, callback)
+
+    def complete_session(self, session_id: str):
+        failed = self.photo_persistence.failed_frames(session_id)
+        self.photo_persistence.forget_session(session_id)
+        if failed:
+            logger.warning(f"{len(failed)} fotos de la sesión no se guardaron: {failed}")
+
+        with get_session() as session:
+            collage_session = session.query(CollageSession).filter(
+                CollageSession.session_id == session_id
+            ).first()
+
+            if collage_session:
+                collage_session.status = 'completed'
+                collage_session.completed_at = datetime.now()
+                session.commit()
+
+    def when_collage_ready(self, session_id: str, callback: Callable[[str, Optional[Dict[str, Path]]], None]):
+        if self._composing.pop(session_id, False):
+            self.collage_builder.when_finished(session_id, callback)
+        else:
+            callback(session_id, None)
+
+    def register_collage(
+        self,
+        session_id: str,
+        collage_id: str,
+        composed: Optional[Dict[str, Path]]
+    ) -> Optional[Dict[str, Path]]:
+        try:
+            with get_session() as session:
+                # Obtener sesión y plantilla
+                collage_session = session.query(CollageSession).filter(
+                    CollageSession.session_id == session_id
+                ).first()
+
+                if not collage_session:
+                    return None
+
+                template_db = session.query(CollageTemplate).filter(
+                    CollageTemplate.template_id == collage_session.template_id
+                ).first()
+
+                if not template_db:
+                    return None
+
+                template_data = template_data_from_model(template_db)
+
+                if composed:
+                    derivatives = composed
+                else:
+                    # Obtener fotos
+                    photos = session.query(SessionPhoto).filter(
+                        SessionPhoto.session_id == session_id
+                    ).order_by(SessionPhoto.frame_index).all()
+
+                    if not photos:
+                        return None
+
+                    image_paths = [photo.image_path for photo in photos]
+
+                    # Generar collage
+                    generator = CollageGenerator(
+                        template_data,
+                        workers=config.COLLAGE_SETTINGS['render_workers'],
+                        text_values=collage_text_values(
+                            self.evento_nombre, self.evento_fecha, collage_session.created_at
+                        ),
+                        target=self.target
+                    )
+
+                    output_path = config.COLLAGES_DIR / f"collage_{collage_id}.jpg"
+
+                    generator.generate(
+                        images=image_paths,
+                        output_path=output_path,
+                        add_border=True,
+                        derivatives=True
+                    )
+                    derivatives = generator.derivative_paths
+
+                result_path = derivatives.get('print')
+                if not result_path:
+                    return None
+
+                # Guardar en BD
+                collage_result = CollageResult(
+                    collage_id=collage_id,
+                    session_id=session_id,
+                    version=1,
+                    template_hash=template_content_hash(template_data),
+                    print_count=0,
+                    share_count=0
+                )
+                collage_result.set_derivatives(derivatives)
+
+                session.add(collage_result)
+                session.commit()
+
+                logger.info(f"Collage generado: {result_path}")
+                return derivatives
+
+        except Exception as e:
+            logger.error(f"Error generando collage: {e}", exc_info=True)
+            return None
+
+    def cancel_session(self, session_id: str):
+        self._composing.pop(session_id, None)
+        self.collage_builder.cancel()
@@ -2,20 +2,55 @@
 Utilidades para DivertyCam Desktop
 """
 from .collage_generator import CollageGenerator
-from .collage_templates import get_default_templates, create_template
+from .render_plan import get_render_plan, get_render_plan_cache, invalidate_template_cache, template_content_hash
+from .render_backends import get_render_backend, set_default_render_backend, available_render_backends
+from .render_targets import RenderTarget, PREVIEW_TARGET, print_target, poster_target, resolve_template, set_print_settings
+from .color_management import set_color_settings, get_color_transform_cache
+from .collage_output import encode_derivatives, DerivativeSpec, DEFAULT_DERIVATIVES
+from .mosaic import MosaicIndex, render_mosaic, sync_event_index
+from .text_layers import collage_text_values, get_text_cache
+from .collage_templates import get_default_templates, create_template, template_data_from_model
 from .file_utils import (
     copy_background_image,
+    copy_overlay_image,
     get_absolute_path,
     delete_background_image,
-    ensure_media_directories
+    ensure_media_directories,
+    write_file_atomic
 )
 
 __all__ = [
     'CollageGenerator',
+    'get_render_plan',
+    'get_render_plan_cache',
+    'invalidate_template_cache',
+    'template_content_hash',
+    'get_render_backend',
+    'set_default_render_backend',
+    'available_render_backends',
+    'RenderTarget',
+    'PREVIEW_TARGET',
+    'print_target',
+    'poster_target',
+    'resolve_template',
+    'set_print_settings',
+    'set_color_settings',
+    'get_color_transform_cache',
+    'encode_derivatives',
+    'DerivativeSpec',
+    'DEFAULT_DERIVATIVES',
+    'MosaicIndex',
+    'render_mosaic',
+    'sync_event_index',
+    'collage_text_values',
+    'get_text_cache',
     'get_default_templates',
     'create_template',
+    'template_data_from_model',
     'copy_background_image',
+    'copy_overlay_image',
     'get_absolute_path',
     'delete_background_image',
     'ensure_media_directories',
+    'write_file_atomic',
 ]
@@ -0,0 +1,221 @@
+"""
+Caché en disco de las capas base de las plantillas de collage
+Guarda la capa ya renderizada (fondo, bordes) como RGBX crudo sin comprimir y
+la abre con mmap: al reiniciar la aplicación la capa es una vista del archivo,
+sin decodificar ni redimensionar la imagen de fondo otra vez. Pillow solo
+mapea sin copiar buffers de 4 bytes por píxel (RGBX), no RGB; el canvas se
+convierte a RGB una sola vez al copiarlo (RenderBackend.new_canvas)
+"""
+import json
+import logging
+import mmap
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List
+
+from PIL import Image
+
+from .file_utils import MEDIA_DIR, write_file_atomic
+
+logger = logging.getLogger(__name__)
+
+BASE_LAYER_CACHE_DIR = MEDIA_DIR / "cache" / "base_layers"
+
+# Tamaño máximo de la caché en disco
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Formato de los píxeles en disco (ver el docstring del módulo)
+RAW_MODE = "RGBX"
+RAW_EXTENSION = ".rgbx"
+META_EXTENSION = ".json"
+
+
+class BaseLayerDiskCache:
+    """
+    Capas base en disco, indexadas por una clave de contenido
+
+    La clave incluye el hash de template_data y la fecha de la imagen de fondo,
+    así que editar la plantilla o cambiar el fondo genera una entrada nueva. Una
+    misma plantilla convive con varias entradas (una por target y textos del
+    evento), por eso las capas solo se eliminan al editar la plantilla
+    (invalidate_template) o por antigüedad de uso al superar el tamaño máximo.
+    """
+
+    def __init__(self, cache_dir: Path = BASE_LAYER_CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str):
+        return self.cache_dir / f"{key}{RAW_EXTENSION}", self.cache_dir / f"{key}{META_EXTENSION}"
+
+    def load(self, key: str) -> Optional[Image.Image]:
+        """
+        Abre una capa base mapeada en memoria
+
+        Args:
+            key: Clave de la capa
+
+        Returns:
+            Imagen RGBX de solo lectura respaldada por el mmap del archivo, o
+            None si no está en caché
+        """
+        raw_path, meta_path = self._paths(key)
+        try:
+            if not raw_path.exists() or not meta_path.exists():
+                return None
+
+            meta = json.loads(meta_path.read_text())
+            width, height = meta["width"], meta["height"]
+
+            with open(raw_path, 'rb') as f:
+                if f.seek(0, 2) != width * height * 4:
+                    logger.warning(f"Capa base corrupta en caché: {raw_path.name}")
+                    return None
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            # Vista sin copia: Pillow marca la imagen como de solo lectura y la
+            # copiaría si alguien intentara modificarla
+            image = Image.frombuffer(RAW_MODE, (width, height), buffer, "raw", RAW_MODE, 0, 1)
+
+            # Marcar como usada recientemente para el desalojo
+            raw_path.touch()
+            logger.info(f"Capa base cargada desde caché: {raw_path.name}")
+            return image
+
+        except Exception as e:
+            logger.error(f"Error cargando capa base {key}: {e}")
+            return None
+
+    def store(
+        self,
+        key: str,
+        image: Image.Image,
+        template_id: Optional[str] = None
+    ) -> bool:
+        """
+        Guarda una capa base
+
+        Args:
+            key: Clave de la capa
+            image: Capa renderizada
+            template_id: Plantilla de origen (para invalidate_template)
+
+        Returns:
+            True si se guardó
+        """
+        raw_path, meta_path = self._paths(key)
+        try:
+            if image.mode != RAW_MODE:
+                image = image.convert(RAW_MODE)
+
+            with self._lock:
+                if not raw_path.exists():
+                    write_file_atomic(raw_path, image.tobytes())
+                write_file_atomic(meta_path, json.dumps({
+                    "width": image.width,
+                    "height": image.height,
+                    "template_id": template_id,
+                }).encode("utf-8"))
+
+                self._evict(keep=key)
+
+            logger.info(f"Capa base guardada en caché: {raw_path.name}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error guardando capa base {key}: {e}")
+            return False
+
+    def invalidate_template(self, template_id: str) -> int:
+        """
+        Elimina las capas de una plantilla (al editarla o borrarla)
+
+        Returns:
+            Número de capas eliminadas
+        """
+        with self._lock:
+            keys = [k for k, meta in self._entries().items() if meta.get("template_id") == template_id]
+            return self._remove_entries(keys)
+
+    def clear(self) -> int:
+        """Elimina todas las capas"""
+        with self._lock:
+            return self._remove_entries(list(self._entries()))
+
+    def get_stats(self) -> Dict:
+        """Entradas y tamaño ocupado en disco"""
+        with self._lock:
+            keys = list(self._entries())
+            size = sum(self._raw_size(k) for k in keys)
+        return {"entries": len(keys), "bytes": size, "max_bytes": self.max_bytes}
+
+    def _entries(self) -> Dict[str, Dict]:
+        """Metadatos de las capas en disco"""
+        entries = {}
+        if not self.cache_dir.exists():
+            return entries
+        for meta_path in self.cache_dir.glob(f"*{META_EXTENSION}"):
+            try:
+                entries[meta_path.stem] = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                entries[meta_path.stem] = {}
+        return entries
+
+    def _raw_size(self, key: str) -> int:
+        try:
+            return self._paths(key)[0].stat().st_size
+        except OSError:
+            return 0
+
+    def _remove_entries(self, keys: List[str]) -> int:
+        removed = 0
+        for key in keys:
+            raw_path, meta_path = self._paths(key)
+            try:
+                raw_path.unlink(missing_ok=True)
+                meta_path.unlink(missing_ok=True)
+                removed += 1
+            except OSError as e:
+                # En Windows no se puede borrar un archivo mapeado en memoria;
+                # los metadatos se conservan para reintentar más adelante
+                logger.debug(f"No se pudo eliminar {raw_path.name}: {e}")
+        if removed:
+            logger.info(f"{removed} capas base eliminadas de la caché")
+        return removed
+
+    def _evict(self, keep: Optional[str] = None):
+        """Desaloja las capas usadas hace más tiempo hasta respetar el tamaño máximo"""
+        entries = []
+        total = 0
+        for key in self._entries():
+            raw_path = self._paths(key)[0]
+            try:
+                stat = raw_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, key, stat.st_size))
+            total += stat.st_size
+
+        entries.sort()
+        to_remove = []
+        for _, key, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            to_remove.append(key)
+            total -= size
+
+        self._remove_entries(to_remove)
+
+
+_default_cache: Optional[BaseLayerDiskCache] = None
+
+
+def get_base_layer_cache() -> BaseLayerDiskCache:
+    """Caché de capas base compartida por toda la aplicación"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = BaseLayerDiskCache()
+    return _default_cache
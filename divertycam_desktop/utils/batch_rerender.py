@@ -0,0 +1,312 @@
+"""
+Re-render en lote de los collages de un evento
+
+Regenera con otra plantilla (o con la misma plantilla editada) el collage de
+todas las sesiones completadas de un evento usando un pool de procesos. Cada
+collage nuevo se guarda como una versión más de CollageResult con el hash de
+la plantilla usada, por lo que una ejecución interrumpida se reanuda
+simplemente volviendo a ejecutarla: las sesiones cuya última versión ya tiene
+ese hash se omiten.
+
+Las sesiones se leen de la base de datos por tandas (paginación por
+session_id) y solo hay unas pocas en vuelo por proceso, así que la memoria no
+depende del tamaño del evento.
+"""
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func
+
+from database import get_session, CollageResult, CollageSession, CollageTemplate, Evento, PhotoboothConfig, SessionPhoto
+
+from .collage_generator import CollageGenerator
+from .collage_templates import template_data_from_model
+from .color_management import get_color_settings, set_color_settings
+from .file_utils import COLLAGES_DIR
+from .render_plan import template_content_hash
+from .render_targets import RenderTarget, print_target
+from .text_layers import collage_text_values
+
+logger = logging.getLogger(__name__)
+
+# Sesiones leídas de la base de datos por consulta
+SESSION_BATCH_SIZE = 50
+
+# Collages en vuelo por proceso del pool (limita la memoria del proceso principal)
+IN_FLIGHT_PER_WORKER = 2
+
+
+@dataclass
+class RerenderProgress:
+    """Estado del re-render en lote"""
+    total: int
+    skipped: int = 0
+    done: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    failed_sessions: List[str] = field(default_factory=list)
+
+    @property
+    def processed(self) -> int:
+        return self.done + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Collages procesados por segundo"""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Segundos estimados para terminar (None hasta tener una medición)"""
+        throughput = self.throughput
+        if throughput <= 0:
+            return None
+        return (self.total - self.processed) / throughput
+
+
+# Plantilla del proceso del pool (se envía una sola vez en el initializer)
+_worker_template: Optional[Dict[str, Any]] = None
+_worker_target: Optional[RenderTarget] = None
+
+
+def _init_worker(
+    template_data: Dict[str, Any],
+    render_backend: Optional[str],
+    target: Optional[RenderTarget],
+    color_settings: Tuple[str, bool, Path]
+):
+    global _worker_template, _worker_target
+    _worker_template = template_data
+    _worker_target = target
+    set_color_settings(*color_settings)
+    if render_backend:
+        from .render_backends import set_default_render_backend
+        set_default_render_backend(render_backend)
+
+
+def _render_session(image_paths: List[str], output_path: str, text_values: Dict[str, str]) -> Dict[str, str]:
+    """Genera el collage de una sesión en un proceso del pool"""
+    generator = CollageGenerator(_worker_template, workers=1, text_values=text_values, target=_worker_target)
+    if not generator.generate(image_paths, output_path, add_border=True, derivatives=True):
+        raise RuntimeError("No se pudo generar el collage")
+    return {name: str(path) for name, path in generator.derivative_paths.items()}
+
+
+def _pending_sessions_query(session, evento_id: int, template_hash: str):
+    """Sesiones completadas del evento cuya última versión no usa la plantilla pedida"""
+    latest = session.query(
+        CollageResult.session_id,
+        func.max(CollageResult.version).label('version')
+    ).group_by(CollageResult.session_id).subquery()
+
+    up_to_date = session.query(CollageResult.session_id).join(
+        latest,
+        and_(CollageResult.session_id == latest.c.session_id, CollageResult.version == latest.c.version)
+    ).filter(CollageResult.template_hash == template_hash)
+
+    return session.query(CollageSession.session_id).filter(
+        CollageSession.evento_id == evento_id,
+        CollageSession.status == 'completed',
+        ~CollageSession.session_id.in_(up_to_date)
+    )
+
+
+def iter_pending_sessions(
+    evento_id: int,
+    template_hash: str,
+    batch_size: int = SESSION_BATCH_SIZE
+) -> Iterator[Tuple[str, Optional[datetime], List[str]]]:
+    """
+    Recorre las sesiones pendientes con sus fotos, por tandas
+
+    Yields:
+        (session_id, fecha de la sesión, rutas de las fotos ordenadas por frame_index)
+    """
+    last_id = ''
+    while True:
+        with get_session() as session:
+            rows = _pending_sessions_query(session, evento_id, template_hash).add_columns(
+                CollageSession.created_at
+            ).filter(
+                CollageSession.session_id > last_id
+            ).order_by(CollageSession.session_id).limit(batch_size).all()
+
+            if not rows:
+                return
+
+            session_ids = [row.session_id for row in rows]
+            created_at = {row.session_id: row.created_at for row in rows}
+
+            photos: Dict[str, List[str]] = {session_id: [] for session_id in session_ids}
+            rows = session.query(SessionPhoto.session_id, SessionPhoto.image_path).filter(
+                SessionPhoto.session_id.in_(session_ids)
+            ).order_by(SessionPhoto.session_id, SessionPhoto.frame_index)
+            for session_id, image_path in rows:
+                photos[session_id].append(image_path)
+
+        for session_id in session_ids:
+            yield session_id, created_at[session_id], photos[session_id]
+        last_id = session_ids[-1]
+
+
+def save_result_version(session_id: str, collage_id: str, paths: Dict[str, str], template_hash: str) -> int:
+    """
+    Registra un collage re-renderizado como nueva versión de CollageResult
+
+    Returns:
+        Número de versión guardada
+    """
+    with get_session() as session:
+        current = session.query(func.max(CollageResult.version)).filter(
+            CollageResult.session_id == session_id
+        ).scalar() or 0
+
+        result = CollageResult(
+            collage_id=collage_id,
+            session_id=session_id,
+            version=current + 1,
+            template_hash=template_hash,
+            print_count=0,
+            share_count=0
+        )
+        result.set_derivatives(paths)
+        session.add(result)
+        session.commit()
+        return result.version
+
+
+def rerender_event(
+    evento_id: int,
+    template_id: str,
+    workers: Optional[int] = None,
+    output_dir: Path = COLLAGES_DIR,
+    render_backend: Optional[str] = None,
+    on_progress: Optional[Callable[[RerenderProgress], None]] = None,
+    target: Optional[RenderTarget] = None
+) -> Optional[RerenderProgress]:
+    """
+    Regenera los collages de todas las sesiones completadas de un evento
+
+    Args:
+        evento_id: Evento a re-renderizar
+        template_id: Plantilla a aplicar
+        workers: Procesos del pool (None = uno por CPU)
+        output_dir: Carpeta de los collages nuevos
+        render_backend: Backend de render de los procesos ('pil', 'opencv')
+        on_progress: Se llama tras cada collage con el estado actual
+        target: Resolución de los collages (None = impresión en el papel del evento)
+
+    Returns:
+        Estado final, o None si la plantilla no existe
+    """
+    with get_session() as session:
+        template_db = session.query(CollageTemplate).filter(
+            CollageTemplate.template_id == template_id
+        ).first()
+        if not template_db:
+            logger.error(f"Plantilla {template_id} no encontrada")
+            return None
+        if template_db.evento_id != evento_id:
+            logger.warning(f"La plantilla {template_id} pertenece al evento {template_db.evento_id}")
+
+        template_data = template_data_from_model(template_db)
+        template_hash = template_content_hash(template_data)
+
+        evento = session.query(Evento).filter(Evento.id == evento_id).first()
+        evento_nombre = evento.nombre if evento else None
+        evento_fecha = evento.fecha_hora if evento else None
+
+        if target is None:
+            pb_config = session.query(PhotoboothConfig).filter(
+                PhotoboothConfig.evento_id == evento_id
+            ).first()
+            target = print_target(
+                pb_config.paper_size if pb_config else None,
+                printer_name=pb_config.printer_name if pb_config else None
+            )
+
+        completed = session.query(func.count(CollageSession.session_id)).filter(
+            CollageSession.evento_id == evento_id,
+            CollageSession.status == 'completed'
+        ).scalar()
+        pending = _pending_sessions_query(session, evento_id, template_hash).count()
+
+    progress = RerenderProgress(total=pending, skipped=completed - pending)
+    logger.info(
+        f"Re-render del evento {evento_id}: {pending} sesiones pendientes "
+        f"({progress.skipped} ya usan la plantilla)"
+    )
+    if not pending:
+        return progress
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    num_photos = template_data["num_photos"]
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(template_data, render_backend, target, get_color_settings())
+    )
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+    in_flight: Dict[Any, Tuple[str, str]] = {}
+
+    def collect(futures):
+        for future in futures:
+            session_id, collage_id = in_flight.pop(future)
+            try:
+                version = save_result_version(session_id, collage_id, future.result(), template_hash)
+                progress.done += 1
+                logger.debug(f"Sesión {session_id}: versión {version}")
+            except Exception as e:
+                logger.error(f"Error re-renderizando sesión {session_id}: {e}")
+                progress.failed += 1
+                progress.failed_sessions.append(session_id)
+            if on_progress:
+                on_progress(progress)
+
+    try:
+        for session_id, session_time, image_paths in iter_pending_sessions(evento_id, template_hash):
+            if len(image_paths) < num_photos:
+                logger.warning(f"Sesión {session_id}: {len(image_paths)} fotos, la plantilla necesita {num_photos}")
+                progress.failed += 1
+                progress.failed_sessions.append(session_id)
+                if on_progress:
+                    on_progress(progress)
+                continue
+
+            collage_id = str(uuid.uuid4())
+            output_path = output_dir / f"collage_{collage_id}.jpg"
+            text_values = collage_text_values(evento_nombre, evento_fecha, session_time)
+            future = executor.submit(_render_session, image_paths, str(output_path), text_values)
+            in_flight[future] = (session_id, collage_id)
+
+            if len(in_flight) >= max_in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(finished)
+
+    except KeyboardInterrupt:
+        logger.warning("Re-render interrumpido; al volver a ejecutarlo continúa con las sesiones pendientes")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+
+    return progress
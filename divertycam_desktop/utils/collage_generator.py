@@ -3,53 +3,120 @@ Generador de collages
 Combina múltiples fotos en un collage según una plantilla
 """
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any, Union, Optional
-from PIL import Image, ImageDraw, ImageOps
+from typing import Dict, List, Any, Union, Optional, Sequence
+from PIL import Image, ImageDraw
+
+from .collage_output import DerivativeSpec, DEFAULT_DERIVATIVES, encode_derivatives
+from .color_management import prepare_print_image
+from .frame_decode import ImageSource, open_image_source, decode_for_size
+from .overlays import load_logo
+from .render_backends import RenderBackend, get_render_backend
+from .render_targets import RenderTarget, resolve_template
+from .text_layers import STATIC_FIELDS, get_font, layer_raster
+from .tiled_render import DEFAULT_BAND_HEIGHT, DEFAULT_MEMORY_FACTOR, render_tiled
+from .render_plan import (
+    RenderPlan,
+    FramePlan,
+    get_absolute_path_from_relative,
+    get_render_plan,
+)
 
 logger = logging.getLogger(__name__)
 
+# Hilos para procesar marcos en paralelo (Pillow libera el GIL al decodificar y redimensionar)
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
 
-def get_absolute_path_from_relative(relative_path: str) -> Optional[Path]:
-    """Convierte una ruta relativa a absoluta desde el directorio del proyecto"""
-    if not relative_path:
-        return None
-    try:
-        # Obtener directorio del proyecto (3 niveles arriba desde utils)
-        project_root = Path(__file__).parent.parent
-        absolute_path = project_root / relative_path
-        return absolute_path if absolute_path.exists() else None
-    except Exception as e:
-        logger.error(f"Error convirtiendo ruta: {e}")
-        return None
+# Etapas medidas en stage_times
+STAGES = ('canvas', 'decode', 'fit', 'paste', 'overlay', 'encode')
 
 
 class CollageGenerator:
     """Generador de collages a partir de plantillas"""
 
-    def __init__(self, template: Dict[str, Any]):
+    def __init__(
+        self,
+        template: Dict[str, Any],
+        fast_decode: bool = True,
+        workers: Optional[int] = None,
+        backend: Union[str, RenderBackend, None] = None,
+        text_values: Optional[Dict[str, str]] = None,
+        target: Optional[RenderTarget] = None
+    ):
         """
         Inicializa el generador con una plantilla
 
         Args:
             template: Diccionario con la configuración de la plantilla
+            fast_decode: Decodificar cada foto a la menor escala que cubra su
+                marco (JPEG en dominio DCT) antes del redimensionado LANCZOS
+            workers: Hilos para procesar los marcos en generate()
+                (None o 0 = DEFAULT_WORKERS, 1 = en serie)
+            backend: Backend de render ('pil', 'opencv', instancia o None
+                para el configurado en la instalación)
+            text_values: Valores de los placeholders de las capas de texto
+                ({'evento': ..., 'fecha': ..., 'hora': ...}; ver text_layers)
+            target: Resolución de salida (PREVIEW_TARGET, print_target(); ver
+                render_targets); None = los píxeles de diseño de la plantilla
         """
+        if target is not None:
+            template = resolve_template(template, target)
+
+        # Los valores fijos del evento forman parte de la plantilla: la capa
+        # base del plan (en caché) ya los incluye dibujados
+        if text_values and template.get("text_layers"):
+            template = dict(template, text_context={
+                field: value for field, value in text_values.items() if field in STATIC_FIELDS
+            })
         self.template = template
+        self.printer_name = target.printer_name if target is not None else None
+        self.text_values = text_values or {}
+        self.fast_decode = fast_decode
+        self.workers = workers or DEFAULT_WORKERS
+        self.backend = get_render_backend(backend)
         self.canvas = None
+        self.plan: Optional[RenderPlan] = None
+        self.add_border = True
+        self.rendered_frames = set()
+        self.overlay_applied = False
+        self.derivative_paths: Dict[str, Path] = {}
+        # Segundos acumulados por etapa (ver STAGES); con marcos en paralelo
+        # 'decode' y 'fit' suman el tiempo de cada hilo
+        self.stage_times: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self._stage_lock = threading.Lock()
+
+    @contextmanager
+    def _stage(self, name: str):
+        """Acumula en stage_times el tiempo del bloque"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stage_lock:
+                self.stage_times[name] += elapsed
 
     def generate(
         self,
-        images: List[Union[Image.Image, str, Path]],
+        images: List[ImageSource],
         output_path: Union[str, Path],
-        add_border: bool = True
+        add_border: bool = True,
+        derivatives: bool = False
     ) -> Optional[Path]:
         """
         Genera un collage a partir de las imágenes
 
         Args:
-            images: Lista de imágenes (PIL Image o rutas)
+            images: Lista de imágenes (PIL Image, rutas o bytes JPEG)
             output_path: Ruta donde guardar el collage
             add_border: Si agregar bordes a las fotos
+            derivatives: Guardar también los derivados (pantalla, web,
+                miniatura); sus rutas quedan en derivative_paths
 
         Returns:
             Path al collage generado, o None si hubo error
@@ -62,199 +129,305 @@ class CollageGenerator:
                 return None
 
             # Crear canvas
-            self._create_canvas()
+            self.begin(add_border)
 
             # Procesar cada foto
             frames = self.template["frames"]
-            for i, (image_input, frame) in enumerate(zip(images, frames)):
-                logger.info(f"Procesando foto {i + 1}/{num_photos}")
-
-                # Cargar imagen si es necesario
-                if isinstance(image_input, (str, Path)):
-                    image = Image.open(image_input)
-                else:
-                    image = image_input.copy()
-
-                # Procesar y pegar la imagen en el frame
-                self._paste_image_in_frame(image, frame, add_border)
-
-            # Guardar resultado
-            output_path = Path(output_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-
-            self.canvas.save(output_path, "JPEG", quality=95)
-            logger.info(f"Collage guardado en: {output_path}")
+            images = images[:len(frames)]
+            workers = min(self.workers, len(images))
+
+            if workers > 1:
+                # Una misma PIL Image en varios marcos no debe decodificarse desde dos hilos
+                seen = set()
+                for image_input in images:
+                    if isinstance(image_input, Image.Image):
+                        if id(image_input) in seen:
+                            image_input.load()
+                        seen.add(id(image_input))
+
+                # Decodificar y ajustar en paralelo; pegar en orden en este hilo
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="collage") as executor:
+                    processed = executor.map(self.prepare_frame, range(len(images)), images)
+                    for i, image in enumerate(processed):
+                        logger.info(f"Procesando foto {i + 1}/{num_photos}")
+                        self.paste_frame(i, image, add_border)
+            else:
+                for i, image_input in enumerate(images):
+                    logger.info(f"Procesando foto {i + 1}/{num_photos}")
+                    self.render_frame(i, image_input, add_border)
 
-            return output_path
+            if derivatives:
+                return self.save_derivatives(output_path).get('print')
+            return self.save(output_path)
 
         except Exception as e:
             logger.error(f"Error generando collage: {e}", exc_info=True)
             return None
 
-    def _create_canvas(self):
-        """Crea el canvas base para el collage"""
-        canvas_config = self.template["canvas"]
-        width = canvas_config["width"]
-        height = canvas_config["height"]
-        bg_color = canvas_config["background_color"]
+    def generate_tiled(
+        self,
+        images: List[ImageSource],
+        output_path: Union[str, Path],
+        add_border: bool = True,
+        band_height: int = DEFAULT_BAND_HEIGHT,
+        memory_factor: float = DEFAULT_MEMORY_FACTOR
+    ) -> Optional[Path]:
+        """
+        Genera el collage por bandas directamente a un TIFF (pósters de gran formato)
 
-        # Crear imagen base con color de fondo
-        self.canvas = Image.new("RGB", (width, height), bg_color)
+        No usa el canvas ni el plan de render: la memoria depende del alto de
+        banda, no del tamaño del collage (ver tiled_render).
 
-        # Aplicar imagen de fondo si existe
-        background_image_path = canvas_config.get("background_image")
-        if background_image_path:
-            try:
-                # Convertir ruta relativa a absoluta
-                absolute_path = get_absolute_path_from_relative(background_image_path)
-
-                if absolute_path:
-                    # Cargar imagen de fondo
-                    bg_image = Image.open(absolute_path)
-
-                    # Escalar imagen para cubrir todo el canvas (modo cover)
-                    img_ratio = bg_image.width / bg_image.height
-                    canvas_ratio = width / height
-
-                    if img_ratio > canvas_ratio:
-                        # Imagen más ancha, ajustar por altura
-                        new_height = height
-                        new_width = int(height * img_ratio)
-                    else:
-                        # Imagen más alta, ajustar por ancho
-                        new_width = width
-                        new_height = int(width / img_ratio)
-
-                    bg_image = bg_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-                    # Centrar y recortar si es necesario
-                    x_offset = (new_width - width) // 2
-                    y_offset = (new_height - height) // 2
-                    bg_image = bg_image.crop((x_offset, y_offset, x_offset + width, y_offset + height))
-
-                    # Pegar sobre el canvas
-                    self.canvas.paste(bg_image, (0, 0))
-                    logger.info(f"Imagen de fondo aplicada: {absolute_path}")
-                else:
-                    logger.warning(f"Imagen de fondo no encontrada: {background_image_path}")
-            except Exception as e:
-                logger.error(f"Error aplicando imagen de fondo: {e}")
+        Args:
+            images: Lista de imágenes (PIL Image, rutas o bytes JPEG)
+            output_path: Ruta del TIFF
+            add_border: Si agregar bordes a las fotos
+            band_height: Filas por banda
+            memory_factor: Presupuesto de fotos decodificadas, en bandas
 
-        logger.info(f"Canvas creado: {width}x{height}, color: {bg_color}")
+        Returns:
+            Path al TIFF generado, o None si hubo error
+        """
+        return render_tiled(
+            self.template,
+            images,
+            output_path,
+            text_values=self.text_values,
+            add_border=add_border,
+            band_height=band_height,
+            memory_factor=memory_factor
+        )
+
+    def begin(self, add_border: bool = True):
+        """
+        Prepara el canvas (fondo incluido) para componer el collage foto a foto
 
-    def _paste_image_in_frame(
+        Args:
+            add_border: Si los marcos llevan borde
+
+        Returns:
+            Canvas base (en el formato del backend; ver get_canvas())
+        """
+        with self._stage('canvas'):
+            self._create_canvas(add_border)
+            self._draw_session_text()
+        self.rendered_frames = set()
+        self.overlay_applied = False
+        return self.canvas
+
+    def render_frame(
         self,
-        image: Image.Image,
-        frame: Dict[str, int],
-        add_border: bool
+        frame_index: int,
+        image_input: ImageSource,
+        add_border: Optional[bool] = None
     ):
         """
-        Procesa y pega una imagen en un frame específico
+        Ajusta una foto y la pega en su marco del canvas
+
+        Permite componer el collage a medida que se capturan las fotos; al
+        terminar solo queda llamar a save().
 
         Args:
-            image: Imagen a pegar
-            frame: Diccionario con x, y, width, height
-            add_border: Si agregar borde
+            frame_index: Índice del marco en la plantilla
+            image_input: Imagen (PIL Image, ruta o bytes JPEG)
+            add_border: Si agregar borde (None = el indicado en begin())
+        """
+        if self.canvas is None:
+            self.begin(True if add_border is None else add_border)
+
+        self.paste_frame(frame_index, self.prepare_frame(frame_index, image_input), add_border)
+
+    def prepare_frame(self, frame_index: int, image_input: ImageSource):
+        """
+        Decodifica, redimensiona y recorta una foto al tamaño de su marco
+
+        No modifica el canvas: puede ejecutarse en paralelo para varios marcos.
+
+        Args:
+            frame_index: Índice del marco en la plantilla
+            image_input: Imagen (PIL Image, ruta o bytes JPEG)
+
+        Returns:
+            Foto lista para pegar (en el formato del backend)
         """
-        # Extraer posición y tamaño del frame
-        x = frame["x"]
-        y = frame["y"]
-        frame_width = frame["width"]
-        frame_height = frame["height"]
+        if self.plan is None:
+            self.plan = get_render_plan(self.template)
+        frame = self.plan.frames[frame_index]
+
+        with self._stage('decode'):
+            # Cargar imagen si es necesario (sin decodificar todavía)
+            image = open_image_source(image_input)
+
+            # Decodificar a la escala del marco; las PIL Image ajenas no se modifican
+            if self.fast_decode:
+                resize_size, _ = frame.fit_geometry(image.size)
+                image = decode_for_size(image, resize_size, owned=not isinstance(image_input, Image.Image))
+            image.load()
 
         # Redimensionar imagen para que encaje en el frame (crop al centro)
-        processed_image = self._fit_image_to_frame(image, frame_width, frame_height)
+        with self._stage('fit'):
+            resize_size, crop_box = frame.fit_geometry(image.size)
+            return self.backend.resize_crop(image, resize_size, crop_box)
 
-        # Agregar borde si está habilitado
-        if add_border:
-            styling = self.template.get("styling", {})
-            border_width = styling.get("border_width", 0)
-            border_color = styling.get("border_color", "#FFFFFF")
+    def paste_frame(self, frame_index: int, processed_image, add_border: Optional[bool] = None):
+        """
+        Pega en el canvas una foto ya preparada con prepare_frame()
 
-            if border_width > 0:
-                processed_image = ImageOps.expand(
-                    processed_image,
-                    border=border_width,
-                    fill=border_color
-                )
+        Args:
+            frame_index: Índice del marco en la plantilla
+            processed_image: Foto del tamaño del marco
+            add_border: Si agregar borde (None = el indicado en begin())
+        """
+        if self.canvas is None:
+            self.begin(True if add_border is None else add_border)
+        if add_border is None:
+            add_border = self.add_border
 
-        # Pegar imagen en el canvas
-        self.canvas.paste(processed_image, (x, y))
+        with self._stage('paste'):
+            self._paste_image_in_frame(processed_image, self.plan.frames[frame_index], add_border)
+        self.rendered_frames.add(frame_index)
 
-    def _fit_image_to_frame(
-        self,
-        image: Image.Image,
-        target_width: int,
-        target_height: int
-    ) -> Image.Image:
+    def missing_frames(self) -> List[int]:
+        """Índices de los marcos que aún no tienen foto"""
+        num_frames = len(self.template["frames"])
+        return [i for i in range(num_frames) if i not in self.rendered_frames]
+
+    def is_complete(self) -> bool:
+        """True si todos los marcos tienen foto"""
+        return self.canvas is not None and not self.missing_frames()
+
+    def save(self, output_path: Union[str, Path], quality: int = 95) -> Path:
         """
-        Ajusta una imagen al tamaño del frame manteniendo proporción
-        y haciendo crop al centro si es necesario
+        Guarda el canvas como JPEG (en el perfil ICC de la impresora del target, si tiene)
 
         Args:
-            image: Imagen original
-            target_width: Ancho objetivo
-            target_height: Alto objetivo
+            output_path: Ruta donde guardar el collage
+            quality: Calidad JPEG
 
         Returns:
-            Imagen ajustada
+            Path al collage guardado
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.apply_overlay()
+        options = {'dpi': (self.plan.dpi, self.plan.dpi)} if self.plan.dpi else {}
+        with self._stage('encode'):
+            image, icc_profile = prepare_print_image(self.get_canvas(), self.printer_name)
+            image.save(output_path, "JPEG", quality=quality, icc_profile=icc_profile, **options)
+        logger.info(f"Collage guardado en: {output_path}")
+
+        return output_path
+
+    def save_derivatives(
+        self,
+        output_path: Union[str, Path],
+        specs: Sequence[DerivativeSpec] = DEFAULT_DERIVATIVES
+    ) -> Dict[str, Path]:
         """
-        # Calcular ratio del frame
-        target_ratio = target_width / target_height
+        Codifica desde el canvas en memoria el master y sus derivados
 
-        # Calcular ratio de la imagen
-        img_width, img_height = image.size
-        img_ratio = img_width / img_height
+        Args:
+            output_path: Ruta del master de impresión; los derivados se
+                guardan a su lado (collage_<id>_screen.jpg, ...)
+            specs: Derivados a generar
 
-        # Determinar cómo redimensionar
-        if img_ratio > target_ratio:
-            # Imagen es más ancha que el frame, ajustar por altura
-            new_height = target_height
-            new_width = int(new_height * img_ratio)
-        else:
-            # Imagen es más alta que el frame, ajustar por ancho
-            new_width = target_width
-            new_height = int(new_width / img_ratio)
+        Returns:
+            Diccionario nombre -> ruta ('print', 'web', 'screen', 'thumbnail')
+        """
+        self.apply_overlay()
+        with self._stage('encode'):
+            self.derivative_paths = encode_derivatives(
+                self.get_canvas(), output_path, specs, self.plan.dpi, self.printer_name
+            )
+        logger.info(f"Collage guardado en: {output_path} ({len(self.derivative_paths)} derivados)")
+        return self.derivative_paths
+
+    def apply_overlay(self):
+        """
+        Compone el marco PNG de la plantilla sobre las fotos (una sola vez)
 
-        # Redimensionar imagen
-        resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        save() y save_derivatives() lo llaman solos; solo hace falta llamarlo
+        antes de get_canvas() si se quiere ver el collage terminado sin guardarlo.
+        """
+        if self.canvas is None or self.overlay_applied:
+            return
+        if self.plan.overlay is not None:
+            with self._stage('overlay'):
+                self.backend.composite_overlay(self.canvas, self.plan.overlay)
+        self.overlay_applied = True
+
+    def _create_canvas(self, add_border: bool = True):
+        """Crea el canvas copiando la capa base del plan de render de la plantilla"""
+        self.plan = get_render_plan(self.template)
+        self.add_border = add_border
+        self.canvas = self.backend.new_canvas(self.plan.layer(add_border))
+
+        width, height = self.plan.canvas_size
+        bg_color = self.template["canvas"]["background_color"]
+        logger.info(f"Canvas creado: {width}x{height}, color: {bg_color}, backend: {self.backend.name}")
+
+    def _draw_session_text(self):
+        """Pega las capas de texto propias de la sesión (rasterizadas una vez por cadena)"""
+        for layer in self.plan.text_layers:
+            try:
+                raster = layer_raster(layer, self.text_values)
+                if raster:
+                    self.backend.paste_rgba(self.canvas, *raster)
+            except Exception as e:
+                logger.error(f"Error dibujando texto '{layer.get('text')}': {e}")
 
-        # Crop al centro para que encaje exactamente
-        left = (new_width - target_width) // 2
-        top = (new_height - target_height) // 2
-        right = left + target_width
-        bottom = top + target_height
+    def _paste_image_in_frame(
+        self,
+        image,
+        frame: FramePlan,
+        add_border: bool
+    ):
+        """
+        Pega una imagen ya ajustada en un frame específico
 
-        cropped_image = resized_image.crop((left, top, right, bottom))
+        Args:
+            image: Imagen del tamaño del frame (formato del backend)
+            frame: Geometría precalculada del frame
+            add_border: Si agregar borde
+        """
+        # El borde ya está dibujado en la capa base; dibujarlo si se pidió después
+        if add_border and frame.border_width > 0 and not self.add_border:
+            self.backend.fill_rect(self.canvas, frame.border_box, frame.border_color)
 
-        return cropped_image
+        # Pegar imagen en el canvas
+        self.backend.paste(self.canvas, image, frame.paste_position(add_border))
 
     def add_text_overlay(
         self,
         text: str,
         position: tuple,
         font_size: int = 48,
-        color: str = "#FFFFFF"
+        color: str = "#FFFFFF",
+        font: Optional[str] = None
     ):
         """
         Agrega texto superpuesto al collage
 
+        Para textos que se repiten en todos los collages conviene definir
+        'text_layers' en la plantilla (ver text_layers).
+
         Args:
             text: Texto a agregar
             position: Tupla (x, y) con la posición
             font_size: Tamaño de la fuente
             color: Color del texto
+            font: Archivo de fuente (None = fuente por defecto)
         """
-        if not self.canvas:
+        if self.canvas is None:
             logger.warning("Canvas no creado, no se puede agregar texto")
             return
 
         try:
-            draw = ImageDraw.Draw(self.canvas)
-
-            # Por ahora usar fuente por defecto
-            # TODO: Implementar carga de fuentes personalizadas
-            draw.text(position, text, fill=color)
+            canvas = self.get_canvas()
+            draw = ImageDraw.Draw(canvas)
+            draw.text(position, text, fill=color, font=get_font(font, font_size))
+            self.canvas = self.backend.from_image(canvas)
 
             logger.info(f"Texto agregado: '{text}' en posición {position}")
 
@@ -277,31 +450,14 @@ class CollageGenerator:
             size: Tupla (width, height) opcional para redimensionar
             opacity: Opacidad del logo (0.0 a 1.0)
         """
-        if not self.canvas:
+        if self.canvas is None:
             logger.warning("Canvas no creado, no se puede agregar logo")
             return
 
         try:
-            logo = Image.open(logo_path)
-
-            # Redimensionar si se especifica
-            if size:
-                logo = logo.resize(size, Image.Resampling.LANCZOS)
-
-            # Aplicar opacidad si es necesario
-            if opacity < 1.0:
-                if logo.mode != 'RGBA':
-                    logo = logo.convert('RGBA')
-
-                alpha = logo.split()[3]
-                alpha = alpha.point(lambda p: int(p * opacity))
-                logo.putalpha(alpha)
-
-            # Pegar logo
-            if logo.mode == 'RGBA':
-                self.canvas.paste(logo, position, logo)
-            else:
-                self.canvas.paste(logo, position)
+            # Decodificado, redimensionado y con opacidad en caché entre collages
+            logo = load_logo(logo_path, size, opacity)
+            self.backend.paste_rgba(self.canvas, logo, tuple(position))
 
             logger.info(f"Logo agregado en posición {position}")
 
@@ -315,4 +471,6 @@ class CollageGenerator:
         Returns:
             Imagen del canvas, o None si no se ha creado
         """
-        return self.canvas
+        if self.canvas is None:
+            return None
+        return self.backend.to_image(self.canvas)
@@ -0,0 +1,187 @@
+"""
+Codificación de los derivados de un collage
+A partir del canvas en memoria se codifican en una sola pasada el master de
+impresión, una vista previa para pantalla, una versión web/compartir con un
+tamaño máximo en bytes y una miniatura, sin volver a decodificar el JPEG.
+Solo el master se convierte al perfil ICC de la impresora (ver
+color_management); los demás derivados quedan en sRGB.
+"""
+import io
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from PIL import Image, features
+
+from .color_management import SRGB_ICC, prepare_print_image
+from .file_utils import write_file_atomic
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+# Derivado que se envía a la impresora
+PRINT_DERIVATIVE = 'print'
+
+
+@dataclass(frozen=True)
+class DerivativeSpec:
+    """Formato de salida de un derivado del collage"""
+    name: str
+    max_size: Optional[Tuple[int, int]] = None  # Caja (ancho, alto); None = resolución completa
+    format: str = 'JPEG'
+    quality: int = 90
+    progressive: bool = False
+    target_bytes: Optional[int] = None  # Baja la calidad hasta caber (no menos de min_quality)
+    min_quality: int = 40
+
+
+WEB_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+
+# Ordenados de mayor a menor: cada derivado se reduce desde el anterior
+DEFAULT_DERIVATIVES = (
+    # Master: misma calidad que antes; optimize solo rehace las tablas Huffman
+    DerivativeSpec('print', quality=95, progressive=False),
+    DerivativeSpec('web', max_size=(1600, 1600), format=WEB_FORMAT, quality=85,
+                   progressive=True, target_bytes=350 * 1024),
+    # Tamaño del label de la pantalla de resultado
+    DerivativeSpec('screen', max_size=(1200, 800), quality=85, progressive=True),
+    DerivativeSpec('thumbnail', max_size=(320, 320), quality=75),
+)
+
+
+def derivative_path(output_path: Union[str, Path], spec: DerivativeSpec) -> Path:
+    """
+    Ruta de un derivado junto al master
+
+    collage_<id>.jpg -> collage_<id>_screen.jpg, collage_<id>_web.webp, ...
+    """
+    output_path = Path(output_path)
+    if spec.name == PRINT_DERIVATIVE:
+        return output_path
+    return output_path.with_name(f"{output_path.stem}_{spec.name}{EXTENSIONS[spec.format]}")
+
+
+def fit_size(size: Tuple[int, int], max_size: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """Tamaño que cabe en max_size manteniendo proporción (nunca amplía)"""
+    if not max_size:
+        return size
+    width, height = size
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _encode(
+    image: Image.Image,
+    spec: DerivativeSpec,
+    quality: int,
+    dpi: Optional[float] = None,
+    icc_profile: Optional[bytes] = None
+) -> bytes:
+    buffer = io.BytesIO()
+    options = {'dpi': (dpi, dpi)} if dpi else {}
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    if spec.format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=quality, method=4, **options)
+    else:
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=spec.progressive, **options)
+    return buffer.getvalue()
+
+
+def encode_image(
+    image: Image.Image,
+    spec: DerivativeSpec,
+    dpi: Optional[float] = None,
+    icc_profile: Optional[bytes] = None
+) -> bytes:
+    """
+    Codifica una imagen según el formato del derivado
+
+    Con target_bytes se busca (bisección) la mayor calidad que quepa en ese
+    tamaño; si ni min_quality cabe se usa min_quality.
+
+    Args:
+        image: Imagen ya reducida al tamaño del derivado
+        spec: Formato del derivado
+        dpi: Resolución a registrar en el archivo (None = sin dato)
+        icc_profile: Perfil ICC a incrustar (None = sin perfil)
+
+    Returns:
+        Bytes del archivo codificado
+    """
+    data = _encode(image, spec, spec.quality, dpi, icc_profile)
+    if not spec.target_bytes or len(data) <= spec.target_bytes:
+        return data
+
+    low, high = spec.min_quality, spec.quality - 1
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        candidate = _encode(image, spec, quality, dpi, icc_profile)
+        if len(candidate) <= spec.target_bytes:
+            best = candidate
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    if best is None:
+        logger.warning(
+            f"Derivado '{spec.name}' no cabe en {spec.target_bytes} bytes "
+            f"ni con calidad {spec.min_quality}"
+        )
+        best = _encode(image, spec, spec.min_quality, dpi, icc_profile)
+    return best
+
+
+def encode_derivatives(
+    canvas: Image.Image,
+    output_path: Union[str, Path],
+    specs: Sequence[DerivativeSpec] = DEFAULT_DERIVATIVES,
+    dpi: Optional[float] = None,
+    printer_name: Optional[str] = None
+) -> Dict[str, Path]:
+    """
+    Codifica y guarda (de forma atómica) todos los derivados del collage
+
+    Args:
+        canvas: Collage en memoria (resolución de impresión)
+        output_path: Ruta del master; los demás se guardan a su lado
+        specs: Derivados a generar, de mayor a menor tamaño
+        dpi: Resolución del canvas; se registra en los derivados a resolución
+            completa para que la impresora respete el tamaño físico
+        printer_name: Impresora del master ('print'); si tiene perfil ICC el
+            master se convierte a ese perfil
+
+    Returns:
+        Diccionario nombre -> ruta de los derivados guardados (los que fallan
+        se registran en el log y se omiten)
+    """
+    if canvas.mode != 'RGB':
+        canvas = canvas.convert('RGB')
+
+    paths: Dict[str, Path] = {}
+    source = canvas
+    for spec in specs:
+        try:
+            size = fit_size(canvas.size, spec.max_size)
+            if source.width < size[0] or source.height < size[1]:
+                source = canvas
+            image = source if source.size == size else source.resize(size, Image.Resampling.LANCZOS)
+
+            path = derivative_path(output_path, spec)
+            # Los derivados siguientes se reducen desde la imagen en sRGB
+            source = image
+            icc_profile = SRGB_ICC
+            if spec.name == PRINT_DERIVATIVE:
+                image, icc_profile = prepare_print_image(image, printer_name)
+            data = encode_image(image, spec, dpi if source is canvas else None, icc_profile)
+            write_file_atomic(path, data)
+
+            paths[spec.name] = path
+            logger.debug(f"Derivado '{spec.name}' {size[0]}x{size[1]}: {len(data)} bytes")
+        except Exception as e:
+            logger.error(f"Error guardando derivado '{spec.name}' del collage: {e}")
+
+    return paths
@@ -1,8 +1,10 @@
 """
 Plantillas predeterminadas para collages
 """
+import copy
+import json
 import uuid
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
 
 def create_template(
@@ -15,7 +17,9 @@ def create_template(
     background_color: str = "#FFFFFF",
     spacing: int = 20,
     border_width: int = 5,
-    border_color: str = "#FFFFFF"
+    border_color: str = "#FFFFFF",
+    text_layers: Optional[List[Dict[str, Any]]] = None,
+    size_mm: Optional[Tuple[float, float]] = None
 ) -> Dict[str, Any]:
     """
     Crea una plantilla de collage
@@ -24,18 +28,22 @@ def create_template(
         nombre: Nombre de la plantilla
         descripcion: Descripción
         num_photos: Número de fotos que soporta
-        canvas_width: Ancho del canvas en píxeles
-        canvas_height: Alto del canvas en píxeles
+        canvas_width: Ancho del canvas en píxeles de diseño
+        canvas_height: Alto del canvas en píxeles de diseño
         frames: Lista de frames, cada uno con x, y, width, height
         background_color: Color de fondo
         spacing: Espaciado entre fotos
         border_width: Ancho del borde alrededor de cada foto
         border_color: Color del borde
+        text_layers: Capas de texto con placeholders {evento}, {fecha}, {hora}
+            (ver utils.text_layers)
+        size_mm: Tamaño físico (ancho, alto) en mm; el collage se renderiza a
+            la resolución de cada target (ver utils.render_targets)
 
     Returns:
         Diccionario con la configuración de la plantilla
     """
-    return {
+    template = {
         "template_id": str(uuid.uuid4()),
         "nombre": nombre,
         "descripcion": descripcion,
@@ -52,6 +60,11 @@ def create_template(
             "border_color": border_color
         }
     }
+    if size_mm:
+        template["canvas"]["width_mm"], template["canvas"]["height_mm"] = size_mm
+    if text_layers:
+        template["text_layers"] = text_layers
+    return template
 
 
 def get_default_templates() -> List[Dict[str, Any]]:
@@ -72,6 +85,7 @@ def get_default_templates() -> List[Dict[str, Any]]:
         num_photos=2,
         canvas_width=1200,
         canvas_height=1800,
+        size_mm=(100, 150),
         frames=[
             {"x": 100, "y": 100, "width": 1000, "height": 750},   # Foto superior
             {"x": 100, "y": 950, "width": 1000, "height": 750},   # Foto inferior
@@ -92,6 +106,7 @@ def get_default_templates() -> List[Dict[str, Any]]:
         num_photos=2,
         canvas_width=2400,
         canvas_height=1200,
+        size_mm=(200, 100),
         frames=[
             {"x": 100, "y": 225, "width": 1000, "height": 750},   # Foto izquierda
             {"x": 1300, "y": 225, "width": 1000, "height": 750},  # Foto derecha
@@ -112,6 +127,7 @@ def get_default_templates() -> List[Dict[str, Any]]:
         num_photos=4,
         canvas_width=2000,
         canvas_height=2000,
+        size_mm=(150, 150),
         frames=[
             {"x": 100, "y": 100, "width": 850, "height": 850},     # Superior izquierda
             {"x": 1050, "y": 100, "width": 850, "height": 850},    # Superior derecha
@@ -134,6 +150,7 @@ def get_default_templates() -> List[Dict[str, Any]]:
         num_photos=4,
         canvas_width=800,
         canvas_height=2400,
+        size_mm=(50, 150),
         frames=[
             {"x": 100, "y": 100, "width": 600, "height": 450},    # Foto 1
             {"x": 100, "y": 650, "width": 600, "height": 450},    # Foto 2
@@ -143,7 +160,11 @@ def get_default_templates() -> List[Dict[str, Any]]:
         background_color="#E74C3C",
         spacing=15,
         border_width=5,
-        border_color="#FFFFFF"
+        border_color="#FFFFFF",
+        text_layers=[
+            {"text": "{evento}", "size": 56, "color": "#FFFFFF", "x": 400, "y": 2240, "align": "center"},
+            {"text": "{fecha}", "size": 36, "color": "#FFFFFF", "x": 400, "y": 2315, "align": "center"},
+        ]
     )
     templates.append(template_4_strip)
 
@@ -156,6 +177,7 @@ def get_default_templates() -> List[Dict[str, Any]]:
         num_photos=6,
         canvas_width=2400,
         canvas_height=1800,
+        size_mm=(200, 150),
         frames=[
             {"x": 100, "y": 100, "width": 650, "height": 650},     # Fila 1, Col 1
             {"x": 850, "y": 100, "width": 650, "height": 650},     # Fila 1, Col 2
@@ -180,6 +202,7 @@ def get_default_templates() -> List[Dict[str, Any]]:
         num_photos=6,
         canvas_width=1600,
         canvas_height=2400,
+        size_mm=(100, 150),
         frames=[
             # Columna izquierda
             {"x": 100, "y": 100, "width": 600, "height": 600},
@@ -193,7 +216,11 @@ def get_default_templates() -> List[Dict[str, Any]]:
         background_color="#3498DB",
         spacing=15,
         border_width=8,
-        border_color="#FFFFFF"
+        border_color="#FFFFFF",
+        text_layers=[
+            {"text": "{evento}", "size": 72, "color": "#FFFFFF", "x": 800, "y": 2170, "align": "center"},
+            {"text": "{fecha}", "size": 44, "color": "#FFFFFF", "x": 800, "y": 2270, "align": "center"},
+        ]
     )
     templates.append(template_6_double_strip)
 
@@ -217,3 +244,26 @@ def get_template_by_num_photos(num_photos: int) -> Dict[str, Any]:
             return template
 
     return None
+
+
+def template_data_from_model(template_db) -> Dict[str, Any]:
+    """
+    Retorna una copia del template_data de un CollageTemplate con la imagen de fondo del modelo
+
+    Args:
+        template_db: Fila de CollageTemplate
+
+    Returns:
+        Plantilla lista para CollageGenerator
+    """
+    template_data = template_db.template_data
+    if isinstance(template_data, str):
+        template_data = json.loads(template_data)
+    template_data = copy.deepcopy(template_data)
+    template_data.setdefault('template_id', template_db.template_id)
+
+    # Agregar imagen de fondo al template_data desde el modelo
+    if template_db.background_image:
+        template_data['canvas']['background_image'] = template_db.background_image
+
+    return template_data
@@ -0,0 +1,230 @@
+"""
+Gestión de color de la salida de impresión
+
+Los collages se componen en sRGB. Si la impresora del photobooth
+(PhotoboothConfig.printer_name) tiene un perfil ICC en media/icc_profiles/ (o
+la carpeta configurada) con el nombre de la impresora (.icc o .icm;
+default.icc se usa para las impresoras sin perfil propio), el
+master de impresión se convierte a ese perfil y lo lleva incrustado. Los
+demás derivados (pantalla, web, miniatura) no se convierten: solo se marcan
+como sRGB.
+
+Los perfiles se leen una vez y las transformaciones (la parte costosa de
+LittleCMS) se construyen una vez por (origen, destino, intent) y se reutilizan
+desde cualquier hilo.
+"""
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from PIL import Image, ImageCms
+
+from .file_utils import ICC_PROFILES_DIR
+
+logger = logging.getLogger(__name__)
+
+PROFILE_EXTENSIONS = ('.icc', '.icm')
+DEFAULT_PROFILE_NAME = 'default'
+
+RENDERING_INTENTS = {
+    'perceptual': ImageCms.Intent.PERCEPTUAL,
+    'relative': ImageCms.Intent.RELATIVE_COLORIMETRIC,
+    'saturation': ImageCms.Intent.SATURATION,
+    'absolute': ImageCms.Intent.ABSOLUTE_COLORIMETRIC,
+}
+
+# Intent, compensación de punto negro y carpeta de perfiles (main.py los toma de PRINT_SETTINGS)
+_rendering_intent = 'perceptual'
+_black_point_compensation = True
+_profiles_dir: Path = ICC_PROFILES_DIR
+
+SRGB_PROFILE = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB'))
+SRGB_ICC = SRGB_PROFILE.tobytes()
+
+
+def set_color_settings(
+    rendering_intent: Optional[str] = None,
+    black_point_compensation: Optional[bool] = None,
+    profiles_dir: Optional[Union[str, Path]] = None
+):
+    """
+    Configura cómo se convierte el master de impresión al perfil de la impresora
+
+    Args:
+        rendering_intent: 'perceptual', 'relative', 'saturation' o 'absolute'
+        black_point_compensation: Ajustar el negro del sRGB al de la impresora
+        profiles_dir: Carpeta de los perfiles ICC (default media/icc_profiles)
+    """
+    global _rendering_intent, _black_point_compensation, _profiles_dir
+    if rendering_intent:
+        if rendering_intent not in RENDERING_INTENTS:
+            logger.warning(f"Intent de color desconocido '{rendering_intent}', se mantiene '{_rendering_intent}'")
+        else:
+            _rendering_intent = rendering_intent
+    if black_point_compensation is not None:
+        _black_point_compensation = bool(black_point_compensation)
+    if profiles_dir:
+        _profiles_dir = Path(profiles_dir)
+
+
+def get_color_settings() -> Tuple[str, bool, Path]:
+    """(intent, compensación de punto negro, carpeta de perfiles) configurados"""
+    return _rendering_intent, _black_point_compensation, _profiles_dir
+
+
+def profile_file_name(printer_name: str) -> str:
+    """Nombre de archivo (sin extensión) del perfil de una impresora"""
+    return re.sub(r'[^\w.-]+', '_', printer_name.strip()).strip('._') or DEFAULT_PROFILE_NAME
+
+
+def find_printer_profile(printer_name: Optional[str]) -> Optional[Path]:
+    """
+    Perfil ICC de una impresora (o el perfil por defecto)
+
+    Returns:
+        Ruta del perfil, o None si la impresora se maneja como sRGB
+    """
+    names = [profile_file_name(printer_name)] if printer_name and printer_name.strip() else []
+    names.append(DEFAULT_PROFILE_NAME)
+    for name in names:
+        for extension in PROFILE_EXTENSIONS:
+            path = _profiles_dir / f"{name}{extension}"
+            if path.is_file():
+                return path
+    return None
+
+
+@dataclass(frozen=True)
+class PrintColor:
+    """Conversión de color de un master de impresión"""
+    transform: ImageCms.ImageCmsTransform
+    icc_profile: bytes  # Perfil a incrustar en el archivo
+    mode: str  # Modo de la imagen convertida ('RGB' o 'CMYK')
+    description: str
+
+
+class ColorTransformCache:
+    """
+    Perfiles ICC y transformaciones construidas
+
+    Los perfiles se identifican por (ruta, fecha de modificación): reemplazar
+    el archivo de un perfil invalida sus transformaciones.
+    """
+
+    def __init__(self):
+        self._profiles: Dict[Tuple[str, int], ImageCms.ImageCmsProfile] = {}
+        self._transforms: Dict[Tuple, PrintColor] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def _profile(self, key: Tuple[str, int]) -> ImageCms.ImageCmsProfile:
+        profile = self._profiles.get(key)
+        if profile is None:
+            profile = ImageCms.getOpenProfile(key[0])
+            self._profiles[key] = profile
+        return profile
+
+    def get(self, profile_path: Path, rendering_intent: str, black_point_compensation: bool) -> PrintColor:
+        """
+        Transformación sRGB -> perfil (construida una sola vez)
+
+        Args:
+            profile_path: Perfil ICC de destino
+            rendering_intent: Clave de RENDERING_INTENTS
+            black_point_compensation: Compensación de punto negro
+
+        Returns:
+            Conversión lista para aplicar
+        """
+        destination = (str(profile_path), profile_path.stat().st_mtime_ns)
+        key = ('sRGB', destination, rendering_intent, black_point_compensation)
+
+        with self._lock:
+            color = self._transforms.get(key)
+            if color is not None:
+                self.hits += 1
+                return color
+
+            profile = self._profile(destination)
+            mode = 'CMYK' if profile.profile.xcolor_space.strip() == 'CMYK' else 'RGB'
+            flags = ImageCms.Flags.BLACKPOINTCOMPENSATION if black_point_compensation else ImageCms.Flags.NONE
+            transform = ImageCms.buildTransform(
+                SRGB_PROFILE, profile, 'RGB', mode,
+                renderingIntent=RENDERING_INTENTS[rendering_intent],
+                flags=flags
+            )
+            description = ImageCms.getProfileDescription(profile).strip() or profile_path.name
+            color = PrintColor(transform, Path(destination[0]).read_bytes(), mode, description)
+
+            # Un perfil reemplazado deja obsoletas sus transformaciones anteriores
+            stale = [k for k in self._transforms if k[1][0] == destination[0] and k[1] != destination]
+            for stale_key in stale:
+                del self._transforms[stale_key]
+            self._transforms[key] = color
+            self.builds += 1
+
+        logger.info(f"Transformación de color sRGB -> {description} ({rendering_intent}) construida")
+        return color
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self._transforms.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'profiles': len(self._profiles),
+                'transforms': len(self._transforms),
+                'builds': self.builds,
+                'hits': self.hits,
+            }
+
+
+_transform_cache = ColorTransformCache()
+
+
+def get_color_transform_cache() -> ColorTransformCache:
+    return _transform_cache
+
+
+def print_color(printer_name: Optional[str]) -> Optional[PrintColor]:
+    """
+    Conversión del master de impresión para una impresora
+
+    Returns:
+        Conversión a aplicar, o None si la impresora no tiene perfil (o el
+        perfil no se pudo leer) y el master queda en sRGB
+    """
+    path = find_printer_profile(printer_name)
+    if path is None:
+        return None
+    try:
+        return _transform_cache.get(path, _rendering_intent, _black_point_compensation)
+    except Exception as e:
+        logger.error(f"Error cargando perfil ICC {path}: {e}")
+        return None
+
+
+def prepare_print_image(image: Image.Image, printer_name: Optional[str]) -> Tuple[Image.Image, bytes]:
+    """
+    Convierte un master de impresión al perfil de la impresora
+
+    Args:
+        image: Imagen RGB (sRGB); no se modifica
+        printer_name: PhotoboothConfig.printer_name (None = sin impresora)
+
+    Returns:
+        (imagen convertida, perfil ICC a incrustar); sin perfil de impresora
+        la misma imagen y el perfil sRGB
+    """
+    color = print_color(printer_name)
+    if color is None:
+        return image, SRGB_ICC
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return ImageCms.applyTransform(image, color.transform), color.icc_profile
@@ -1,6 +1,7 @@
 """
 Utilidades para manejo de archivos
 """
+import os
 import shutil
 import uuid
 from pathlib import Path
@@ -14,11 +15,15 @@ BACKGROUNDS_DIR = MEDIA_DIR / "backgrounds"
 COLLAGES_DIR = MEDIA_DIR / "collages"
 PHOTOS_DIR = MEDIA_DIR / "photos"
 TEMP_DIR = MEDIA_DIR / "temp"
+OVERLAYS_DIR = MEDIA_DIR / "overlays"
+MOSAICS_DIR = MEDIA_DIR / "mosaics"
+ICC_PROFILES_DIR = MEDIA_DIR / "icc_profiles"
 
 
 def ensure_media_directories():
     """Asegura que existan todas las carpetas de media"""
-    for directory in [MEDIA_DIR, BACKGROUNDS_DIR, COLLAGES_DIR, PHOTOS_DIR, TEMP_DIR]:
+    for directory in [MEDIA_DIR, BACKGROUNDS_DIR, COLLAGES_DIR, PHOTOS_DIR, TEMP_DIR, OVERLAYS_DIR, MOSAICS_DIR,
+                      ICC_PROFILES_DIR]:
         directory.mkdir(parents=True, exist_ok=True)
 
 
@@ -60,6 +65,40 @@ def copy_background_image(source_path: str) -> str:
         raise
 
 
+def copy_overlay_image(source_path: str) -> str:
+    """
+    Copia un PNG de marco superpuesto a la carpeta overlays
+
+    Si el archivo ya está en esa carpeta no se vuelve a copiar.
+
+    Args:
+        source_path: Ruta del PNG
+
+    Returns:
+        Ruta relativa del PNG (desde la carpeta del proyecto)
+    """
+    project_root = Path(__file__).parent.parent
+    source = Path(source_path).resolve()
+    if source.parent == OVERLAYS_DIR.resolve():
+        return str(source.relative_to(project_root.resolve()))
+
+    try:
+        ensure_media_directories()
+
+        if not source.exists():
+            raise FileNotFoundError(f"Archivo no encontrado: {source_path}")
+
+        destination = OVERLAYS_DIR / f"{uuid.uuid4()}{source.suffix}"
+        shutil.copy2(source, destination)
+
+        logger.info(f"Marco superpuesto copiado: {source} -> {destination}")
+        return str(destination.relative_to(project_root))
+
+    except Exception as e:
+        logger.error(f"Error copiando marco superpuesto: {e}", exc_info=True)
+        raise
+
+
 def get_absolute_path(relative_path: str) -> Path:
     """
     Convierte una ruta relativa a absoluta
@@ -99,3 +138,29 @@ def delete_background_image(relative_path: str) -> bool:
     except Exception as e:
         logger.error(f"Error eliminando imagen: {e}", exc_info=True)
         return False
+
+
+def write_file_atomic(path: Path, data: bytes):
+    """
+    Escribe un archivo de forma atómica: nunca queda un archivo a medio escribir
+
+    Los datos se escriben en un temporal del mismo directorio, se sincronizan a
+    disco y luego se renombra sobre el destino.
+
+    Args:
+        path: Ruta final del archivo
+        data: Contenido a escribir
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,73 @@
+"""
+Decodificación de fotos a la escala que necesita cada marco del collage
+Los JPEG se decodifican en el dominio DCT (1/2, 1/4, 1/8) y las imágenes ya
+decodificadas se reducen por bloques antes del redimensionado final LANCZOS
+"""
+import io
+import logging
+from pathlib import Path
+from typing import Tuple, Union
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+ImageSource = Union[Image.Image, str, Path, bytes]
+
+
+def open_image_source(image_input: ImageSource) -> Image.Image:
+    """
+    Abre una foto sin decodificar los píxeles todavía (si viene de archivo o bytes)
+
+    Args:
+        image_input: PIL Image, ruta o bytes de un JPEG/PNG
+
+    Returns:
+        Imagen (perezosa si viene de archivo o bytes)
+    """
+    if isinstance(image_input, (str, Path)):
+        return Image.open(image_input)
+    if isinstance(image_input, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image_input))
+    return image_input
+
+
+def is_decoded(image: Image.Image) -> bool:
+    """True si los píxeles ya están en memoria (draft() ya no tiene efecto)"""
+    return not getattr(image, "tile", None)
+
+
+def decode_for_size(image: Image.Image, min_size: Tuple[int, int], owned: bool = True) -> Image.Image:
+    """
+    Reduce la imagen a la menor escala que siga cubriendo min_size
+
+    - JPEG sin decodificar: Image.draft() hace que libjpeg decodifique
+      directamente a 1/2, 1/4 o 1/8 del tamaño (mucho menos trabajo).
+    - Imagen ya decodificada: Image.reduce() promedia bloques de NxN, más
+      barato que dejar todo el trabajo al filtro LANCZOS.
+
+    Args:
+        image: Imagen de origen
+        min_size: (ancho, alto) mínimo que debe conservar
+        owned: False si la imagen pertenece a otro (no se le aplica draft()
+            porque modifica el objeto)
+
+    Returns:
+        Imagen decodificada a escala reducida (o la original si no hay margen)
+    """
+    min_width, min_height = min_size
+    if min_width <= 0 or min_height <= 0:
+        return image
+
+    if not is_decoded(image):
+        if owned and image.format == "JPEG":
+            original_size = image.size
+            image.draft("RGB", (min_width, min_height))
+            if image.size != original_size:
+                logger.debug(f"Decodificación JPEG reducida: {original_size} -> {image.size}")
+        return image
+
+    factor = min(image.width // min_width, image.height // min_height)
+    if factor >= 2:
+        return image.reduce(factor)
+    return image
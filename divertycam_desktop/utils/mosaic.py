@@ -0,0 +1,500 @@
+"""
+Mosaico de fotos del evento
+
+Cada foto que se guarda durante el evento se agrega a un índice en disco
+(media/mosaics/evento_<id>/) con una miniatura cuadrada y su firma de color:
+el promedio Lab de una cuadrícula de 2x2 de la miniatura. El índice solo
+crece por el final (archivos binarios de registros de tamaño fijo), así que
+agregar una foto no reescribe nada.
+
+Al final del evento render_mosaic() divide una imagen objetivo en celdas,
+calcula la firma de cada celda de forma vectorizada, busca las fotos más
+parecidas (distancias por producto de matrices, por bloques) y elige entre
+esas candidatas penalizando las fotos ya usadas. El póster se compone por
+bandas (ver tiled_render) leyendo las miniaturas con memmap.
+"""
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from .file_utils import MOSAICS_DIR
+from .frame_decode import ImageSource, decode_for_size, open_image_source
+from .render_targets import MM_PER_INCH, fit_to_paper, print_target
+from .tiff_stream import StripTiffWriter
+from .tiled_render import (
+    DEFAULT_BAND_HEIGHT,
+    DEFAULT_MEMORY_FACTOR,
+    BandLayer,
+    CoverImageLayer,
+    DecodedImageCache,
+    TiledRenderer,
+)
+
+logger = logging.getLogger(__name__)
+
+# Lado de las miniaturas guardadas en el índice
+TILE_SIZE = 64
+
+# Cuadrícula de la firma de color (2x2 promedios Lab = 12 valores)
+SIGNATURE_GRID = 2
+SIGNATURE_DIMS = SIGNATURE_GRID * SIGNATURE_GRID * 3
+
+DEFAULT_COLUMNS = 80
+DEFAULT_CANDIDATES = 16
+# Distancia (Lab al cuadrado, sumada en la cuadrícula) que cuesta usar una foto
+# tantas veces como el promedio (celdas / fotos)
+DEFAULT_REPEAT_PENALTY = 400.0
+# Mezcla de la imagen objetivo sobre las fotos (0 = solo fotos)
+DEFAULT_BLEND = 0.25
+
+# Celdas por bloque al calcular distancias (limita la matriz celdas x fotos)
+MATCH_CHUNK = 2048
+
+# Blanco D65 para la conversión a Lab
+_D65 = np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+], dtype=np.float32)
+
+
+def srgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convierte píxeles sRGB de 8 bits a CIE Lab (D65)
+
+    Args:
+        rgb: Array (..., 3) uint8
+
+    Returns:
+        Array (..., 3) float32 con L, a, b
+    """
+    linear = rgb.astype(np.float32) / 255.0
+    linear = np.where(linear <= 0.04045, linear / 12.92, ((linear + 0.055) / 1.055) ** 2.4)
+    xyz = (linear @ _RGB_TO_XYZ.T) / _D65
+
+    epsilon = 216 / 24389
+    kappa = 24389 / 27
+    f = np.where(xyz > epsilon, np.cbrt(xyz), (kappa * xyz + 16) / 116)
+
+    lab = np.empty_like(f)
+    lab[..., 0] = 116 * f[..., 1] - 16
+    lab[..., 1] = 500 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def grid_signatures(lab: np.ndarray, rows: int, columns: int) -> np.ndarray:
+    """
+    Firmas de color de una imagen Lab dividida en rows x columns celdas
+
+    Cada celda se subdivide en SIGNATURE_GRID x SIGNATURE_GRID y se promedia.
+
+    Args:
+        lab: Array (alto, ancho, 3) con alto y ancho múltiplos de
+            rows * SIGNATURE_GRID y columns * SIGNATURE_GRID
+
+    Returns:
+        Array (rows * columns, SIGNATURE_DIMS) float32
+    """
+    grid = SIGNATURE_GRID
+    height, width, _ = lab.shape
+    block_h = height // (rows * grid)
+    block_w = width // (columns * grid)
+    blocks = lab.reshape(rows, grid, block_h, columns, grid, block_w, 3).mean(axis=(2, 5))
+    # (rows, grid, columns, grid, 3) -> (rows, columns, grid, grid, 3)
+    return blocks.transpose(0, 2, 1, 3, 4).reshape(rows * columns, SIGNATURE_DIMS).astype(np.float32)
+
+
+def make_tile(source: ImageSource, tile_size: int = TILE_SIZE) -> Image.Image:
+    """
+    Miniatura cuadrada (recorte al centro) de una foto
+
+    Los JPEG se decodifican directamente a escala reducida.
+    """
+    image = open_image_source(source)
+    image = decode_for_size(image, (tile_size, tile_size), owned=not isinstance(source, Image.Image))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return ImageOps.fit(image, (tile_size, tile_size), Image.Resampling.LANCZOS)
+
+
+def tile_signature(tile: Image.Image) -> np.ndarray:
+    """Firma de color de una miniatura"""
+    return grid_signatures(srgb_to_lab(np.asarray(tile)), 1, 1)[0]
+
+
+class MosaicIndex:
+    """
+    Índice en disco de miniaturas y firmas de color de las fotos de un evento
+
+    Archivos (solo se agregan registros al final):
+    - photos.txt: ruta de cada foto, una por línea
+    - tiles.u8: miniaturas RGB de tile_size x tile_size
+    - signatures.f32: firmas de SIGNATURE_DIMS float32
+
+    Si un cierre inesperado deja un registro a medias, al abrir el índice se
+    descartan los registros incompletos.
+    """
+
+    PATHS_FILE = 'photos.txt'
+    TILES_FILE = 'tiles.u8'
+    SIGNATURES_FILE = 'signatures.f32'
+
+    def __init__(self, directory: Union[str, Path], tile_size: int = TILE_SIZE):
+        """
+        Args:
+            directory: Carpeta del índice (se crea si no existe)
+            tile_size: Lado de las miniaturas (debe ser el mismo en todo el índice)
+        """
+        self.directory = Path(directory)
+        self.tile_size = tile_size
+        self.tile_bytes = tile_size * tile_size * 3
+        self.signature_bytes = SIGNATURE_DIMS * 4
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._paths: List[str] = []
+        self._known: set = set()
+        self._load()
+
+    @classmethod
+    def for_event(cls, evento_id: int) -> "MosaicIndex":
+        """Índice de mosaico de un evento"""
+        return cls(MOSAICS_DIR / f"evento_{evento_id}")
+
+    def _file(self, name: str) -> Path:
+        return self.directory / name
+
+    def _load(self):
+        """Lee las rutas y descarta registros incompletos"""
+        paths_file = self._file(self.PATHS_FILE)
+        paths = paths_file.read_text(encoding='utf-8').splitlines() if paths_file.exists() else []
+
+        tiles_size = self._file_size(self.TILES_FILE)
+        signatures_size = self._file_size(self.SIGNATURES_FILE)
+        count = min(len(paths), tiles_size // self.tile_bytes, signatures_size // self.signature_bytes)
+
+        if (count != len(paths) or tiles_size != count * self.tile_bytes
+                or signatures_size != count * self.signature_bytes):
+            logger.warning(f"Índice de mosaico {self.directory} con registros incompletos, se conservan {count}")
+            paths = paths[:count]
+            paths_file.write_text(''.join(f"{path}\n" for path in paths), encoding='utf-8')
+            for name, record in ((self.TILES_FILE, self.tile_bytes), (self.SIGNATURES_FILE, self.signature_bytes)):
+                if self._file(name).exists():
+                    os.truncate(self._file(name), count * record)
+
+        self._paths = paths
+        self._known = set(paths)
+
+    def _file_size(self, name: str) -> int:
+        path = self._file(name)
+        return path.stat().st_size if path.exists() else 0
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __contains__(self, path) -> bool:
+        return str(path) in self._known
+
+    @property
+    def paths(self) -> List[str]:
+        """Rutas de las fotos indexadas (en orden de registro)"""
+        return list(self._paths)
+
+    def add_photo(self, path: Union[str, Path], image: Optional[Image.Image] = None) -> bool:
+        """
+        Agrega una foto al índice (si no estaba)
+
+        Args:
+            path: Ruta de la foto (identifica el registro)
+            image: Foto ya decodificada (evita leerla de disco)
+
+        Returns:
+            True si se agregó
+        """
+        key = str(path)
+        if key in self._known:
+            return False
+
+        try:
+            tile = make_tile(image if image is not None else key, self.tile_size)
+            signature = tile_signature(tile)
+        except Exception as e:
+            logger.error(f"Error indexando foto para mosaico {key}: {e}")
+            return False
+
+        with self._lock:
+            if key in self._known:
+                return False
+            # Primero los datos y al final la ruta: la ruta confirma el registro
+            with open(self._file(self.TILES_FILE), 'ab') as f:
+                f.write(tile.tobytes())
+            with open(self._file(self.SIGNATURES_FILE), 'ab') as f:
+                f.write(signature.astype('<f4').tobytes())
+            with open(self._file(self.PATHS_FILE), 'a', encoding='utf-8') as f:
+                f.write(f"{key}\n")
+            self._paths.append(key)
+            self._known.add(key)
+        return True
+
+    def add_photos(self, paths: Iterable[Union[str, Path]]) -> int:
+        """Agrega las fotos que falten; retorna cuántas se agregaron"""
+        return sum(1 for path in paths if str(path) not in self._known and self.add_photo(path))
+
+    def signatures(self) -> np.ndarray:
+        """Firmas de todas las fotos indexadas, (N, SIGNATURE_DIMS)"""
+        with self._lock:
+            count = len(self._paths)
+        if not count:
+            return np.empty((0, SIGNATURE_DIMS), dtype=np.float32)
+        data = np.fromfile(self._file(self.SIGNATURES_FILE), dtype='<f4', count=count * SIGNATURE_DIMS)
+        return data.reshape(count, SIGNATURE_DIMS)
+
+    def tiles(self) -> np.ndarray:
+        """Miniaturas de todas las fotos (memmap de solo lectura), (N, lado, lado, 3)"""
+        with self._lock:
+            count = len(self._paths)
+        return np.memmap(
+            self._file(self.TILES_FILE), dtype=np.uint8, mode='r',
+            shape=(count, self.tile_size, self.tile_size, 3)
+        )
+
+
+def event_photo_paths(evento_id: int) -> List[str]:
+    """Rutas de todas las fotos guardadas de un evento"""
+    from database import get_session, CollageSession, SessionPhoto
+
+    with get_session() as session:
+        rows = session.query(SessionPhoto.image_path).join(
+            CollageSession, SessionPhoto.session_id == CollageSession.session_id
+        ).filter(
+            CollageSession.evento_id == evento_id
+        ).order_by(SessionPhoto.id).all()
+    return [row.image_path for row in rows]
+
+
+def sync_event_index(evento_id: int) -> MosaicIndex:
+    """
+    Índice del evento con todas sus fotos guardadas (agrega las que falten)
+
+    Returns:
+        Índice actualizado
+    """
+    index = MosaicIndex.for_event(evento_id)
+    paths = [path for path in event_photo_paths(evento_id) if path not in index and Path(path).exists()]
+    if paths:
+        added = index.add_photos(paths)
+        logger.info(f"Índice de mosaico del evento {evento_id}: {added} fotos agregadas, {len(index)} en total")
+    return index
+
+
+def match_cells(
+    cell_signatures: np.ndarray,
+    signatures: np.ndarray,
+    candidates: int = DEFAULT_CANDIDATES,
+    repeat_penalty: float = DEFAULT_REPEAT_PENALTY,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Elige una foto para cada celda
+
+    Las candidatas de cada celda (las más cercanas en color) se buscan con
+    distancias |a|² + |b|² - 2ab calculadas por bloques; luego las celdas se
+    recorren en orden aleatorio eligiendo la candidata de menor
+    distancia + repeat_penalty * usos / usos promedio, para no repetir siempre
+    las mismas fotos sin que la penalización dependa del tamaño del evento.
+
+    Args:
+        cell_signatures: Firmas de las celdas, (M, SIGNATURE_DIMS)
+        signatures: Firmas de las fotos, (N, SIGNATURE_DIMS)
+        candidates: Candidatas por celda
+        repeat_penalty: Costo de usar una foto tantas veces como el promedio
+        seed: Semilla del orden de asignación (resultado reproducible)
+
+    Returns:
+        Índice de foto de cada celda, (M,)
+    """
+    cells = len(cell_signatures)
+    photos = len(signatures)
+    k = min(candidates, photos)
+
+    photo_norms = np.einsum('ij,ij->i', signatures, signatures)
+    candidate_index = np.empty((cells, k), dtype=np.int64)
+    candidate_distance = np.empty((cells, k), dtype=np.float32)
+
+    for start in range(0, cells, MATCH_CHUNK):
+        block = cell_signatures[start:start + MATCH_CHUNK]
+        distances = np.einsum('ij,ij->i', block, block)[:, None] + photo_norms[None, :] - 2 * block @ signatures.T
+        if k < photos:
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(photos), (len(block), photos))
+        candidate_index[start:start + len(block)] = nearest
+        candidate_distance[start:start + len(block)] = np.take_along_axis(distances, nearest, axis=1)
+
+    uses = np.zeros(photos, dtype=np.float32)
+    penalty = repeat_penalty * photos / max(cells, 1)
+    assignment = np.empty(cells, dtype=np.int64)
+    for cell in np.random.default_rng(seed).permutation(cells):
+        options = candidate_index[cell]
+        choice = options[np.argmin(candidate_distance[cell] + penalty * uses[options])]
+        assignment[cell] = choice
+        uses[choice] += 1
+    return assignment
+
+
+def cell_edges(length: int, count: int) -> List[int]:
+    """Bordes de count celdas repartidas en length píxeles (difieren a lo sumo en 1 px)"""
+    return [round(i * length / count) for i in range(count + 1)]
+
+
+class MosaicRowLayer(BandLayer):
+    """Una fila de celdas del mosaico, mezclada con la imagen objetivo"""
+
+    def __init__(
+        self,
+        tiles: np.ndarray,
+        assignment: np.ndarray,
+        x_edges: List[int],
+        top: int,
+        bottom: int,
+        target: Optional[CoverImageLayer] = None,
+        blend: float = 0.0
+    ):
+        self.tiles = tiles
+        self.assignment = assignment
+        self.x_edges = x_edges
+        self.top = top
+        self.bottom = bottom
+        self.target = target
+        self.blend = blend
+
+    def _build(self, cache: DecodedImageCache) -> Image.Image:
+        width = self.x_edges[-1]
+        height = self.bottom - self.top
+        row = Image.new('RGB', (width, height))
+        for column, photo in enumerate(self.assignment):
+            left, right = self.x_edges[column], self.x_edges[column + 1]
+            tile = Image.fromarray(np.asarray(self.tiles[photo]))
+            row.paste(tile.resize((right - left, height), Image.Resampling.LANCZOS), (left, 0))
+
+        if self.target is not None and self.blend > 0:
+            target_row = Image.new('RGB', (width, height))
+            self.target.draw(target_row, self.top, cache)
+            row = Image.blend(row, target_row, self.blend)
+        return row
+
+    def draw(self, band: Image.Image, band_top: int, cache: DecodedImageCache):
+        row = cache.get(self, lambda: self._build(cache))
+        band.paste(row, (0, self.top - band_top))
+
+
+def mosaic_size(
+    target_size: Tuple[int, int],
+    paper_size: Optional[str],
+    dpi: Optional[float]
+) -> Tuple[int, int]:
+    """Tamaño en píxeles del póster: la proporción de la imagen objetivo, ajustada al papel"""
+    target = print_target(paper_size, dpi)
+    width_mm, height_mm = fit_to_paper(target_size, target.paper_size)
+    return (round(width_mm * target.dpi / MM_PER_INCH), round(height_mm * target.dpi / MM_PER_INCH))
+
+
+def render_mosaic(
+    index: MosaicIndex,
+    target_image: ImageSource,
+    output_path: Union[str, Path],
+    paper_size: Optional[str] = '60x90',
+    dpi: Optional[float] = None,
+    columns: int = DEFAULT_COLUMNS,
+    blend: float = DEFAULT_BLEND,
+    candidates: int = DEFAULT_CANDIDATES,
+    repeat_penalty: float = DEFAULT_REPEAT_PENALTY,
+    band_height: int = DEFAULT_BAND_HEIGHT,
+    memory_factor: float = DEFAULT_MEMORY_FACTOR
+) -> Optional[Dict]:
+    """
+    Genera el póster de mosaico de un evento
+
+    Args:
+        index: Índice de fotos del evento
+        target_image: Imagen que forma el mosaico
+        output_path: '.tif' se escribe por bandas (póster); otra extensión
+            se compone en memoria y se guarda como JPEG (vistas previas)
+        paper_size: Papel del póster (None = el de impresión)
+        dpi: Resolución (None = la de impresión)
+        columns: Celdas por fila
+        blend: Mezcla de la imagen objetivo sobre las fotos (0 a 1)
+        candidates: Fotos candidatas por celda
+        repeat_penalty: Costo de repetir una foto
+        band_height: Filas por banda
+        memory_factor: Presupuesto de imágenes decodificadas, en bandas
+
+    Returns:
+        {'path', 'size', 'columns', 'rows', 'photos_used'}, o None si hubo error
+    """
+    try:
+        if not len(index):
+            logger.error("El índice de mosaico no tiene fotos")
+            return None
+
+        source = open_image_source(target_image)
+        width, height = mosaic_size(source.size, paper_size, dpi)
+
+        # Celdas lo más cuadradas posible
+        rows = max(1, round(height * columns / width))
+        # Muestra de la imagen objetivo: 4x4 píxeles por subdivisión de la firma
+        grid = SIGNATURE_GRID * 4
+        sample = ImageOps.fit(source.convert('RGB'), (columns * grid, rows * grid), Image.Resampling.LANCZOS)
+        cell_signatures = grid_signatures(srgb_to_lab(np.asarray(sample)), rows, columns)
+
+        assignment = match_cells(cell_signatures, index.signatures(), candidates, repeat_penalty).reshape(rows, columns)
+
+        tiles = index.tiles()
+        x_edges = cell_edges(width, columns)
+        y_edges = cell_edges(height, rows)
+        target_layer = CoverImageLayer(target_image, (0, 0, width, height)) if blend > 0 else None
+        layers = [
+            MosaicRowLayer(tiles, assignment[row], x_edges, y_edges[row], y_edges[row + 1], target_layer, blend)
+            for row in range(rows)
+        ]
+        renderer = TiledRenderer((width, height), '#000000', layers, band_height, memory_factor)
+        output_path = Path(output_path)
+        if output_path.suffix.lower() in ('.tif', '.tiff'):
+            dpi_value = print_target(paper_size, dpi).dpi
+            with StripTiffWriter(output_path, width, height, renderer.band_height, dpi=dpi_value) as writer:
+                renderer.render(writer.write_strip)
+        else:
+            poster = Image.new('RGB', (width, height))
+            offset = [0]
+
+            def collect(band: Image.Image):
+                poster.paste(band, (0, offset[0]))
+                offset[0] += band.height
+
+            renderer.render(collect)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            poster.save(output_path, 'JPEG', quality=92)
+
+        photos_used = int(len(np.unique(assignment)))
+        logger.info(
+            f"Mosaico {width}x{height} ({columns}x{rows} celdas, {photos_used} de {len(index)} fotos): {output_path}"
+        )
+        return {
+            'path': output_path,
+            'size': (width, height),
+            'columns': columns,
+            'rows': rows,
+            'photos_used': photos_used,
+        }
+
+    except Exception as e:
+        logger.error(f"Error generando mosaico: {e}", exc_info=True)
+        return None
+
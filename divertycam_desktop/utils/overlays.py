@@ -0,0 +1,123 @@
+"""
+Marcos superpuestos (PNG con transparencia) y logos del collage
+
+El PNG del marco se decodifica una sola vez por plan de render, se escala al
+tamaño del canvas con la opacidad de la plantilla ya aplicada y se recorta a
+la zona no transparente. Para el backend numpy se guarda además premultiplicado
+(rgb * alfa / 255) y con el alfa inverso, de modo que componerlo sobre cada
+collage es una multiplicación y una suma vectorizadas.
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # Solo lo necesita el backend opencv
+    np = None
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+
+def apply_opacity(image: Image.Image, opacity: float) -> Image.Image:
+    """
+    Multiplica el canal alfa por la opacidad (tabla de 256 valores, en C)
+
+    Args:
+        image: Imagen RGBA (se modifica)
+        opacity: 0.0 a 1.0
+
+    Returns:
+        La misma imagen
+    """
+    if opacity < 1.0:
+        table = [round(value * max(opacity, 0.0)) for value in range(256)]
+        image.putalpha(image.getchannel('A').point(table))
+    return image
+
+
+@dataclass
+class OverlayLayer:
+    """Marco superpuesto listo para componer"""
+    image: Image.Image  # RGBA recortada a la zona visible, opacidad aplicada
+    position: Tuple[int, int]
+    _premultiplied: Optional[tuple] = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def premultiplied(self):
+        """
+        (rgb * alfa / 255, 255 - alfa) como arrays uint8 de 3 canales,
+        calculados una sola vez
+
+        Con ambos términos la composición es
+        canvas = rgb_premultiplicado + canvas * (255 - alfa) / 255
+        """
+        with self._lock:
+            if self._premultiplied is None:
+                pixels = np.asarray(self.image)
+                alpha = pixels[..., 3:4].astype(np.uint16)
+                premultiplied = ((pixels[..., :3] * alpha + 127) // 255).astype(np.uint8)
+                inverse_alpha = np.repeat(255 - pixels[..., 3:4], 3, axis=2)
+                self._premultiplied = (premultiplied, inverse_alpha)
+            return self._premultiplied
+
+
+def load_overlay(path: Optional[Path], canvas_size: Tuple[int, int], opacity: float = 1.0) -> Optional[OverlayLayer]:
+    """
+    Decodifica el PNG del marco al tamaño del canvas
+
+    Args:
+        path: Ruta absoluta del PNG
+        canvas_size: (ancho, alto) del canvas
+        opacity: Opacidad del marco (0.0 a 1.0)
+
+    Returns:
+        Marco listo para componer, o None si no hay nada visible o falla
+    """
+    if path is None:
+        return None
+
+    try:
+        with Image.open(path) as source:
+            image = source.convert('RGBA')
+        if image.size != canvas_size:
+            image = image.resize(canvas_size, Image.Resampling.LANCZOS)
+        apply_opacity(image, opacity)
+
+        box = image.getchannel('A').getbbox()
+        if box is None:
+            logger.warning(f"Marco superpuesto totalmente transparente: {path}")
+            return None
+
+        logger.info(f"Marco superpuesto cargado: {path}")
+        return OverlayLayer(image=image.crop(box), position=box[:2])
+
+    except Exception as e:
+        logger.error(f"Error cargando marco superpuesto {path}: {e}")
+        return None
+
+
+@lru_cache(maxsize=16)
+def _load_logo(path: str, mtime_ns: int, size: Optional[Tuple[int, int]], opacity: float) -> Image.Image:
+    with Image.open(path) as source:
+        logo = source.convert('RGBA')
+    if size:
+        logo = logo.resize(size, Image.Resampling.LANCZOS)
+    return apply_opacity(logo, opacity)
+
+
+def load_logo(path, size: Optional[Tuple[int, int]] = None, opacity: float = 1.0) -> Image.Image:
+    """
+    Logo RGBA redimensionado y con opacidad (en caché por archivo, fecha, tamaño y opacidad)
+
+    La imagen se comparte entre llamadas: no modificarla.
+    """
+    path = Path(path)
+    return _load_logo(str(path), path.stat().st_mtime_ns, tuple(size) if size else None, float(opacity))
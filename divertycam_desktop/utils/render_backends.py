@@ -0,0 +1,261 @@
+"""
+Backends de render del generador de collages
+Separan las operaciones por píxel (redimensionar, recortar, pegar) del resto
+del generador para poder elegir la implementación en cada instalación:
+
+- 'pil': Pillow (LANCZOS), el comportamiento original
+- 'opencv': cv2.resize con INTER_AREA y pegado por asignación de slices numpy
+  sobre un canvas ndarray (más rápido para reducir fotos grandes)
+"""
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple, Union
+
+from PIL import Image, ImageColor, ImageDraw
+
+from .overlays import OverlayLayer
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # opencv-python es opcional para el backend PIL
+    cv2 = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+DEFAULT_BACKEND = 'pil'
+
+
+class RenderBackend(ABC):
+    """
+    Interfaz de un backend de render
+
+    El canvas es un objeto opaco del backend: solo se convierte a PIL Image
+    con to_image() (al guardar o para superponer texto/logos).
+    """
+
+    name = ''
+
+    @abstractmethod
+    def new_canvas(self, layer: Image.Image):
+        """Canvas nuevo a partir de una copia de la capa base del plan"""
+        pass
+
+    @abstractmethod
+    def resize_crop(self, image: Image.Image, resize_size: Tuple[int, int], crop_box: Box):
+        """Redimensiona la foto a resize_size y recorta crop_box (foto lista para pegar)"""
+        pass
+
+    @abstractmethod
+    def paste(self, canvas, processed, position: Tuple[int, int]):
+        """Pega una foto preparada con resize_crop() en el canvas"""
+        pass
+
+    @abstractmethod
+    def paste_rgba(self, canvas, image: Image.Image, position: Tuple[int, int]):
+        """Pega una imagen RGBA usando su canal alfa (textos, adornos)"""
+        pass
+
+    @abstractmethod
+    def composite_overlay(self, canvas, overlay: OverlayLayer):
+        """Compone el marco superpuesto de la plantilla sobre el collage"""
+        pass
+
+    @abstractmethod
+    def fill_rect(self, canvas, box: Box, color: str):
+        """Rellena el rectángulo [left, right) x [top, bottom) con un color"""
+        pass
+
+    @abstractmethod
+    def to_image(self, canvas) -> Image.Image:
+        """Canvas como PIL Image (puede compartir memoria con el canvas)"""
+        pass
+
+    @abstractmethod
+    def from_image(self, image: Image.Image):
+        """Canvas del backend a partir de una PIL Image modificada"""
+        pass
+
+
+class PILRenderBackend(RenderBackend):
+    """Backend Pillow: redimensionado LANCZOS y Image.paste()"""
+
+    name = 'pil'
+
+    def new_canvas(self, layer: Image.Image) -> Image.Image:
+        # convert() siempre retorna una imagen nueva (copia si ya es RGB)
+        return layer.convert('RGB')
+
+    def resize_crop(self, image: Image.Image, resize_size: Tuple[int, int], crop_box: Box) -> Image.Image:
+        return image.resize(resize_size, Image.Resampling.LANCZOS).crop(crop_box)
+
+    def paste(self, canvas: Image.Image, processed: Image.Image, position: Tuple[int, int]):
+        canvas.paste(processed, position)
+
+    def paste_rgba(self, canvas: Image.Image, image: Image.Image, position: Tuple[int, int]):
+        canvas.paste(image, position, image)
+
+    def composite_overlay(self, canvas: Image.Image, overlay: OverlayLayer):
+        # Image.paste con máscara ya es una única mezcla en C
+        canvas.paste(overlay.image, overlay.position, overlay.image)
+
+    def fill_rect(self, canvas: Image.Image, box: Box, color: str):
+        left, top, right, bottom = box
+        ImageDraw.Draw(canvas).rectangle((left, top, right - 1, bottom - 1), fill=color)
+
+    def to_image(self, canvas: Image.Image) -> Image.Image:
+        return canvas
+
+    def from_image(self, image: Image.Image) -> Image.Image:
+        return image
+
+
+class OpenCVRenderBackend(RenderBackend):
+    """
+    Backend OpenCV/numpy
+
+    El canvas es un ndarray RGB (alto, ancho, 3). Las fotos se reducen con
+    INTER_AREA (promedio de área, sin ringing) y se amplían con INTER_CUBIC.
+    El resultado no es idéntico al de LANCZOS; la diferencia se mide con
+    benchmarks/bench_render_backends.py.
+    """
+
+    name = 'opencv'
+
+    def __init__(self):
+        if cv2 is None:
+            raise RuntimeError("El backend 'opencv' requiere opencv-python y numpy")
+
+    def new_canvas(self, layer: Image.Image):
+        return np.array(layer.convert('RGB') if layer.mode != 'RGB' else layer)
+
+    def resize_crop(self, image: Image.Image, resize_size: Tuple[int, int], crop_box: Box):
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        pixels = np.asarray(image)
+
+        if resize_size != image.size:
+            shrinking = resize_size[0] < image.width and resize_size[1] < image.height
+            interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_CUBIC
+            pixels = cv2.resize(pixels, resize_size, interpolation=interpolation)
+
+        left, top, right, bottom = crop_box
+        return pixels[top:bottom, left:right]
+
+    @staticmethod
+    def _clip(canvas, size: Tuple[int, int], position: Tuple[int, int]):
+        """Slices de destino y origen recortados a los límites del canvas (como Image.paste)"""
+        x, y = position
+        width, height = size
+        left, top = max(x, 0), max(y, 0)
+        right = min(x + width, canvas.shape[1])
+        bottom = min(y + height, canvas.shape[0])
+        if right <= left or bottom <= top:
+            return None
+        return (
+            (slice(top, bottom), slice(left, right)),
+            (slice(top - y, bottom - y), slice(left - x, right - x)),
+        )
+
+    def paste(self, canvas, processed, position: Tuple[int, int]):
+        clipped = self._clip(canvas, (processed.shape[1], processed.shape[0]), position)
+        if clipped:
+            target, source = clipped
+            canvas[target] = processed[source]
+
+    def paste_rgba(self, canvas, image: Image.Image, position: Tuple[int, int]):
+        clipped = self._clip(canvas, image.size, position)
+        if not clipped:
+            return
+        target, source = clipped
+
+        pixels = np.asarray(image.convert('RGBA') if image.mode != 'RGBA' else image)[source]
+        alpha = pixels[..., 3:4].astype(np.uint16)
+        region = canvas[target].astype(np.uint16)
+        blended = (pixels[..., :3] * alpha + region * (255 - alpha) + 127) // 255
+        canvas[target] = blended.astype(np.uint8)
+
+    def composite_overlay(self, canvas, overlay: OverlayLayer):
+        clipped = self._clip(canvas, overlay.image.size, overlay.position)
+        if not clipped:
+            return
+        target, source = clipped
+
+        premultiplied, inverse_alpha = overlay.premultiplied()
+        canvas[target] = cv2.add(
+            premultiplied[source],
+            cv2.multiply(canvas[target], inverse_alpha[source], scale=1 / 255)
+        )
+
+    def fill_rect(self, canvas, box: Box, color: str):
+        left, top, right, bottom = box
+        canvas[max(top, 0):max(bottom, 0), max(left, 0):max(right, 0)] = ImageColor.getrgb(color)[:3]
+
+    def to_image(self, canvas) -> Image.Image:
+        return Image.fromarray(canvas, 'RGB')
+
+    def from_image(self, image: Image.Image):
+        return self.new_canvas(image)
+
+
+RENDER_BACKENDS = {
+    PILRenderBackend.name: PILRenderBackend,
+    OpenCVRenderBackend.name: OpenCVRenderBackend,
+}
+
+_default_backend = DEFAULT_BACKEND
+_instances: Dict[str, RenderBackend] = {}
+
+
+def available_render_backends() -> List[str]:
+    """Nombres de los backends utilizables en esta instalación"""
+    names = [PILRenderBackend.name]
+    if cv2 is not None:
+        names.append(OpenCVRenderBackend.name)
+    return names
+
+
+def set_default_render_backend(name: str):
+    """
+    Selecciona el backend que usan los CollageGenerator creados sin backend
+
+    Args:
+        name: 'pil' u 'opencv'
+    """
+    global _default_backend
+    if name not in RENDER_BACKENDS:
+        logger.warning(f"Backend de render desconocido '{name}', se usa '{DEFAULT_BACKEND}'")
+        name = DEFAULT_BACKEND
+    _default_backend = name
+    logger.info(f"Backend de render de collages: {name}")
+
+
+def get_render_backend(backend: Union[str, RenderBackend, None] = None) -> RenderBackend:
+    """
+    Obtiene un backend de render (las instancias no tienen estado y se comparten)
+
+    Args:
+        backend: Nombre, instancia o None para el backend por defecto
+
+    Returns:
+        Backend de render (PIL si el pedido no está disponible)
+    """
+    if isinstance(backend, RenderBackend):
+        return backend
+
+    name = backend or _default_backend
+    instance = _instances.get(name)
+    if instance is None:
+        try:
+            instance = RENDER_BACKENDS[name]()
+        except KeyError:
+            logger.warning(f"Backend de render desconocido '{name}', se usa '{DEFAULT_BACKEND}'")
+            return get_render_backend(DEFAULT_BACKEND)
+        except RuntimeError as e:
+            logger.warning(f"{e}; se usa '{DEFAULT_BACKEND}'")
+            return get_render_backend(DEFAULT_BACKEND)
+        _instances[name] = instance
+    return instance
@@ -0,0 +1,377 @@
+"""
+Planes de render compilados para plantillas de collage
+Precalculan la capa base (fondo y bordes ya dibujados) y la geometría de cada
+marco, y se cachean por contenido de la plantilla y fecha de la imagen de fondo
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple, Any
+
+from PIL import Image, ImageDraw
+
+from .base_layer_cache import get_base_layer_cache
+from .overlays import OverlayLayer, load_overlay
+from .text_layers import draw_text_layers, is_static_layer
+
+logger = logging.getLogger(__name__)
+
+# Planes conservados en memoria (cada uno guarda hasta dos canvas completos)
+MAX_CACHED_PLANS = 8
+
+Box = Tuple[int, int, int, int]
+FitGeometry = Tuple[Tuple[int, int], Box]
+
+
+def get_absolute_path_from_relative(relative_path: str) -> Optional[Path]:
+    """Convierte una ruta relativa a absoluta desde el directorio del proyecto"""
+    if not relative_path:
+        return None
+    try:
+        # Obtener directorio del proyecto (3 niveles arriba desde utils)
+        project_root = Path(__file__).parent.parent
+        absolute_path = project_root / relative_path
+        return absolute_path if absolute_path.exists() else None
+    except Exception as e:
+        logger.error(f"Error convirtiendo ruta: {e}")
+        return None
+
+
+def compute_fit_geometry(image_size: Tuple[int, int], target_width: int, target_height: int) -> FitGeometry:
+    """
+    Calcula el tamaño de redimensionado y el recorte al centro para llenar un marco
+
+    Args:
+        image_size: (ancho, alto) de la imagen original
+        target_width: Ancho del marco
+        target_height: Alto del marco
+
+    Returns:
+        ((ancho, alto) redimensionado, caja de recorte)
+    """
+    # Calcular ratio del frame
+    target_ratio = target_width / target_height
+
+    # Calcular ratio de la imagen
+    img_width, img_height = image_size
+    img_ratio = img_width / img_height
+
+    # Determinar cómo redimensionar
+    if img_ratio > target_ratio:
+        # Imagen es más ancha que el frame, ajustar por altura
+        new_height = target_height
+        new_width = int(new_height * img_ratio)
+    else:
+        # Imagen es más alta que el frame, ajustar por ancho
+        new_width = target_width
+        new_height = int(new_width / img_ratio)
+
+    # Crop al centro para que encaje exactamente
+    left = (new_width - target_width) // 2
+    top = (new_height - target_height) // 2
+
+    return (new_width, new_height), (left, top, left + target_width, top + target_height)
+
+
+@dataclass
+class FramePlan:
+    """Geometría precalculada de un marco"""
+    x: int
+    y: int
+    width: int
+    height: int
+    border_width: int = 0
+    border_color: str = "#FFFFFF"
+    _fit_cache: Dict[Tuple[int, int], FitGeometry] = field(default_factory=dict, repr=False)
+
+    @property
+    def border_box(self) -> Box:
+        """Área que ocupa el marco con su borde"""
+        return (
+            self.x,
+            self.y,
+            self.x + self.width + 2 * self.border_width,
+            self.y + self.height + 2 * self.border_width,
+        )
+
+    def paste_position(self, add_border: bool) -> Tuple[int, int]:
+        """Esquina donde se pega la foto (dentro del borde si lo hay)"""
+        offset = self.border_width if add_border else 0
+        return self.x + offset, self.y + offset
+
+    def fit_geometry(self, image_size: Tuple[int, int]) -> FitGeometry:
+        """Tamaño de redimensionado y recorte para una foto de este tamaño (memoizado)"""
+        geometry = self._fit_cache.get(image_size)
+        if geometry is None:
+            geometry = compute_fit_geometry(image_size, self.width, self.height)
+            self._fit_cache[image_size] = geometry
+        return geometry
+
+
+@dataclass
+class RenderPlan:
+    """Plantilla compilada: capa base lista para copiar y geometría de los marcos"""
+    key: Tuple[str, Optional[int]]
+    template_id: Optional[str]
+    canvas_size: Tuple[int, int]
+    frames: List[FramePlan]
+    base_layer: Image.Image
+    bordered_layer: Image.Image
+    # Capas de texto que dependen de la sesión (las fijas ya están en la capa base)
+    text_layers: List[Dict[str, Any]] = field(default_factory=list)
+    # Marco PNG que va encima de las fotos (decodificado y escalado una sola vez)
+    overlay: Optional[OverlayLayer] = None
+    # Resolución de la plantilla ya rasterizada (ver render_targets); None = píxeles de diseño
+    dpi: Optional[float] = None
+
+    def layer(self, add_border: bool = True) -> Image.Image:
+        """
+        Capa base compartida (con o sin los bordes de los marcos); no modificar
+
+        Puede ser RGBX si viene mapeada de la caché en disco (ver base_layer_cache).
+        """
+        return self.bordered_layer if add_border else self.base_layer
+
+    def new_canvas(self, add_border: bool = True) -> Image.Image:
+        """Copia RGB de la capa base (con o sin los bordes de los marcos)"""
+        return self.layer(add_border).convert("RGB")
+
+
+def template_content_hash(template: Dict[str, Any]) -> str:
+    """Hash estable del contenido de una plantilla"""
+    content = json.dumps(template, sort_keys=True, default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _background_path(template: Dict[str, Any]) -> Optional[Path]:
+    return get_absolute_path_from_relative(template["canvas"].get("background_image"))
+
+
+def _background_mtime(path: Optional[Path]) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def _layer_version(key: Tuple[str, Optional[int]]) -> str:
+    """Versión del contenido de la plantilla (template_data + fecha del fondo)"""
+    content_hash, background_mtime = key
+    return f"{content_hash[:20]}-{background_mtime or 0}"
+
+
+def _layer_key(key: Tuple[str, Optional[int]], variant: str) -> str:
+    """Nombre de la capa en la caché de disco"""
+    return f"{_layer_version(key)}-{variant}"
+
+
+def render_background(canvas: Image.Image, background_image_path: Optional[str]):
+    """
+    Pega la imagen de fondo sobre el canvas (modo cover, centrada)
+
+    Args:
+        canvas: Canvas con el color de fondo
+        background_image_path: Ruta relativa de la imagen de fondo
+    """
+    if not background_image_path:
+        return
+
+    width, height = canvas.size
+    try:
+        # Convertir ruta relativa a absoluta
+        absolute_path = get_absolute_path_from_relative(background_image_path)
+
+        if absolute_path:
+            # Cargar imagen de fondo
+            bg_image = Image.open(absolute_path)
+
+            # Escalar imagen para cubrir todo el canvas (modo cover)
+            img_ratio = bg_image.width / bg_image.height
+            canvas_ratio = width / height
+
+            if img_ratio > canvas_ratio:
+                # Imagen más ancha, ajustar por altura
+                new_height = height
+                new_width = int(height * img_ratio)
+            else:
+                # Imagen más alta, ajustar por ancho
+                new_width = width
+                new_height = int(width / img_ratio)
+
+            bg_image = bg_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+            # Centrar y recortar si es necesario
+            x_offset = (new_width - width) // 2
+            y_offset = (new_height - height) // 2
+            bg_image = bg_image.crop((x_offset, y_offset, x_offset + width, y_offset + height))
+
+            # Pegar sobre el canvas
+            canvas.paste(bg_image, (0, 0))
+            logger.info(f"Imagen de fondo aplicada: {absolute_path}")
+        else:
+            logger.warning(f"Imagen de fondo no encontrada: {background_image_path}")
+    except Exception as e:
+        logger.error(f"Error aplicando imagen de fondo: {e}")
+
+
+def compile_plan(template: Dict[str, Any], key: Optional[Tuple[str, Optional[int]]] = None) -> RenderPlan:
+    """
+    Compila una plantilla: dibuja la capa base y precalcula los marcos
+
+    Args:
+        template: Diccionario con la configuración de la plantilla
+        key: Clave de caché (se calcula si no se indica)
+
+    Returns:
+        Plan de render
+    """
+    if key is None:
+        key = (template_content_hash(template), _background_mtime(_background_path(template)))
+
+    canvas_config = template["canvas"]
+    width = canvas_config["width"]
+    height = canvas_config["height"]
+    bg_color = canvas_config["background_color"]
+    template_id = template.get("template_id")
+
+    text_layers = template.get("text_layers") or []
+    static_text_layers = [layer for layer in text_layers if is_static_layer(layer)]
+
+    # Solo vale la pena persistir capas con imagen de fondo (decodificar y redimensionar)
+    disk_cache = get_base_layer_cache() if key[1] is not None else None
+
+    base_layer = disk_cache.load(_layer_key(key, "base")) if disk_cache else None
+    if base_layer is None:
+        # Crear imagen base con color de fondo
+        base_layer = Image.new("RGB", (width, height), bg_color)
+        render_background(base_layer, canvas_config.get("background_image"))
+        draw_text_layers(base_layer, static_text_layers, template.get("text_context"))
+        if disk_cache:
+            disk_cache.store(_layer_key(key, "base"), base_layer, template_id)
+
+    styling = template.get("styling", {})
+    border_width = styling.get("border_width", 0)
+    border_color = styling.get("border_color", "#FFFFFF")
+
+    frames = [
+        FramePlan(
+            x=frame["x"],
+            y=frame["y"],
+            width=frame["width"],
+            height=frame["height"],
+            border_width=border_width,
+            border_color=border_color,
+        )
+        for frame in template["frames"]
+    ]
+
+    # Capa con los bordes de los marcos ya dibujados
+    if border_width > 0:
+        bordered_layer = disk_cache.load(_layer_key(key, "bordered")) if disk_cache else None
+        if bordered_layer is None:
+            bordered_layer = base_layer.copy()
+            draw = ImageDraw.Draw(bordered_layer)
+            for frame in frames:
+                left, top, right, bottom = frame.border_box
+                draw.rectangle((left, top, right - 1, bottom - 1), fill=border_color)
+            if disk_cache:
+                disk_cache.store(_layer_key(key, "bordered"), bordered_layer, template_id)
+    else:
+        bordered_layer = base_layer
+
+    logger.info(f"Plan de render compilado: {width}x{height}, {len(frames)} marcos")
+    return RenderPlan(
+        key=key,
+        template_id=template_id,
+        canvas_size=(width, height),
+        frames=frames,
+        base_layer=base_layer,
+        bordered_layer=bordered_layer,
+        text_layers=[layer for layer in text_layers if not is_static_layer(layer)],
+        overlay=load_overlay(
+            get_absolute_path_from_relative(canvas_config.get("overlay_image")),
+            (width, height),
+            float(canvas_config.get("overlay_opacity", 1.0)),
+        ),
+        dpi=canvas_config.get("dpi"),
+    )
+
+
+class RenderPlanCache:
+    """Caché LRU de planes por (hash de la plantilla, mtime de la imagen de fondo)"""
+
+    def __init__(self, max_plans: int = MAX_CACHED_PLANS):
+        self.max_plans = max_plans
+        self._plans: "OrderedDict[Tuple[str, Optional[int]], RenderPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template: Dict[str, Any]) -> RenderPlan:
+        """Retorna el plan de la plantilla, compilándolo si no está en caché"""
+        key = (template_content_hash(template), _background_mtime(_background_path(template)))
+
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        # Compilar fuera del lock: otra plantilla no debe esperar a esta
+        plan = compile_plan(template, key)
+
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+        return plan
+
+    def invalidate_template(self, template_id: str):
+        """Descarta los planes de una plantilla"""
+        with self._lock:
+            for key in [k for k, plan in self._plans.items() if plan.template_id == template_id]:
+                del self._plans[key]
+
+    def clear(self):
+        """Descarta todos los planes"""
+        with self._lock:
+            self._plans.clear()
+
+    def get_stats(self) -> Dict:
+        """Estadísticas de la caché"""
+        with self._lock:
+            return {'plans': len(self._plans), 'hits': self.hits, 'misses': self.misses}
+
+
+_default_cache: Optional[RenderPlanCache] = None
+
+
+def get_render_plan_cache() -> RenderPlanCache:
+    """Caché de planes compartida por toda la aplicación"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RenderPlanCache()
+    return _default_cache
+
+
+def get_render_plan(template: Dict[str, Any]) -> RenderPlan:
+    """Plan de render de una plantilla desde la caché compartida"""
+    return get_render_plan_cache().get(template)
+
+
+def invalidate_template_cache(template_id: str):
+    """
+    Descarta los planes en memoria y las capas base en disco de una plantilla
+
+    Llamar al editar o eliminar un CollageTemplate.
+    """
+    get_render_plan_cache().invalidate_template(template_id)
+    get_base_layer_cache().invalidate_template(template_id)
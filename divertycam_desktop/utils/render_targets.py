@@ -0,0 +1,370 @@
+"""
+Plantillas independientes de la resolución
+
+Las plantillas declaran su tamaño físico en canvas.width_mm / canvas.height_mm;
+sus coordenadas en píxeles (canvas, marcos, bordes y capas de texto) son solo
+el espacio de diseño. compile_geometry() pasa esa geometría a milímetros una
+vez por plantilla y cada RenderTarget la rasteriza a su resolución:
+
+- PREVIEW_TARGET: pocos DPI, para vistas previas en pantalla y el editor
+- print_target(): el papel de impresión a resolución completa
+- poster_target(): la plantilla ampliada al papel de un póster
+
+Las plantillas sin tamaño físico (anteriores a este formato) se ajustan al
+papel de impresión manteniendo su proporción y orientación.
+"""
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .render_plan import template_content_hash
+from .text_layers import DEFAULT_FONT_SIZE
+
+logger = logging.getLogger(__name__)
+
+MM_PER_INCH = 25.4
+
+# Resolución del editor de plantillas (37.8 px/cm)
+EDITOR_DPI = 96
+
+PRINT_DPI = 300
+# Resolución de pantalla: las vistas previas se ven a su tamaño real
+PREVIEW_DPI = 96
+
+# Papeles de PhotoboothConfig.paper_size / PRINT_SETTINGS (ancho, alto en mm, vertical)
+PAPER_SIZES_MM = {
+    '10x15': (100.0, 150.0),
+    '13x18': (130.0, 180.0),
+    '15x21': (150.0, 210.0),
+    'A4': (210.0, 297.0),
+    'A5': (148.0, 210.0),
+}
+
+# Geometrías compiladas conservadas en memoria
+MAX_CACHED_GEOMETRIES = 32
+
+Size = Tuple[float, float]
+BoxMM = Tuple[float, float, float, float]
+
+# Papel y resolución de impresión (main.py los toma de PRINT_SETTINGS)
+_print_paper_size = '10x15'
+_print_dpi: float = PRINT_DPI
+
+
+def set_print_settings(paper_size: Optional[str] = None, dpi: Optional[float] = None):
+    """
+    Configura el papel y la resolución del target de impresión por defecto
+
+    Args:
+        paper_size: Nombre del papel ('10x15', 'A4', ...)
+        dpi: Resolución de impresión
+    """
+    global _print_paper_size, _print_dpi
+    if paper_size:
+        if paper_size_mm(paper_size) is None:
+            logger.warning(f"Tamaño de papel desconocido '{paper_size}', se mantiene '{_print_paper_size}'")
+        else:
+            _print_paper_size = paper_size
+    if dpi:
+        _print_dpi = float(dpi)
+
+
+def paper_size_mm(paper_size: Optional[str]) -> Optional[Size]:
+    """
+    Tamaño de un papel en milímetros
+
+    Args:
+        paper_size: Nombre conocido ('A4') o medidas en cm ('10x15', '13 x 18')
+
+    Returns:
+        (ancho, alto) en mm, o None si no se reconoce
+    """
+    if not paper_size:
+        return None
+    if paper_size in PAPER_SIZES_MM:
+        return PAPER_SIZES_MM[paper_size]
+    match = re.fullmatch(r"\s*(\d+(?:[.,]\d+)?)\s*[xX]\s*(\d+(?:[.,]\d+)?)\s*", paper_size)
+    if not match:
+        return None
+    width, height = (float(value.replace(',', '.')) * 10 for value in match.groups())
+    return width, height
+
+
+@dataclass(frozen=True)
+class RenderTarget:
+    """Resolución a la que se rasteriza una plantilla"""
+    name: str
+    dpi: float
+    # Papel al que se ajustan las plantillas sin tamaño físico (None = el de impresión)
+    paper_size: Optional[str] = None
+    # Ajustar al papel también las plantillas con tamaño físico (pósters)
+    fit_paper: bool = False
+    # Impresora de destino: su perfil ICC se aplica al master (ver color_management)
+    printer_name: Optional[str] = None
+
+
+PREVIEW_TARGET = RenderTarget('preview', PREVIEW_DPI)
+
+
+def print_target(
+    paper_size: Optional[str] = None,
+    dpi: Optional[float] = None,
+    printer_name: Optional[str] = None
+) -> RenderTarget:
+    """
+    Target de impresión a resolución completa
+
+    Args:
+        paper_size: Papel (None = el configurado)
+        dpi: Resolución (None = la configurada)
+        printer_name: Impresora (PhotoboothConfig.printer_name)
+    """
+    return RenderTarget('print', float(dpi or _print_dpi), paper_size or _print_paper_size, printer_name=printer_name)
+
+
+def poster_target(paper_size: str, dpi: Optional[float] = None) -> RenderTarget:
+    """
+    Target de póster: la plantilla se amplía al mayor tamaño que cabe en el papel
+
+    Args:
+        paper_size: Papel del póster ('60x90', 'A2', ...)
+        dpi: Resolución (None = la de impresión)
+    """
+    return RenderTarget('poster', float(dpi or _print_dpi), paper_size, fit_paper=True)
+
+
+def fit_to_paper(design_size: Tuple[int, int], paper_size: Optional[str]) -> Size:
+    """
+    Tamaño físico de una plantilla sin medidas: la mayor que cabe en el papel
+
+    El papel se gira para que tenga la misma orientación que la plantilla.
+    """
+    paper = paper_size_mm(paper_size) or PAPER_SIZES_MM['10x15']
+    width, height = design_size
+    if (width > height) != (paper[0] > paper[1]):
+        paper = (paper[1], paper[0])
+    scale = min(paper[0] / width, paper[1] / height)
+    return width * scale, height * scale
+
+
+@dataclass(frozen=True)
+class TemplateGeometry:
+    """Geometría de una plantilla en milímetros (compartida por todos los targets)"""
+    size_mm: Size
+    frames_mm: Tuple[BoxMM, ...]
+    border_mm: float
+    spacing_mm: float
+    # (x, y, tamaño de fuente) de cada capa de texto, en mm
+    text_layers_mm: Tuple[Tuple[float, float, float], ...]
+    # False si el tamaño se dedujo del papel
+    physical: bool
+
+    def pixel_size(self, dpi: float) -> Tuple[int, int]:
+        """Tamaño del canvas en píxeles a una resolución"""
+        return _to_px(self.size_mm[0], dpi), _to_px(self.size_mm[1], dpi)
+
+
+def _to_px(mm: float, dpi: float) -> int:
+    return int(round(mm * dpi / MM_PER_INCH))
+
+
+def template_size_mm(
+    template: Dict[str, Any],
+    paper_size: Optional[str] = None,
+    fit_paper: bool = False
+) -> Tuple[Size, bool]:
+    """
+    Tamaño físico de una plantilla
+
+    Args:
+        template: Plantilla
+        paper_size: Papel para plantillas sin tamaño físico
+        fit_paper: Ajustar al papel aunque la plantilla declare su tamaño
+
+    Returns:
+        ((ancho, alto) en mm, True si la plantilla lo declara)
+    """
+    canvas = template["canvas"]
+    if not fit_paper and canvas.get("width_mm") and canvas.get("height_mm"):
+        return (float(canvas["width_mm"]), float(canvas["height_mm"])), True
+    return fit_to_paper((canvas["width"], canvas["height"]), paper_size or _print_paper_size), False
+
+
+def compile_geometry(
+    template: Dict[str, Any],
+    paper_size: Optional[str] = None,
+    fit_paper: bool = False
+) -> TemplateGeometry:
+    """
+    Pasa la geometría de diseño (píxeles) de una plantilla a milímetros
+
+    Args:
+        template: Plantilla con coordenadas de diseño
+        paper_size: Papel para plantillas sin tamaño físico
+        fit_paper: Ajustar al papel aunque la plantilla declare su tamaño
+
+    Returns:
+        Geometría en mm
+    """
+    (width_mm, height_mm), physical = template_size_mm(template, paper_size, fit_paper)
+    canvas = template["canvas"]
+    # Una sola escala: el tamaño físico conserva la proporción del diseño
+    mm_per_px = width_mm / canvas["width"]
+
+    frames = tuple(
+        (frame["x"] * mm_per_px, frame["y"] * mm_per_px,
+         frame["width"] * mm_per_px, frame["height"] * mm_per_px)
+        for frame in template["frames"]
+    )
+    styling = template.get("styling", {})
+    text_layers = tuple(
+        (layer.get("x", 0) * mm_per_px, layer.get("y", 0) * mm_per_px,
+         layer.get("size", DEFAULT_FONT_SIZE) * mm_per_px)
+        for layer in template.get("text_layers") or []
+    )
+
+    return TemplateGeometry(
+        size_mm=(width_mm, height_mm),
+        frames_mm=frames,
+        border_mm=styling.get("border_width", 0) * mm_per_px,
+        spacing_mm=styling.get("spacing", 0) * mm_per_px,
+        text_layers_mm=text_layers,
+        physical=physical,
+    )
+
+
+def rasterize_template(template: Dict[str, Any], geometry: TemplateGeometry, dpi: float) -> Dict[str, Any]:
+    """
+    Plantilla en píxeles a una resolución a partir de su geometría compilada
+
+    Los bordes de cada marco se redondean por separado para que marcos
+    contiguos sigan tocándose a cualquier resolución.
+
+    Args:
+        template: Plantilla original (no se modifica)
+        geometry: Su geometría compilada
+        dpi: Resolución de salida
+
+    Returns:
+        Copia de la plantilla con canvas, marcos, bordes y textos en píxeles
+        y canvas.dpi con la resolución
+    """
+    width, height = geometry.pixel_size(dpi)
+    result = dict(template)
+    result["canvas"] = dict(
+        template["canvas"],
+        width=width,
+        height=height,
+        width_mm=round(geometry.size_mm[0], 2),
+        height_mm=round(geometry.size_mm[1], 2),
+        dpi=dpi,
+    )
+
+    frames = []
+    for frame, (x, y, w, h) in zip(template["frames"], geometry.frames_mm):
+        left, top = _to_px(x, dpi), _to_px(y, dpi)
+        frames.append(dict(
+            frame,
+            x=left,
+            y=top,
+            width=max(1, _to_px(x + w, dpi) - left),
+            height=max(1, _to_px(y + h, dpi) - top),
+        ))
+    result["frames"] = frames
+
+    styling = template.get("styling")
+    if styling is not None:
+        border = styling.get("border_width", 0)
+        result["styling"] = dict(
+            styling,
+            border_width=max(1, _to_px(geometry.border_mm, dpi)) if border > 0 else 0,
+            spacing=_to_px(geometry.spacing_mm, dpi),
+        )
+
+    if template.get("text_layers"):
+        result["text_layers"] = [
+            dict(layer, x=_to_px(x, dpi), y=_to_px(y, dpi), size=max(1, _to_px(size, dpi)))
+            for layer, (x, y, size) in zip(template["text_layers"], geometry.text_layers_mm)
+        ]
+
+    return result
+
+
+class GeometryCache:
+    """Caché LRU de geometrías compiladas por contenido de la plantilla"""
+
+    def __init__(self, max_geometries: int = MAX_CACHED_GEOMETRIES):
+        self.max_geometries = max_geometries
+        self._geometries: "OrderedDict[tuple, TemplateGeometry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        template: Dict[str, Any],
+        paper_size: Optional[str] = None,
+        fit_paper: bool = False
+    ) -> TemplateGeometry:
+        """Geometría de la plantilla, compilándola si no está en caché"""
+        canvas = template["canvas"]
+        has_size = bool(canvas.get("width_mm") and canvas.get("height_mm")) and not fit_paper
+        # El papel solo influye en las plantillas que se ajustan a él
+        key = (template_content_hash(template), None if has_size else (paper_size or _print_paper_size))
+
+        with self._lock:
+            geometry = self._geometries.get(key)
+            if geometry is not None:
+                self._geometries.move_to_end(key)
+                self.hits += 1
+                return geometry
+            self.misses += 1
+
+            geometry = compile_geometry(template, key[1], fit_paper)
+            self._geometries[key] = geometry
+            while len(self._geometries) > self.max_geometries:
+                self._geometries.popitem(last=False)
+            return geometry
+
+    def clear(self):
+        """Descarta todas las geometrías"""
+        with self._lock:
+            self._geometries.clear()
+
+    def get_stats(self) -> Dict:
+        """Estadísticas de la caché"""
+        with self._lock:
+            return {'geometries': len(self._geometries), 'hits': self.hits, 'misses': self.misses}
+
+
+_geometry_cache = GeometryCache()
+
+
+def get_geometry_cache() -> GeometryCache:
+    """Caché global de geometrías"""
+    return _geometry_cache
+
+
+def resolve_template(template: Dict[str, Any], target: RenderTarget) -> Dict[str, Any]:
+    """
+    Plantilla en píxeles para un target de render
+
+    Args:
+        template: Plantilla con coordenadas de diseño
+        target: Resolución de salida (PREVIEW_TARGET, print_target(), ...)
+
+    Returns:
+        Copia de la plantilla lista para CollageGenerator
+    """
+    geometry = _geometry_cache.get(template, target.paper_size, target.fit_paper)
+    resolved = rasterize_template(template, geometry, target.dpi)
+    canvas = resolved["canvas"]
+    logger.debug(
+        f"Plantilla {template.get('template_id')} a {target.dpi:g} DPI ({target.name}): "
+        f"{canvas['width']}x{canvas['height']}"
+    )
+    return resolved
+
@@ -0,0 +1,224 @@
+"""
+Capas de texto de las plantillas de collage
+
+Cada plantilla puede definir en template_data una lista 'text_layers':
+
+    {"text": "{evento} - {fecha}", "font": "media/fonts/Montserrat-Bold.ttf",
+     "size": 64, "color": "#FFFFFF", "x": 400, "y": 2250, "align": "center"}
+
+- (x, y) es el punto de anclaje: borde superior del texto y, según align,
+  su extremo izquierdo ('left'), su centro ('center') o su extremo derecho
+  ('right').
+- {evento} y {fecha} son fijos para todo el evento: esas capas se dibujan una
+  sola vez en la capa base del plan de render.
+- {hora} cambia en cada sesión: el texto se rasteriza una vez por cadena
+  distinta (caché LRU) y se pega sobre el canvas al comenzar cada collage.
+"""
+import logging
+import string
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Campos que no cambian durante el evento (se dibujan en la capa base)
+STATIC_FIELDS = frozenset({'evento', 'fecha'})
+
+# Campos propios de cada sesión
+SESSION_FIELDS = frozenset({'hora'})
+
+ALIGN_ANCHORS = {'left': 'la', 'center': 'ma', 'right': 'ra'}
+
+DEFAULT_FONT_SIZE = 48
+MAX_CACHED_TEXTS = 256
+
+TextRaster = Tuple[Image.Image, Tuple[int, int]]
+
+
+def collage_text_values(
+    evento_nombre: Optional[str],
+    evento_fecha: Optional[datetime],
+    session_time: Optional[datetime] = None
+) -> Dict[str, str]:
+    """
+    Valores de los placeholders de las capas de texto
+
+    Args:
+        evento_nombre: Nombre del evento ({evento})
+        evento_fecha: Fecha del evento ({fecha})
+        session_time: Momento de la sesión ({hora}); None = ahora
+
+    Returns:
+        Diccionario campo -> texto
+    """
+    session_time = session_time or datetime.now()
+    return {
+        'evento': evento_nombre or '',
+        'fecha': evento_fecha.strftime('%d/%m/%Y') if evento_fecha else '',
+        'hora': session_time.strftime('%H:%M'),
+    }
+
+
+def text_fields(text: str) -> set:
+    """Placeholders usados en un texto ({evento} -> 'evento')"""
+    try:
+        return {name for _, name, _, _ in string.Formatter().parse(text) if name}
+    except ValueError:
+        return set()
+
+
+def is_static_layer(layer: Dict[str, Any]) -> bool:
+    """True si el texto de la capa no depende de la sesión"""
+    return text_fields(layer.get('text', '')) <= STATIC_FIELDS
+
+
+class _BlankMissing(dict):
+    def __missing__(self, key):
+        return ''
+
+
+def resolve_text(text: str, values: Optional[Dict[str, str]]) -> str:
+    """Reemplaza los placeholders (los que no tienen valor quedan vacíos)"""
+    try:
+        return text.format_map(_BlankMissing(values or {}))
+    except (ValueError, IndexError, AttributeError):
+        # Llaves sueltas u otros formatos: se muestra el texto tal cual
+        return text
+
+
+@lru_cache(maxsize=32)
+def get_font(font: Optional[str], size: int) -> ImageFont.FreeTypeFont:
+    """
+    Carga una fuente (en caché por archivo y tamaño)
+
+    Args:
+        font: Ruta relativa al proyecto, ruta absoluta o nombre de una fuente
+            del sistema ('arial.ttf'); None = fuente por defecto de Pillow
+        size: Tamaño en píxeles
+
+    Returns:
+        Fuente lista para dibujar
+    """
+    if font:
+        from .render_plan import get_absolute_path_from_relative
+
+        path = get_absolute_path_from_relative(font)
+        try:
+            return ImageFont.truetype(str(path) if path else font, size)
+        except OSError as e:
+            logger.warning(f"No se pudo cargar la fuente '{font}', se usa la predeterminada: {e}")
+    return ImageFont.load_default(size)
+
+
+def rasterize_text(
+    text: str,
+    font: Optional[str] = None,
+    size: int = DEFAULT_FONT_SIZE,
+    color: str = "#FFFFFF",
+    align: str = 'left'
+) -> TextRaster:
+    """
+    Dibuja un texto sobre una imagen RGBA transparente del tamaño justo
+
+    Returns:
+        (imagen RGBA, desplazamiento de su esquina respecto al punto de anclaje)
+    """
+    image_font = get_font(font, size)
+    anchor = ALIGN_ANCHORS.get(align, 'la')
+
+    left, top, right, bottom = image_font.getbbox(text, anchor=anchor)
+    patch = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+    ImageDraw.Draw(patch).text((-left, -top), text, font=image_font, fill=color, anchor=anchor)
+    return patch, (left, top)
+
+
+class TextRasterCache:
+    """Caché LRU de textos ya rasterizados (cada cadena distinta se dibuja una vez)"""
+
+    def __init__(self, max_texts: int = MAX_CACHED_TEXTS):
+        self.max_texts = max_texts
+        self._rasters: "OrderedDict[tuple, TextRaster]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str, font: Optional[str], size: int, color: str, align: str) -> TextRaster:
+        """Retorna el texto rasterizado (no modificar la imagen: se comparte)"""
+        key = (text, font, size, color, align)
+        with self._lock:
+            raster = self._rasters.get(key)
+            if raster is not None:
+                self._rasters.move_to_end(key)
+                self.hits += 1
+                return raster
+            self.misses += 1
+
+            # Dentro del lock: los objetos de fuente de FreeType no son seguros entre hilos
+            raster = rasterize_text(text, font, size, color, align)
+            self._rasters[key] = raster
+            while len(self._rasters) > self.max_texts:
+                self._rasters.popitem(last=False)
+            return raster
+
+    def clear(self):
+        """Descarta todos los textos"""
+        with self._lock:
+            self._rasters.clear()
+
+    def get_stats(self) -> Dict:
+        """Estadísticas de la caché"""
+        with self._lock:
+            return {'texts': len(self._rasters), 'hits': self.hits, 'misses': self.misses}
+
+
+_text_cache = TextRasterCache()
+
+
+def get_text_cache() -> TextRasterCache:
+    """Caché global de textos rasterizados"""
+    return _text_cache
+
+
+def layer_raster(layer: Dict[str, Any], values: Optional[Dict[str, str]]) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+    """
+    Rasteriza una capa de texto con sus placeholders resueltos
+
+    Returns:
+        (imagen RGBA, posición en el canvas), o None si el texto queda vacío
+    """
+    text = resolve_text(layer.get('text', ''), values)
+    if not text.strip():
+        return None
+
+    patch, (dx, dy) = _text_cache.get(
+        text,
+        layer.get('font'),
+        int(layer.get('size', DEFAULT_FONT_SIZE)),
+        layer.get('color', '#FFFFFF'),
+        layer.get('align', 'left'),
+    )
+    return patch, (int(layer.get('x', 0)) + dx, int(layer.get('y', 0)) + dy)
+
+
+def draw_text_layers(canvas: Image.Image, layers: List[Dict[str, Any]], values: Optional[Dict[str, str]]):
+    """
+    Dibuja capas de texto directamente sobre una imagen (capa base del plan)
+
+    Args:
+        canvas: Imagen a modificar
+        layers: Capas de texto de la plantilla
+        values: Valores de los placeholders
+    """
+    for layer in layers:
+        try:
+            raster = layer_raster(layer, values)
+            if raster:
+                patch, position = raster
+                canvas.paste(patch, position, patch)
+        except Exception as e:
+            logger.error(f"Error dibujando texto '{layer.get('text')}': {e}")
@@ -0,0 +1,220 @@
+"""
+Escritura de TIFF por franjas sin tener la imagen completa en memoria
+
+Pillow solo guarda imágenes completas; para pósters de gran formato el render
+por bandas (ver tiled_render) entrega cada franja de filas a StripTiffWriter,
+que la comprime (Deflate) y la escribe al final del archivo. Al cerrar se
+escribe el directorio (IFD) con las posiciones de las franjas, así que solo
+hay una franja en memoria a la vez.
+
+TIFF clásico con offsets de 32 bits: el archivo debe quedar por debajo de
+4 GB (un póster de 60x90 cm a 300 DPI ocupa unos 230 MB sin comprimir).
+"""
+import logging
+import os
+import struct
+import uuid
+import zlib
+from fractions import Fraction
+from pathlib import Path
+from typing import List, Optional, Union
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Etiquetas TIFF usadas (baseline RGB de 8 bits)
+TAG_IMAGE_WIDTH = 256
+TAG_IMAGE_LENGTH = 257
+TAG_BITS_PER_SAMPLE = 258
+TAG_COMPRESSION = 259
+TAG_PHOTOMETRIC = 262
+TAG_STRIP_OFFSETS = 273
+TAG_SAMPLES_PER_PIXEL = 277
+TAG_ROWS_PER_STRIP = 278
+TAG_STRIP_BYTE_COUNTS = 279
+TAG_X_RESOLUTION = 282
+TAG_Y_RESOLUTION = 283
+TAG_PLANAR_CONFIG = 284
+TAG_RESOLUTION_UNIT = 296
+
+TYPE_SHORT = 3
+TYPE_LONG = 4
+TYPE_RATIONAL = 5
+
+COMPRESSIONS = {'none': 1, 'deflate': 8}
+
+MAX_FILE_SIZE = 2 ** 32 - 1
+
+
+class StripTiffWriter:
+    """
+    Escribe un TIFF RGB franja a franja
+
+    Uso:
+        with StripTiffWriter(path, width, height, rows_per_strip=256) as writer:
+            for band in bands:
+                writer.write_strip(band)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        width: int,
+        height: int,
+        rows_per_strip: int,
+        dpi: Optional[float] = None,
+        compression: str = 'deflate',
+        level: int = 6
+    ):
+        """
+        Args:
+            path: Ruta final del TIFF (se escribe en un temporal y se renombra al cerrar)
+            width: Ancho de la imagen
+            height: Alto de la imagen
+            rows_per_strip: Filas de cada franja (todas menos la última)
+            dpi: Resolución a registrar en el archivo
+            compression: 'deflate' o 'none'
+            level: Nivel de compresión zlib
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Compresión TIFF no soportada: {compression}")
+
+        self.path = Path(path)
+        self.width = width
+        self.height = height
+        self.rows_per_strip = rows_per_strip
+        self.dpi = dpi
+        self.compression = compression
+        self.level = level
+
+        self.rows_written = 0
+        self.strip_offsets: List[int] = []
+        self.strip_byte_counts: List[int] = []
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._temp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+        self._file = open(self._temp_path, 'wb')
+        # Cabecera little-endian; el offset del IFD se completa al cerrar
+        self._file.write(b'II*\x00\x00\x00\x00\x00')
+
+    def write_strip(self, band: Image.Image):
+        """
+        Agrega la siguiente franja de filas
+
+        Args:
+            band: Imagen RGB del ancho del TIFF y rows_per_strip filas (la
+                última franja puede tener menos)
+        """
+        if band.mode != 'RGB':
+            band = band.convert('RGB')
+        if band.width != self.width:
+            raise ValueError(f"Franja de {band.width} px de ancho en un TIFF de {self.width}")
+        remaining = self.height - self.rows_written
+        if band.height != min(self.rows_per_strip, remaining):
+            raise ValueError(f"Franja de {band.height} filas, se esperaban {min(self.rows_per_strip, remaining)}")
+
+        data = band.tobytes()
+        if self.compression == 'deflate':
+            data = zlib.compress(data, self.level)
+
+        offset = self._file.tell()
+        if offset + len(data) > MAX_FILE_SIZE:
+            raise ValueError("El TIFF supera los 4 GB")
+
+        self._file.write(data)
+        self.strip_offsets.append(offset)
+        self.strip_byte_counts.append(len(data))
+        self.rows_written += band.height
+
+    def close(self) -> Path:
+        """
+        Escribe el directorio del TIFF y lo mueve a su ruta final
+
+        Returns:
+            Ruta del TIFF
+        """
+        if self.rows_written != self.height:
+            raise ValueError(f"TIFF incompleto: {self.rows_written} de {self.height} filas")
+
+        try:
+            self._write_ifd()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._temp_path, self.path)
+        except Exception:
+            self.abort()
+            raise
+
+        logger.info(f"TIFF guardado: {self.path} ({self.width}x{self.height}, {len(self.strip_offsets)} franjas)")
+        return self.path
+
+    def abort(self):
+        """Descarta el archivo a medio escribir"""
+        if not self._file.closed:
+            self._file.close()
+        self._temp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _write_ifd(self):
+        """Directorio con los valores largos (listas, racionales) a continuación"""
+        if self._file.tell() % 2:
+            self._file.write(b'\x00')
+        ifd_offset = self._file.tell()
+
+        resolution = Fraction(self.dpi or 72).limit_denominator(10000)
+        entries = [
+            (TAG_IMAGE_WIDTH, TYPE_LONG, [self.width]),
+            (TAG_IMAGE_LENGTH, TYPE_LONG, [self.height]),
+            (TAG_BITS_PER_SAMPLE, TYPE_SHORT, [8, 8, 8]),
+            (TAG_COMPRESSION, TYPE_SHORT, [COMPRESSIONS[self.compression]]),
+            (TAG_PHOTOMETRIC, TYPE_SHORT, [2]),
+            (TAG_STRIP_OFFSETS, TYPE_LONG, self.strip_offsets),
+            (TAG_SAMPLES_PER_PIXEL, TYPE_SHORT, [3]),
+            (TAG_ROWS_PER_STRIP, TYPE_LONG, [self.rows_per_strip]),
+            (TAG_STRIP_BYTE_COUNTS, TYPE_LONG, self.strip_byte_counts),
+            (TAG_X_RESOLUTION, TYPE_RATIONAL, [resolution]),
+            (TAG_Y_RESOLUTION, TYPE_RATIONAL, [resolution]),
+            (TAG_PLANAR_CONFIG, TYPE_SHORT, [1]),
+            (TAG_RESOLUTION_UNIT, TYPE_SHORT, [2]),  # Pulgadas
+        ]
+
+        # Los valores que no caben en los 4 bytes de la entrada van después del IFD
+        ifd_size = 2 + 12 * len(entries) + 4
+        extra_offset = ifd_offset + ifd_size
+        ifd = struct.pack('<H', len(entries))
+        extra = b''
+
+        for tag, field_type, values in entries:
+            if field_type == TYPE_SHORT:
+                packed = struct.pack(f'<{len(values)}H', *values)
+            elif field_type == TYPE_LONG:
+                packed = struct.pack(f'<{len(values)}I', *values)
+            else:
+                packed = b''.join(struct.pack('<II', v.numerator, v.denominator) for v in values)
+
+            if len(packed) <= 4:
+                value = packed.ljust(4, b'\x00')
+            else:
+                value = struct.pack('<I', extra_offset + len(extra))
+                extra += packed
+                if len(extra) % 2:
+                    extra += b'\x00'
+            ifd += struct.pack('<HHI', tag, field_type, len(values)) + value
+
+        ifd += struct.pack('<I', 0)  # Sin más imágenes
+        self._file.write(ifd + extra)
+
+        self._file.seek(4)
+        self._file.write(struct.pack('<I', ifd_offset))
+        self._file.seek(0, os.SEEK_END)
@@ -0,0 +1,376 @@
+"""
+Render por bandas para pósters de gran formato
+
+Un póster de 60x90 cm a 300 DPI (7087x10630 px) ocupa más de 220 MB como
+canvas RGB, y el plan de render normal guarda además la capa base y la capa
+con bordes. render_tiled() recorre la plantilla en bandas horizontales: cada
+banda se compone solo con los elementos que la cruzan (fondo, textos, bordes,
+fotos y marco PNG), se entrega a StripTiffWriter y se descarta.
+
+Las fotos, el fondo y el marco se decodifican a la menor escala útil y cada
+banda remuestrea solo sus filas (Image.resize con box), con los mismos
+coeficientes LANCZOS que el render completo. Las imágenes decodificadas se
+guardan en una caché con un presupuesto de memory_factor bandas, así que la
+memoria máxima es del orden de (memory_factor + 3) bandas y no depende del
+tamaño del póster (salvo una foto decodificada que por sí sola supere el
+presupuesto: siempre se conserva la que se está usando).
+"""
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image
+
+from .frame_decode import ImageSource, decode_for_size, open_image_source
+from .overlays import apply_opacity
+from .render_plan import compute_fit_geometry, get_absolute_path_from_relative
+from .text_layers import is_static_layer, layer_raster
+from .tiff_stream import StripTiffWriter
+
+logger = logging.getLogger(__name__)
+
+# Filas por banda (y por franja del TIFF)
+DEFAULT_BAND_HEIGHT = 256
+
+# Presupuesto de imágenes decodificadas, en bandas
+DEFAULT_MEMORY_FACTOR = 16
+
+
+def image_bytes(image: Image.Image) -> int:
+    """Memoria que ocupan los píxeles de una imagen"""
+    return image.width * image.height * len(image.getbands())
+
+
+class DecodedImageCache:
+    """Imágenes decodificadas de los elementos del póster, con presupuesto en bytes (LRU)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._images: "OrderedDict[Hashable, Image.Image]" = OrderedDict()
+        self.total_bytes = 0
+        self.peak_bytes = 0
+        self.loads = 0
+
+    def get(self, key: Hashable, loader: Callable[[], Image.Image]) -> Image.Image:
+        """Imagen de un elemento, decodificándola si no está (o fue desalojada)"""
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            return image
+
+        image = loader()
+        self.loads += 1
+        self._images[key] = image
+        self.total_bytes += image_bytes(image)
+        self.peak_bytes = max(self.peak_bytes, self.total_bytes)
+
+        # La recién cargada se conserva aunque sola supere el presupuesto
+        while self.total_bytes > self.max_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self.total_bytes -= image_bytes(evicted)
+        return image
+
+    def discard(self, key: Hashable):
+        """Libera la imagen de un elemento que ya no aparece en las bandas siguientes"""
+        image = self._images.pop(key, None)
+        if image is not None:
+            self.total_bytes -= image_bytes(image)
+
+
+class BandLayer(ABC):
+    """Elemento del póster que se dibuja banda a banda (filas top a bottom)"""
+    top: int = 0
+    bottom: int = 0
+
+    @abstractmethod
+    def draw(self, band: Image.Image, band_top: int, cache: DecodedImageCache):
+        """Dibuja sobre la banda la parte del elemento que la cruza"""
+        pass
+
+    def rows(self, band: Image.Image, band_top: int) -> Tuple[int, int]:
+        """Filas del elemento (relativas a su borde superior) dentro de la banda"""
+        return max(band_top, self.top) - self.top, min(band_top + band.height, self.bottom) - self.top
+
+
+class FillLayer(BandLayer):
+    """Rectángulo de color (bordes de los marcos)"""
+
+    def __init__(self, box: Tuple[int, int, int, int], color: str):
+        self.left, self.top, self.right, self.bottom = box
+        self.color = color
+
+    def draw(self, band: Image.Image, band_top: int, cache: DecodedImageCache):
+        start, end = self.rows(band, band_top)
+        offset = self.top - band_top
+        band.paste(self.color, (self.left, offset + start, self.right, offset + end))
+
+
+class RasterLayer(BandLayer):
+    """Imagen RGBA pequeña ya rasterizada (textos)"""
+
+    def __init__(self, image: Image.Image, position: Tuple[int, int]):
+        self.image = image
+        self.x, self.top = position
+        self.bottom = self.top + image.height
+
+    def draw(self, band: Image.Image, band_top: int, cache: DecodedImageCache):
+        band.paste(self.image, (self.x, self.top - band_top), self.image)
+
+
+class CoverImageLayer(BandLayer):
+    """Foto (o imagen de fondo) que llena un rectángulo recortada al centro"""
+
+    def __init__(self, source: ImageSource, box: Tuple[int, int, int, int]):
+        self.source = source
+        self.x, self.top, right, self.bottom = box
+        self.width = right - self.x
+        self.height = self.bottom - self.top
+
+    def _load(self) -> Image.Image:
+        image = open_image_source(self.source)
+        resize_size, _ = compute_fit_geometry(image.size, self.width, self.height)
+        image = decode_for_size(image, resize_size, owned=not isinstance(self.source, Image.Image))
+        return image if image.mode == 'RGB' else image.convert('RGB')
+
+    def draw(self, band: Image.Image, band_top: int, cache: DecodedImageCache):
+        image = cache.get(self, self._load)
+        (resized_width, resized_height), (left, top, right, _) = compute_fit_geometry(
+            image.size, self.width, self.height
+        )
+        scale_x = image.width / resized_width
+        scale_y = image.height / resized_height
+
+        start, end = self.rows(band, band_top)
+        strip = image.resize(
+            (self.width, end - start),
+            Image.Resampling.LANCZOS,
+            box=(left * scale_x, (top + start) * scale_y, right * scale_x, (top + end) * scale_y)
+        )
+        band.paste(strip, (self.x, self.top + start - band_top))
+
+
+class StretchedOverlayLayer(BandLayer):
+    """Marco PNG estirado al tamaño del póster, con su opacidad"""
+
+    def __init__(self, path: Path, canvas_size: Tuple[int, int], opacity: float = 1.0):
+        self.path = path
+        self.width, self.bottom = canvas_size
+        self.top = 0
+        self.opacity = opacity
+
+    def _load(self) -> Image.Image:
+        with Image.open(self.path) as source:
+            return source.convert('RGBA')
+
+    def draw(self, band: Image.Image, band_top: int, cache: DecodedImageCache):
+        image = cache.get(self, self._load)
+        scale_y = image.height / self.bottom
+
+        start, end = self.rows(band, band_top)
+        strip = image.resize(
+            (self.width, end - start),
+            Image.Resampling.LANCZOS,
+            box=(0, start * scale_y, image.width, end * scale_y)
+        )
+        apply_opacity(strip, self.opacity)
+        band.paste(strip, (0, start - band_top), strip)
+
+
+def template_band_layers(
+    template: Dict[str, Any],
+    images: Sequence[ImageSource],
+    text_values: Optional[Dict[str, str]] = None,
+    add_border: bool = True
+) -> List[BandLayer]:
+    """
+    Elementos de una plantilla de collage en el orden en que se componen
+
+    Fondo, textos fijos, bordes, textos de la sesión, fotos y marco PNG (el
+    mismo orden que la capa base del plan de render más CollageGenerator).
+
+    Args:
+        template: Plantilla ya en píxeles de salida
+        images: Fotos de los marcos
+        text_values: Valores de los placeholders de las capas de texto
+        add_border: Si los marcos llevan borde
+
+    Returns:
+        Lista de elementos
+    """
+    canvas = template["canvas"]
+    size = (canvas["width"], canvas["height"])
+    layers: List[BandLayer] = []
+
+    background = get_absolute_path_from_relative(canvas.get("background_image"))
+    if background:
+        layers.append(CoverImageLayer(background, (0, 0) + size))
+    elif canvas.get("background_image"):
+        logger.warning(f"Imagen de fondo no encontrada: {canvas['background_image']}")
+
+    text_layers = template.get("text_layers") or []
+
+    def add_text(layers_to_draw):
+        for layer in layers_to_draw:
+            raster = layer_raster(layer, text_values)
+            if raster:
+                layers.append(RasterLayer(*raster))
+
+    add_text([layer for layer in text_layers if is_static_layer(layer)])
+
+    styling = template.get("styling", {})
+    border = styling.get("border_width", 0) if add_border else 0
+    if border > 0:
+        for frame in template["frames"]:
+            layers.append(FillLayer(
+                (frame["x"], frame["y"],
+                 frame["x"] + frame["width"] + 2 * border, frame["y"] + frame["height"] + 2 * border),
+                styling.get("border_color", "#FFFFFF")
+            ))
+
+    add_text([layer for layer in text_layers if not is_static_layer(layer)])
+
+    for frame, image in zip(template["frames"], images):
+        x, y = frame["x"] + border, frame["y"] + border
+        layers.append(CoverImageLayer(image, (x, y, x + frame["width"], y + frame["height"])))
+
+    overlay = get_absolute_path_from_relative(canvas.get("overlay_image"))
+    if overlay:
+        layers.append(StretchedOverlayLayer(overlay, size, float(canvas.get("overlay_opacity", 1.0))))
+
+    return layers
+
+
+class TiledRenderer:
+    """Compone una imagen grande banda a banda y entrega cada banda a un writer"""
+
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        background_color: str,
+        layers: List[BandLayer],
+        band_height: int = DEFAULT_BAND_HEIGHT,
+        memory_factor: float = DEFAULT_MEMORY_FACTOR
+    ):
+        """
+        Args:
+            size: (ancho, alto) de la imagen
+            background_color: Color de fondo
+            layers: Elementos en orden de composición
+            band_height: Filas por banda
+            memory_factor: Presupuesto de imágenes decodificadas, en bandas
+        """
+        self.width, self.height = size
+        self.background_color = background_color
+        self.layers = layers
+        self.band_height = max(1, band_height)
+        self.band_bytes = self.width * self.band_height * 3
+        self.cache = DecodedImageCache(int(self.band_bytes * memory_factor))
+
+    def band_count(self) -> int:
+        return -(-self.height // self.band_height)
+
+    def _buckets(self) -> Tuple[List[List[BandLayer]], List[List[BandLayer]]]:
+        """Elementos que cruza cada banda (en orden) y los que terminan en ella"""
+        count = self.band_count()
+        crossing: List[List[BandLayer]] = [[] for _ in range(count)]
+        ending: List[List[BandLayer]] = [[] for _ in range(count)]
+        for layer in self.layers:
+            top, bottom = max(layer.top, 0), min(layer.bottom, self.height)
+            if bottom <= top:
+                continue
+            first, last = top // self.band_height, (bottom - 1) // self.band_height
+            for index in range(first, last + 1):
+                crossing[index].append(layer)
+            ending[last].append(layer)
+        return crossing, ending
+
+    def render(self, write_band: Callable[[Image.Image], None]):
+        """
+        Compone todas las bandas de arriba hacia abajo
+
+        Args:
+            write_band: Recibe cada banda terminada (no debe conservarla)
+        """
+        crossing, ending = self._buckets()
+        started = time.perf_counter()
+
+        for index in range(self.band_count()):
+            band_top = index * self.band_height
+            rows = min(self.band_height, self.height - band_top)
+            band = Image.new('RGB', (self.width, rows), self.background_color)
+
+            for layer in crossing[index]:
+                try:
+                    layer.draw(band, band_top, self.cache)
+                except Exception as e:
+                    logger.error(f"Error dibujando {type(layer).__name__} en la banda {index}: {e}")
+
+            write_band(band)
+            for layer in ending[index]:
+                self.cache.discard(layer)
+
+        logger.info(
+            f"Render por bandas {self.width}x{self.height}: {self.band_count()} bandas en "
+            f"{time.perf_counter() - started:.1f} s, imágenes decodificadas: {self.cache.loads}, "
+            f"pico de caché {self.cache.peak_bytes / 1e6:.0f} MB (banda {self.band_bytes / 1e6:.1f} MB)"
+        )
+
+
+def render_tiled(
+    template: Dict[str, Any],
+    images: Sequence[ImageSource],
+    output_path: Union[str, Path],
+    text_values: Optional[Dict[str, str]] = None,
+    add_border: bool = True,
+    band_height: int = DEFAULT_BAND_HEIGHT,
+    memory_factor: float = DEFAULT_MEMORY_FACTOR,
+    compression: str = 'deflate'
+) -> Optional[Path]:
+    """
+    Renderiza una plantilla por bandas directamente a un TIFF
+
+    Args:
+        template: Plantilla ya en píxeles de salida (ver render_targets)
+        images: Fotos de los marcos
+        output_path: Ruta del TIFF
+        text_values: Valores de los placeholders de las capas de texto
+        add_border: Si los marcos llevan borde
+        band_height: Filas por banda
+        memory_factor: Presupuesto de imágenes decodificadas, en bandas
+        compression: 'deflate' o 'none'
+
+    Returns:
+        Ruta del TIFF, o None si hubo error
+    """
+    try:
+        num_photos = template["num_photos"]
+        if len(images) < num_photos:
+            logger.error(f"Se requieren {num_photos} fotos, pero solo se proporcionaron {len(images)}")
+            return None
+
+        canvas = template["canvas"]
+        renderer = TiledRenderer(
+            (canvas["width"], canvas["height"]),
+            canvas["background_color"],
+            template_band_layers(template, images, text_values, add_border),
+            band_height,
+            memory_factor
+        )
+
+        with StripTiffWriter(
+            output_path,
+            renderer.width,
+            renderer.height,
+            renderer.band_height,
+            dpi=canvas.get("dpi"),
+            compression=compression
+        ) as writer:
+            renderer.render(writer.write_strip)
+        return Path(output_path)
+
+    except Exception as e:
+        logger.error(f"Error en render por bandas: {e}", exc_info=True)
+        return None